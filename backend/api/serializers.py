@@ -1,7 +1,8 @@
 # backend/api/serializers.py
 
 from rest_framework import serializers
-from core.models import Processo, ParametrosSistema, Feriado, Profile, Role, ProcessoHistorico, Anotacao
+from core.models import Processo, ParametrosSistema, Feriado, Profile, Role, ProcessoHistorico, Anotacao, Tarefa, Documento
+from core.services import tarefas_service, workflow_service
 from common.models import User
 
 MEIOS_TRANSPORTE = ('VEICULO_PROPRIO', 'AEREO', 'ONIBUS', 'CARONA')
@@ -34,6 +35,73 @@ class ProcessoSerializer(serializers.ModelSerializer):
             'valor_total_empenhar', 'created_at', 'ano', 'numero',  
         ]
 
+# rótulos de status resolvidos por dicionário (sem get_status_display por linha)
+STATUS_LABELS = dict(Processo.Status.choices)
+
+
+class ProcessoListSerializer(serializers.ModelSerializer):
+    """
+    Versão enxuta do processo para a listagem do dashboard: sem os campos de
+    texto longos. Aceita `?fields=a,b,c` (sparse fieldset); `id` sempre vem.
+    A view usa `colunas()` para carregar só as colunas necessárias (.only()).
+    """
+    solicitante_nome = serializers.SerializerMethodField()
+    status_display = serializers.SerializerMethodField()
+    acoes_permitidas = serializers.SerializerMethodField()
+
+    # campos do serializer que não são colunas de Processo -> colunas de que dependem
+    COLUNAS_DERIVADAS = {
+        'solicitante_nome': ('solicitante__first_name', 'solicitante__last_name'),
+        'status_display': ('status',),
+        'acoes_permitidas': ('status', 'solicitante'),
+    }
+
+    class Meta:
+        model = Processo
+        fields = [
+            'id', 'solicitante', 'solicitante_nome', 'status', 'status_display',
+            'destino', 'data_saida', 'data_retorno', 'meio_transporte',
+            'valor_total_empenhar', 'created_at', 'ano', 'numero', 'acoes_permitidas',
+        ]
+        read_only_fields = fields
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        campos = self.campos_solicitados(request)
+        for nome in set(self.fields) - set(campos):
+            self.fields.pop(nome)
+
+    @classmethod
+    def campos_solicitados(cls, request) -> list[str]:
+        """Campos pedidos em ?fields= (nomes desconhecidos são ignorados)."""
+        todos = cls.Meta.fields
+        bruto = request.query_params.get('fields') if request is not None else None
+        if not bruto:
+            return list(todos)
+        pedidos = {c.strip() for c in bruto.split(',')} | {'id'}
+        return [c for c in todos if c in pedidos]
+
+    @classmethod
+    def colunas(cls, campos) -> list[str]:
+        """Colunas para o .only() do queryset; created_at entra sempre (ordenação/cursor)."""
+        colunas = {'id', 'created_at'}
+        for campo in campos:
+            colunas.update(cls.COLUNAS_DERIVADAS.get(campo, (campo,)))
+        return sorted(colunas)
+
+    def get_solicitante_nome(self, obj):
+        return obj.solicitante.get_full_name()
+
+    def get_status_display(self, obj):
+        return STATUS_LABELS.get(obj.status, obj.status)
+
+    def get_acoes_permitidas(self, obj):
+        # os perfis do usuário são resolvidos uma vez (principal memorizado);
+        # por linha é só consulta às tabelas em memória do workflow
+        return workflow_service.acoes_permitidas(obj, self.context['request'].user)
+
+
 class ParametrosSistemaSerializer(serializers.ModelSerializer):
     class Meta:
         model = ParametrosSistema
@@ -128,3 +196,62 @@ class AnotacaoSerializer(serializers.ModelSerializer):
     def get_autor_nome(self, obj):
         return obj.autor.get_full_name() or obj.autor.email
 
+
+class DocumentoSerializer(serializers.ModelSerializer):
+    tipo_documento_display = serializers.CharField(source='get_tipo_documento_display', read_only=True)
+    enviado_por_nome = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Documento
+        fields = [
+            'id', 'nome_arquivo', 'gdrive_file_id', 'gdrive_file_url',
+            'tipo_documento', 'tipo_documento_display', 'uploaded_at', 'enviado_por_nome',
+        ]
+        read_only_fields = fields
+
+    def get_enviado_por_nome(self, obj):
+        return obj.uploaded_by.get_full_name() or obj.uploaded_by.email
+
+
+class ProcessoCompletoSerializer(ProcessoSerializer):
+    """
+    Processo com histórico, anotações, documentos e as ações permitidas ao
+    usuário, numa única resposta (tela de detalhe). As relações devem vir
+    pré-carregadas (ver ProcessoViewSet.get_queryset, ação `completo`).
+    """
+    historico = ProcessoHistoricoSerializer(many=True, read_only=True)
+    anotacoes = AnotacaoSerializer(many=True, read_only=True)
+    documentos = DocumentoSerializer(many=True, read_only=True)
+    acoes_permitidas = serializers.SerializerMethodField()
+
+    class Meta(ProcessoSerializer.Meta):
+        fields = ProcessoSerializer.Meta.fields + ['historico', 'anotacoes', 'documentos', 'acoes_permitidas']
+
+    def get_acoes_permitidas(self, obj):
+        return workflow_service.acoes_permitidas(obj, self.context['request'].user)
+
+
+class TarefaSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    etapas = serializers.SerializerMethodField()
+    doc_url = serializers.SerializerMethodField()
+    folder_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Tarefa
+        fields = [
+            'id', 'tipo', 'processo', 'status', 'status_display', 'etapa_atual',
+            'etapas', 'etapas_concluidas', 'tentativas', 'max_tentativas',
+            'executar_apos', 'ultimo_erro', 'doc_url', 'folder_url',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+    def get_etapas(self, obj):
+        return tarefas_service.nomes_etapas(obj.tipo)
+
+    def get_doc_url(self, obj):
+        return (obj.resultado or {}).get('doc_url')
+
+    def get_folder_url(self, obj):
+        return (obj.resultado or {}).get('folder_url')
@@ -1,3 +1,676 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from core.models import (
+    Processo, ProcessoHistorico, Anotacao, Documento, Notificacao, ParametrosSistema, Role, Tarefa, STATUS_FINALIZADOS, STATUS_ACAO_POR_PERFIL,
+)
+from core.services import calculos_service, google_auth_service, workflow_service
+from api import views
+
+
+def criar_processo(solicitante, **kwargs):
+    agora = timezone.now()
+    dados = dict(
+        solicitante=solicitante, objetivo_viagem="Capacitação", destino="Curitiba, PR",
+        data_saida=agora, data_retorno=agora + timedelta(days=1),
+        meio_transporte=Processo.MeioTransporte.VEICULO_OFICIAL,
+    )
+    dados.update(kwargs)
+    return Processo.objects.create(**dados)
+
+
+class ProcessoCompletoTests(TestCase):
+    """GET /processos/{id}/completo/ com número fixo de consultas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x", is_staff=True)
+        cls.processo = criar_processo(cls.usuario, status=Processo.Status.ANALISE_ADMIN)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _popular(self, n):
+        for i in range(n):
+            ProcessoHistorico.objects.create(
+                processo=self.processo, status_anterior=Processo.Status.RASCUNHO,
+                status_novo=Processo.Status.ANALISE_ADMIN, responsavel=self.usuario,
+            )
+            Anotacao.objects.create(processo=self.processo, autor=self.usuario, texto=f"nota {i}")
+            Documento.objects.create(
+                processo=self.processo, nome_arquivo=f"doc{i}.pdf", gdrive_file_id=f"f{self.processo.pk}-{n}-{i}",
+                tipo_documento=Documento.TipoDocumento.OUTRO, uploaded_by=self.usuario,
+            )
+
+    def _autenticar(self):
+        # instância nova do usuário a cada requisição, como na autenticação real:
+        # nada fica memorizado no objeto entre uma requisição e outra
+        self.client.force_authenticate(User.objects.get(pk=self.usuario.pk))
+
+    def _get(self):
+        return self.client.get(f"/api/processos/{self.processo.pk}/completo/")
+
+    def test_resposta_agregada(self):
+        self._popular(2)
+        self._autenticar()
+        r = self._get()
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["id"], self.processo.pk)
+        self.assertEqual(len(r.data["historico"]), 2)
+        self.assertEqual([a["texto"] for a in r.data["anotacoes"]], ["nota 0", "nota 1"])
+        self.assertEqual(len(r.data["documentos"]), 2)
+        # staff opera a análise administrativa ('adm')
+        self.assertIn(Processo.Status.AGUARDANDO_ASSINATURAS_SOLICITACAO, r.data["acoes_permitidas"])
+
+    def test_numero_de_consultas_nao_cresce_com_as_relacoes(self):
+        # processo (+ solicitante/perfil), 3 prefetches e os slugs do usuário (acoes_permitidas)
+        self._popular(1)
+        self._autenticar()
+        with self.assertNumQueries(5):
+            self._get()
+        # outra instância do usuário: os slugs vêm do cache do principal_service
+        self._popular(5)
+        self._autenticar()
+        with self.assertNumQueries(4):
+            self._get()
+
+
+class ProcessoListagemTests(TestCase):
+    """A listagem traz as ações permitidas por linha sem consultas extras."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x", is_staff=True)
+
+    def _listar(self, n_consultas):
+        # instância nova do usuário a cada requisição, como na autenticação real
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.usuario.pk))
+        with self.assertNumQueries(n_consultas):
+            r = self.client.get("/api/processos/?page_size=100")
+        self.assertEqual(r.status_code, 200)
+        return r.data["results"]
+
+    def test_acoes_permitidas_por_linha(self):
+        criar_processo(self.usuario, status=Processo.Status.ANALISE_ADMIN)
+        criar_processo(self.usuario, status=Processo.Status.AGUARDANDO_EMPENHO)
+        # COUNT, página e os slugs do usuário
+        linhas = {p["status"]: p["acoes_permitidas"] for p in self._listar(3)}
+        self.assertEqual(linhas[Processo.Status.ANALISE_ADMIN],
+                         [Processo.Status.AGUARDANDO_ASSINATURAS_SOLICITACAO, Processo.Status.INDEFERIDO])
+        self.assertEqual(linhas[Processo.Status.AGUARDANDO_EMPENHO], [])
+
+    def test_consultas_nao_crescem_com_as_linhas(self):
+        for _ in range(3):
+            criar_processo(self.usuario, status=Processo.Status.ANALISE_ADMIN)
+        self.assertEqual(len(self._listar(3)), 3)
+        for _ in range(30):
+            criar_processo(self.usuario, status=Processo.Status.PC_EM_ANALISE)
+        self.assertEqual(len(self._listar(3)), 33)
+
+
+class ProcessoCursorTests(TestCase):
+    """GET /processos/?paginacao=cursor: keyset sobre (created_at, id)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x")
+        processos = [criar_processo(cls.usuario, destino=f"Cidade {i}") for i in range(7)]
+        # cinco linhas com o mesmo created_at: o desempate é pelo id
+        empate = timezone.now() - timedelta(days=1)
+        Processo.objects.filter(pk__in=[p.pk for p in processos[1:6]]).update(created_at=empate)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _get(self, url):
+        return self.client.get(url, HTTP_X_ACTIVE_ROLE="admin_geral")
+
+    def test_percorre_todas_as_linhas_com_created_at_repetido(self):
+        esperado = list(Processo.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        vistos = []
+        url = "/api/processos/?paginacao=cursor&page_size=2"
+        paginas = 0
+        while url:
+            r = self._get(url)
+            self.assertEqual(r.status_code, 200)
+            self.assertLessEqual(len(r.data["results"]), 2)
+            vistos.extend(p["id"] for p in r.data["results"])
+            url = r.data["next"]
+            paginas += 1
+        self.assertEqual(vistos, esperado)
+        self.assertEqual(paginas, 4)
+
+    def test_cursor_malformado_devolve_404(self):
+        for cursor in ("!!!", "YWJj", base64.urlsafe_b64encode(b"2024-01-01T00:00:00|x").decode(), "%C3%A9"):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self._get(f"/api/processos/?cursor={cursor}").status_code, 404)
+
+    def test_incluir_total_so_quando_pedido(self):
+        r = self._get("/api/processos/?paginacao=cursor&page_size=3&incluir_total=1")
+        self.assertEqual(r.data["count"], 7)
+        self.assertNotIn("incluir_total", r.data["next"])
+        self.assertNotIn("count", self._get(r.data["next"]).data)
+        self.assertNotIn("count", self._get("/api/processos/?paginacao=cursor").data)
+
+    def test_projecao_com_fields(self):
+        with CaptureQueriesContext(connection) as consultas:
+            r = self._get("/api/processos/?paginacao=cursor&page_size=3&fields=destino,status")
+        self.assertEqual(r.status_code, 200)
+        for linha in r.data["results"]:
+            self.assertEqual(set(linha), {"id", "destino", "status"})
+        sql = " ".join(q["sql"] for q in consultas.captured_queries if "core_processo" in q["sql"])
+        self.assertNotIn("objetivo_viagem", sql)
+        # o cursor continua funcionando sem created_at na resposta
+        self.assertEqual(len(self._get(r.data["next"]).data["results"]), 3)
+
+
+class CalculoPreviewLoteTests(TestCase):
+    """POST /processos/calcular-preview/batch/: vários cenários, uma consulta de rota por destino."""
+
+    URL = "/api/processos/calcular-preview/batch/"
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x")
+        ParametrosSistema.objects.create(valor_upm=Decimal("5.00"), preco_medio_gasolina=Decimal("6.00"))
+
+    def setUp(self):
+        cache.clear()
+        calculos_service._rotas_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        distancias = {"Curitiba, PR": 100_000, "Joinville, SC": 50_000}
+        patch = mock.patch.object(
+            calculos_service, "_consultar_distancia_api", side_effect=lambda destino, origem: distancias[destino]
+        )
+        self.api = patch.start()
+        self.addCleanup(patch.stop)
+
+    def _cenario(self, destino, dias=1, **extra):
+        saida = timezone.now() + timedelta(days=10)
+        return {
+            "destino": destino, "data_saida": saida.isoformat(),
+            "data_retorno": (saida + timedelta(days=dias)).isoformat(),
+            "meio_transporte": "VEICULO_PROPRIO", **extra,
+        }
+
+    def test_resultados_na_ordem_dos_cenarios(self):
+        cenarios = [
+            self._cenario("Curitiba, PR", num_com_pernoite=1),
+            self._cenario("Joinville, SC", num_com_pernoite=2),
+            self._cenario("curitiba,pr", num_com_pernoite=3),
+        ]
+        r = self.client.post(self.URL, cenarios, format="json")
+        self.assertEqual(r.status_code, 200, r.data)
+        self.assertEqual(len(r.data), 3)
+        km = [item["calculo_deslocamento"]["distancia_km"] for item in r.data]
+        self.assertEqual(km[0], km[2])
+        self.assertGreater(km[0], km[1])
+        pernoites = [item["calculo_diarias"]["num_com_pernoite"] for item in r.data]
+        self.assertEqual(pernoites, [1, 2, 3])
+        # {"cenarios": [...]} é equivalente
+        r2 = self.client.post(self.URL, {"cenarios": cenarios}, format="json")
+        self.assertEqual(r2.data, r.data)
+
+    def test_uma_consulta_de_rota_por_destino(self):
+        cenarios = [self._cenario(d) for d in ("Curitiba, PR", "Joinville, SC", "Curitiba, PR", "curitiba,  pr")]
+        self.assertEqual(self.client.post(self.URL, cenarios, format="json").status_code, 200)
+        self.assertEqual(sorted(c.args[0] for c in self.api.call_args_list), ["Curitiba, PR", "Joinville, SC"])
+        # segunda requisição: tudo vem do cache
+        self.client.post(self.URL, cenarios, format="json")
+        self.assertEqual(self.api.call_count, 2)
+
+    def test_limite_de_cenarios(self):
+        limite = views.CalculoPreviewLoteAPIView.MAX_CENARIOS
+        r = self.client.post(self.URL, [self._cenario("Curitiba, PR")] * (limite + 1), format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertIn(str(limite), r.data["error"])
+        self.api.assert_not_called()
+        self.assertEqual(self.client.post(self.URL, [], format="json").status_code, 400)
+        self.assertEqual(self.client.post(self.URL, {"cenarios": "x"}, format="json").status_code, 400)
+
+    def test_erro_em_um_cenario_nao_derruba_os_demais(self):
+        original = views.calcular_valor_diarias
+
+        def _diarias(destino, **kwargs):
+            if destino == "Joinville, SC":
+                raise calculos_service.CalculoServiceError("Valor da UPM não cadastrado nos parâmetros do sistema.")
+            return original(destino=destino, **kwargs)
+
+        cenarios = [self._cenario("Curitiba, PR"), self._cenario("Joinville, SC"), self._cenario("Curitiba, PR")]
+        with mock.patch.object(views, "calcular_valor_diarias", side_effect=_diarias):
+            r = self.client.post(self.URL, cenarios, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data[1], {"error": "Valor da UPM não cadastrado nos parâmetros do sistema."})
+        self.assertIn("total_empenhar", r.data[0])
+        self.assertIn("total_empenhar", r.data[2])
+
+    def test_erros_de_validacao_por_cenario(self):
+        invalido = self._cenario("Curitiba, PR")
+        invalido["data_retorno"] = invalido["data_saida"]
+        sem_destino = self._cenario("Curitiba, PR")
+        del sem_destino["destino"]
+        r = self.client.post(self.URL, [self._cenario("Curitiba, PR"), sem_destino, invalido], format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(len(r.data), 3)
+        self.assertEqual(r.data[0], {})
+        self.assertIn("destino", r.data[1])
+        self.assertIn("non_field_errors", r.data[2])
+        self.api.assert_not_called()
+
+
+class SubmitTests(TestCase):
+    """POST /processos/submit/ grava o processo e os anexos e responde 202 com a tarefa."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x")
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root, TAREFAS_MODO_SINCRONO=False)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_responde_202_com_a_tarefa(self):
+        agora = timezone.now()
+        processo = {
+            "objetivo_viagem": "Capacitação", "destino": "Curitiba, PR",
+            "data_saida": agora.isoformat(), "data_retorno": (agora + timedelta(days=1)).isoformat(),
+            "meio_transporte": Processo.MeioTransporte.VEICULO_OFICIAL,
+            "calculos": {"total_empenhar": 100},
+        }
+        r = self.client.post("/api/processos/submit/", {
+            "processo": json.dumps(processo),
+            "files": [SimpleUploadedFile("a.pdf", b"%PDF"), SimpleUploadedFile("b.pdf", b"%PDF")],
+        }, format="multipart")
+        self.assertEqual(r.status_code, 202, r.data)
+        tarefa = Tarefa.objects.get(pk=r.data["tarefa_id"])
+        self.assertEqual(tarefa.processo_id, r.data["id"])
+        self.assertEqual(r.data["tarefa_status"], Tarefa.Status.PENDENTE)
+        self.assertEqual(sorted(tarefa.anexos.values_list("nome_arquivo", flat=True)), ["a.pdf", "b.pdf"])
+        self.assertTrue(tarefa.payload["tem_anexos"])
+
+        r = self.client.get(f"/api/tarefas/{tarefa.pk}/")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["etapas"][0], "criar_pastas")
+
+
+class TransicaoLoteTests(TestCase):
+    """POST /processos/transicionar-lote/: falhas por id, limite do lote, histórico e sinal."""
+
+    DESTINO = Processo.Status.AGUARDANDO_ASSINATURAS_SOLICITACAO
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.operador = User.objects.create_user("op", "op@example.com", "x", is_staff=True)
+        cls.dono = User.objects.create_user("ana", "ana@example.com", "x")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.operador.pk))
+        self.sinais = []
+        receptor = lambda sender, **kwargs: self.sinais.append(kwargs)
+        workflow_service.processo_transicionado.connect(receptor, weak=False)
+        self.addCleanup(workflow_service.processo_transicionado.disconnect, receptor)
+
+    def _post(self, ids, **extra):
+        return self.client.post(
+            "/api/processos/transicionar-lote/",
+            {"ids": ids, "destino": self.DESTINO, **extra},
+            format="json", HTTP_X_ACTIVE_ROLE="admin_geral",
+        )
+
+    def test_falhas_parciais_nao_impedem_os_demais(self):
+        a = criar_processo(self.dono, status=Processo.Status.ANALISE_ADMIN)
+        b = criar_processo(self.dono, status=Processo.Status.ANALISE_ADMIN)
+        empenho = criar_processo(self.dono, status=Processo.Status.AGUARDANDO_EMPENHO)
+        r = self._post([a.pk, empenho.pk, b.pk, a.pk, 999999], observacao="lote")
+        self.assertEqual(r.status_code, 200)
+        self.assertFalse(r.data["ok"])
+        self.assertEqual(sorted(r.data["atualizados"]), [a.pk, b.pk])
+        falhas = {f["id"]: f["detail"] for f in r.data["falhas"]}
+        self.assertEqual(set(falhas), {empenho.pk, 999999})
+        self.assertIn("Transição inválida", falhas[empenho.pk])
+        self.assertIn("não encontrado", falhas[999999])
+
+        status = dict(Processo.objects.values_list("pk", "status"))
+        self.assertEqual(status[a.pk], self.DESTINO)
+        self.assertEqual(status[b.pk], self.DESTINO)
+        self.assertEqual(status[empenho.pk], Processo.Status.AGUARDANDO_EMPENHO)
+
+    def test_historico_e_sinal_do_lote(self):
+        processos = [criar_processo(self.dono, status=Processo.Status.ANALISE_ADMIN) for _ in range(3)]
+        r = self._post([p.pk for p in processos], observacao="ok para assinar")
+        self.assertTrue(r.data["ok"])
+
+        historicos = ProcessoHistorico.objects.filter(processo__in=processos)
+        self.assertEqual(historicos.count(), 3)
+        for h in historicos:
+            self.assertEqual(
+                (h.status_anterior, h.status_novo, h.responsavel_id, h.anotacao),
+                (Processo.Status.ANALISE_ADMIN, self.DESTINO, self.operador.pk, "ok para assinar"),
+            )
+        # um único sinal para o lote inteiro, com uma transição por processo
+        self.assertEqual(len(self.sinais), 1)
+        self.assertEqual(self.sinais[0]["destino"], self.DESTINO)
+        self.assertEqual(self.sinais[0]["usuario"].pk, self.operador.pk)
+        self.assertEqual(
+            sorted(self.sinais[0]["transicoes"]),
+            sorted((p.pk, self.dono.pk, Processo.Status.ANALISE_ADMIN) for p in processos),
+        )
+        # o receptor de core.signals gravou as notificações do solicitante
+        self.assertEqual(Notificacao.objects.filter(destinatario="ana@example.com").count(), 3)
+
+    def test_sem_permissao(self):
+        processo = criar_processo(self.dono, status=Processo.Status.ANALISE_ADMIN)
+        self.client.force_authenticate(User.objects.get(pk=self.dono.pk))
+        r = self._post([processo.pk])
+        self.assertEqual(r.data["atualizados"], [])
+        self.assertIn("sem permissão", r.data["falhas"][0]["detail"])
+        self.assertEqual(self.sinais, [])
+        self.assertFalse(ProcessoHistorico.objects.exists())
+
+    def test_limite_e_validacao_dos_ids(self):
+        limite = views.ProcessoViewSet.MAX_TRANSICAO_LOTE
+        self.assertEqual(self._post(list(range(1, limite + 2))).status_code, 400)
+        r = self._post(list(range(1, limite + 1)))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.data["falhas"]), limite)
+        self.assertEqual(self._post([]).status_code, 400)
+        self.assertEqual(self._post("1,2").status_code, 400)
+        self.assertEqual(self._post(["x"]).status_code, 400)
+        self.assertEqual(self.client.post(
+            "/api/processos/transicionar-lote/", {"ids": [1]}, format="json"
+        ).status_code, 400)
+
+
+class ProcessoCondicionalTests(TestCase):
+    """GET condicional (ETag / If-None-Match) no detalhe, histórico e anotações."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x")
+        cls.processo = criar_processo(cls.usuario)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _urls(self):
+        base = f"/api/processos/{self.processo.pk}/"
+        return [base, base + "historico/", base + "anotacoes/"]
+
+    def test_304_com_if_none_match_igual(self):
+        for url in self._urls():
+            with self.subTest(url=url):
+                r = self.client.get(url)
+                self.assertEqual(r.status_code, 200)
+                self.assertTrue(r["ETag"])
+                r2 = self.client.get(url, HTTP_IF_NONE_MATCH=r["ETag"])
+                self.assertEqual(r2.status_code, 304)
+                self.assertEqual(r2["ETag"], r["ETag"])
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"outra"').status_code, 200)
+
+    def test_404_para_pk_invalido_ou_inexistente(self):
+        for pk in ("abc", "999999"):
+            for sufixo in ("", "historico/", "anotacoes/"):
+                with self.subTest(pk=pk, sufixo=sufixo):
+                    self.assertEqual(self.client.get(f"/api/processos/{pk}/{sufixo}").status_code, 404)
+
+    def test_etag_muda_apos_alteracao(self):
+        detalhe, historico, anotacoes = self._urls()
+        antes = {url: self.client.get(url)["ETag"] for url in self._urls()}
+
+        self.processo.objetivo_viagem = "Congresso"
+        self.processo.save()
+        r = self.client.get(detalhe, HTTP_IF_NONE_MATCH=antes[detalhe])
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r["ETag"], antes[detalhe])
+
+        ProcessoHistorico.objects.create(
+            processo=self.processo, status_anterior=Processo.Status.RASCUNHO,
+            status_novo=Processo.Status.ANALISE_ADMIN, responsavel=self.usuario,
+        )
+        self.assertEqual(self.client.get(historico, HTTP_IF_NONE_MATCH=antes[historico]).status_code, 200)
+
+        self.client.post(anotacoes, {"texto": "nova"}, format="json")
+        r = self.client.get(anotacoes, HTTP_IF_NONE_MATCH=antes[anotacoes])
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([a["texto"] for a in r.data], ["nova"])
+
+
+class ContadoresInvalidacaoTests(TestCase):
+    """Os contadores em cache acompanham qualquer save/delete de Processo, não só o workflow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _buckets(self):
+        return self.client.get("/api/processos/contadores/", HTTP_X_ACTIVE_ROLE="solicitante").data["buckets"]
+
+    def test_delete_pela_api(self):
+        processo = criar_processo(self.usuario, status=Processo.Status.ANALISE_ADMIN)
+        self.assertEqual(self._buckets()["in_progress"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f"/api/processos/{processo.pk}/").status_code, 204)
+        self.assertEqual(self._buckets()["in_progress"], 0)
+
+    def test_save_fora_do_workflow(self):
+        processo = criar_processo(self.usuario, status=Processo.Status.ANALISE_ADMIN)
+        self.assertEqual(self._buckets(), {"in_progress": 1, "finished": 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            processo.status = Processo.Status.ARQUIVADO
+            processo.save()
+        self.assertEqual(self._buckets(), {"in_progress": 0, "finished": 1})
+
+    def test_save_de_campos_fora_da_contagem_nao_invalida(self):
+        processo = criar_processo(self.usuario)
+        with self.captureOnCommitCallbacks() as callbacks:
+            processo.gdrive_folder_id = "pasta"
+            processo.save(update_fields=["gdrive_folder_id"])
+        self.assertEqual(callbacks, [])
+
+
+@unittest.skipUnless(os.environ.get("RUN_BENCHMARKS"), "benchmark: defina RUN_BENCHMARKS=1 para rodar")
+class ProcessoIndicesBenchmarkTests(TestCase):
+    """
+    Popula 200 mil processos e confere, via EXPLAIN, que as consultas do
+    dashboard (ProcessoViewSet.get_queryset) usam os índices compostos/parciais.
+    """
+    TOTAL = 200_000
+    USUARIOS = 500
+
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(42)
+        cls.usuarios = User.objects.bulk_create(
+            [User(username=f"bench{i}") for i in range(cls.USUARIOS)]
+        )
+        status_validos = [s for s, _ in Processo.Status.choices]
+        agora = timezone.now()
+        processos = []
+        for i in range(cls.TOTAL):
+            # a maior parte do histórico já está finalizada, como em produção
+            status = rnd.choice(STATUS_FINALIZADOS) if rnd.random() < 0.8 else rnd.choice(status_validos)
+            data = agora - timedelta(minutes=i)
+            processos.append(Processo(
+                solicitante=rnd.choice(cls.usuarios), status=status,
+                objetivo_viagem="benchmark", destino="Curitiba, PR",
+                data_saida=data, data_retorno=data,
+                meio_transporte=Processo.MeioTransporte.VEICULO_OFICIAL,
+                created_at=data,
+            ))
+        # auto_now_add sobrescreveria as datas espalhadas no tempo
+        with mock.patch.object(Processo._meta.get_field('created_at'), 'auto_now_add', False):
+            Processo.objects.bulk_create(processos, batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsaIndice(self, qs, *indices):
+        plano = qs.explain()
+        self.assertTrue(any(nome in plano for nome in indices), f"Plano sem {indices}:\n{plano}")
+        return plano
+
+    # as consultas abaixo levam o LIMIT da paginação do dashboard
+
+    def test_solicitante_em_andamento(self):
+        qs = (Processo.objects.filter(solicitante=self.usuarios[0])
+              .exclude(status__in=STATUS_FINALIZADOS).order_by('-created_at')[:20])
+        self.assertUsaIndice(qs, 'processo_solic_ativos_idx', 'processo_solic_status_idx')
+
+    def test_solicitante_finalizados(self):
+        qs = (Processo.objects.filter(solicitante=self.usuarios[0], status__in=STATUS_FINALIZADOS)
+              .order_by('-created_at')[:20])
+        self.assertUsaIndice(qs, 'processo_solic_status_idx')
+
+    def test_fila_do_operador(self):
+        for statuses in STATUS_ACAO_POR_PERFIL.values():
+            qs = Processo.objects.filter(status__in=statuses).order_by('-created_at')[:20]
+            plano = self.assertUsaIndice(qs, 'processo_status_created_idx')
+            if len(statuses) == 1:
+                # um único status: o índice já entrega a ordem, sem ordenação extra
+                self.assertNotIn('TEMP B-TREE', plano)
+
+    def test_listagem_completa(self):
+        qs = Processo.objects.order_by('-created_at', '-id')[:20]
+        plano = self.assertUsaIndice(qs, 'processo_created_id_idx')
+        self.assertNotIn('TEMP B-TREE', plano)
+
+
+@override_settings(GOOGLE_CLIENT_ID="cliente.apps.googleusercontent.com", GOOGLE_CLIENT_SECRET="segredo")
+class GoogleLoginTests(TestCase):
+    """Login com Google: id_token verificado localmente contra um JWKS de teste."""
+
+    CLIENT_ID = "cliente.apps.googleusercontent.com"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # chave RSA gerada no teste faz o papel das chaves de assinatura do Google
+        cls.chave_privada = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = jwt.algorithms.RSAAlgorithm.to_jwk(cls.chave_privada.public_key(), as_dict=True)
+        cls.jwks = {"keys": [{**jwk, "kid": "k1", "alg": "RS256", "use": "sig"}]}
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+
+    def setUp(self):
+        google_auth_service.invalidar_chaves()
+        patch_post = mock.patch.object(google_auth_service.requests, "post")
+        patch_get = mock.patch.object(google_auth_service.requests, "get", return_value=mock.Mock(
+            headers={"Cache-Control": "public, max-age=19800, must-revalidate"},
+            json=mock.Mock(return_value=self.jwks), raise_for_status=mock.Mock(),
+        ))
+        self.post = patch_post.start()
+        self.get = patch_get.start()
+        self.addCleanup(patch_post.stop)
+        self.addCleanup(patch_get.stop)
+
+    def _id_token(self, kid="k1", **claims):
+        agora = int(time.time())
+        dados = {
+            "iss": "https://accounts.google.com", "aud": self.CLIENT_ID, "sub": "123",
+            "iat": agora, "exp": agora + 3600, "email": "bia@example.com", "email_verified": True,
+            "given_name": "Bia", "family_name": "Souza", "picture": "https://example.com/bia.png",
+        }
+        dados.update(claims)
+        return jwt.encode(dados, self.chave_privada, algorithm="RS256", headers={"kid": kid})
+
+    def _login(self, **claims):
+        self.post.return_value = mock.Mock(json=mock.Mock(return_value={
+            "id_token": self._id_token(**claims), "access_token": "ya29.x",
+        }))
+        return APIClient().post("/api/google-login/", {"code": "abc"}, format="json")
+
+    def test_login_com_claims_do_id_token(self):
+        r = self._login()
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("access", r.data)
+        usuario = User.objects.get(email="bia@example.com")
+        self.assertEqual((usuario.first_name, usuario.last_name), ("Bia", "Souza"))
+        self.assertEqual(usuario.profile.picture_url, "https://example.com/bia.png")
+        # só a troca do code (com timeout) e as chaves; nada de userinfo/tokeninfo
+        self.assertIn("timeout", self.post.call_args.kwargs)
+        self.get.assert_called_once_with(google_auth_service.CERTS_URL, timeout=google_auth_service.TIMEOUT)
+
+    def test_chaves_ficam_em_cache_pelo_max_age(self):
+        self.assertEqual(self._login().status_code, 200)
+        self.assertEqual(self._login().status_code, 200)
+        self.assertEqual(self.get.call_count, 1)
+        self.assertAlmostEqual(google_auth_service._chaves["expira_em"], time.time() + 19800, delta=5)
+        google_auth_service._chaves["expira_em"] = time.time() - 1  # max-age vencido
+        self.assertEqual(self._login().status_code, 200)
+        self.assertEqual(self.get.call_count, 2)
+
+    def test_kid_desconhecido_recarrega_uma_vez(self):
+        self.assertEqual(self._login().status_code, 200)
+        self.assertEqual(self._login(kid="k2").status_code, 400)
+        self.assertEqual(self.get.call_count, 1)  # recarga recente: não busca de novo
+        google_auth_service._chaves["buscado_em"] -= google_auth_service.INTERVALO_MINIMO_RECARGA
+        self.assertEqual(self._login(kid="k2").status_code, 400)
+        self.assertEqual(self.get.call_count, 2)
+
+    def test_rejeita_tokens_invalidos(self):
+        casos = [
+            {"aud": "outro-cliente"},
+            {"iss": "https://evil.example.com"},
+            {"exp": int(time.time()) - 3600, "iat": int(time.time()) - 7200},
+            {"email_verified": False},
+        ]
+        for claims in casos:
+            with self.subTest(claims=claims):
+                self.assertEqual(self._login(**claims).status_code, 400)
+        outra_chave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.post.return_value = mock.Mock(json=mock.Mock(return_value={"id_token": jwt.encode(
+            {"iss": "accounts.google.com", "aud": self.CLIENT_ID, "sub": "1", "iat": int(time.time()),
+             "exp": int(time.time()) + 60, "email": "x@example.com", "email_verified": True},
+            outra_chave, algorithm="RS256", headers={"kid": "k1"},
+        )}))
+        self.assertEqual(APIClient().post("/api/google-login/", {"code": "abc"}, format="json").status_code, 400)
+        self.assertFalse(User.objects.filter(email="x@example.com").exists())
@@ -2,16 +2,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
-from .views import GoogleAuthView, UserProfileView, CalculoPreviewAPIView, ConfigDataView
+from .views import GoogleAuthView, UserProfileView, CalculoPreviewAPIView, CalculoPreviewLoteAPIView, ConfigDataView
 
 router = DefaultRouter()
 router.register(r'processos', views.ProcessoViewSet, basename='processo')
 router.register(r'parametros', views.ParametrosSistemaViewSet, basename='parametros')
 router.register(r'feriados', views.FeriadoViewSet, basename='feriados')
+router.register(r'tarefas', views.TarefaViewSet, basename='tarefas')
 
 urlpatterns = [
     # rota manual deve vir antes do include(router.urls)
     path('processos/calcular-preview/', CalculoPreviewAPIView.as_view(), name='processo-calcular-preview'),
+    path('processos/calcular-preview/batch/', CalculoPreviewLoteAPIView.as_view(), name='processo-calcular-preview-batch'),
 
     # outras rotas avulsas
     path("google-login/", GoogleAuthView.as_view(), name="google-login"),
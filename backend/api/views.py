@@ -3,50 +3,45 @@
 import requests
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Max
+from django.db.models import Count, Max, Prefetch, Q
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.conf import settings
-from django.contrib.auth.models import Group
 import logging
 
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, BasePagination
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework import status, viewsets, permissions, generics
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.decorators import action
 
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 
 
 from core.models import (
-    Processo, ParametrosSistema, Feriado, Documento, Profile, Role, ProcessoHistorico
+    Processo, ParametrosSistema, Feriado, Documento, Profile, Role, ProcessoHistorico,
+    Anotacao, Tarefa, AnexoPendente, SequenciaProcesso, STATUS_FINALIZADOS, STATUS_ACAO_POR_PERFIL
 )
-from core.services import calculos_service, google_drive_service, google_docs_service, workflow_service
-from .serializers import ( ProcessoSerializer, ParametrosSistemaSerializer, 
+from core.services import calculos_service, contadores_service, google_auth_service, tarefas_service, workflow_service
+from .serializers import ( ProcessoSerializer, ProcessoListSerializer, ProcessoCompletoSerializer, ParametrosSistemaSerializer, 
     FeriadoSerializer, ProfileSerializer, CalculoPreviewSerializer, 
-    ProcessoHistoricoSerializer, AnotacaoSerializer
+    ProcessoHistoricoSerializer, AnotacaoSerializer, TarefaSerializer
 )
 
-from core.services.orquestrador_gdrive import create_process_folder_and_doc
-from core.services.email_service import send_process_created_email
-from core.services.pessoas_service import get_nome_presidente
 from core.services.workflow_service import acoes_permitidas, transicionar
-from num2words import num2words
 
 
+import base64
 import json
-import math
-# babel é usado apenas para formatações mais sofisticadas de datas. Se não estiver
-# disponível, caímos para uma formatação simples pt-BR.
-try:  # pragma: no cover - fallback para ambientes sem Babel
-    from babel.dates import format_date
-except ModuleNotFoundError:  # pragma: no cover
-    def format_date(date_obj, format="d 'de' MMMM 'de' yyyy", locale="pt_BR"):
-        return date_obj.strftime("%d/%m/%Y")
+from datetime import datetime
 
 
 from core.services.calculos_service import calcular_valor_diarias, calcular_valor_deslocamento, CalculoServiceError
+from core.services.regioes_service import CAPITAIS_BRASIL
 import logging
 logger = logging.getLogger(__name__)
 
@@ -66,32 +61,26 @@ class GoogleAuthView(APIView):
                 {"error": "Google client credentials not configured on server."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-        token_res = requests.post(
-            "https://oauth2.googleapis.com/token",
-            data={
-                "code": code, "client_id": client_id, "client_secret": client_secret,
-                "redirect_uri": "postmessage", "grant_type": "authorization_code"
-            }
-        )
-        token_data = token_res.json()
+        try:
+            token_data = google_auth_service.trocar_code(code, client_id, client_secret)
+        except requests.RequestException as e:
+            logger.warning("Falha na troca do code com o Google: %s", e)
+            return Response({"error": "Google unavailable"}, status=status.HTTP_502_BAD_GATEWAY)
         if "error" in token_data:
             return Response({"error": token_data}, status=status.HTTP_400_BAD_REQUEST)
         id_token = token_data.get("id_token")
-        access_token = token_data.get("access_token")
         if not id_token:
             return Response({"error": "No id_token from Google"}, status=status.HTTP_400_BAD_REQUEST)
-        user_info = {}
-        if access_token:
-            ui = requests.get(
-                "https://www.googleapis.com/oauth2/v3/userinfo",
-                headers={"Authorization": f"Bearer {access_token}"}, timeout=10,
-            )
-            if ui.ok: user_info = ui.json()
-        if not user_info:
-            info_res = requests.get(f"https://oauth2.googleapis.com/tokeninfo?id_token={id_token}")
-            user_info = info_res.json()
+        try:
+            user_info = google_auth_service.verificar_id_token(id_token, client_id)
+        except google_auth_service.TokenInvalidoError as e:
+            logger.warning("id_token do Google rejeitado: %s", e)
+            return Response({"error": "Invalid token info"}, status=status.HTTP_400_BAD_REQUEST)
+        except requests.RequestException as e:
+            logger.warning("Falha ao buscar as chaves públicas do Google: %s", e)
+            return Response({"error": "Google unavailable"}, status=status.HTTP_502_BAD_GATEWAY)
         email = user_info.get("email")
-        if not email:
+        if not email or not user_info.get("email_verified"):
             return Response({"error": "Invalid token info"}, status=status.HTTP_400_BAD_REQUEST)
         user, _ = User.objects.get_or_create(
             email=email,
@@ -108,29 +97,74 @@ class GoogleAuthView(APIView):
         return Response({"refresh": str(refresh), "access": str(refresh.access_token)})
 
     
-def valor_extenso_sem_centavos_if_round(value):
-    v = Decimal(str(value or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-    inteiro = int(v // 1)
-    centavos = int((v - inteiro) * 100)
-    if centavos == 0:
-        words = num2words(inteiro, lang='pt_BR', to='cardinal')
-        currency_word = 'real' if abs(inteiro) == 1 else 'reais'
-        return f"{words} {currency_word}"
-    return num2words(float(v), lang='pt_BR', to='currency')
-    
-def format_tag_value(value, prefix="", suffix="", is_currency=False):
-    if value is None or float(value) == 0:
-        return "-----"
-    if is_currency:
-        formatted_value = f"{float(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        return f"R$ {formatted_value}"
-    return f"{prefix}{value}{suffix}"
-
 class DashboardPagination(PageNumberPagination):
     page_size = 20  # Número de itens por página
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+class DashboardCursorPagination(BasePagination):
+    """
+    Paginação por cursor (keyset) sobre (created_at, id), ativada com
+    ?paginacao=cursor ou quando a requisição já traz ?cursor=.
+    Cada página é um `WHERE (created_at, id) < cursor ORDER BY ... LIMIT n`
+    apoiado no índice processo_created_id_idx: páginas profundas custam o mesmo
+    que a primeira. O total (COUNT) só é calculado com ?incluir_total=1.
+    """
+    page_size = DashboardPagination.page_size
+    page_size_query_param = DashboardPagination.page_size_query_param
+    max_page_size = DashboardPagination.max_page_size
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def encode_cursor(obj):
+        raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+            created_at, pk = raw.rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound("Cursor inválido.")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_queryset = queryset
+        page_size = self.get_page_size(request)
+        qs = queryset.order_by('-created_at', '-id')
+        cursor = self.decode_cursor(request)
+        if cursor:
+            created_at, pk = cursor
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        results = list(qs[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # o total só é pedido na primeira página; as seguintes não repetem o COUNT
+        url = remove_query_param(self.request.build_absolute_uri(), 'incluir_total')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        body = {'next': self.get_next_link(), 'results': data}
+        if self.request.query_params.get('incluir_total') in ('1', 'true'):
+            body['count'] = self.base_queryset.count()
+        return Response(body)
+
 class ProcessoViewSet(viewsets.ModelViewSet):
     """
     Endpoint da API para visualizar e criar Processos de Diárias.
@@ -138,26 +172,41 @@ class ProcessoViewSet(viewsets.ModelViewSet):
     serializer_class = ProcessoSerializer
     pagination_class = DashboardPagination
 
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request else {}
+            usa_cursor = params.get('paginacao') == 'cursor' or 'cursor' in params
+            self._paginator = DashboardCursorPagination() if usa_cursor else self.pagination_class()
+        return self._paginator
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProcessoListSerializer
+        if self.action == 'completo':
+            return ProcessoCompletoSerializer
+        return super().get_serializer_class()
+
     # ⭐ MODIFICADO: Lógica de filtragem totalmente refeita para o dashboard
     def get_queryset(self):
         user = self.request.user
         active_role = self.request.headers.get('X-Active-Role', 'solicitante')
         view_mode = self.request.query_params.get('view', None)
 
-        qs = Processo.objects.select_related('solicitante', 'solicitante__profile').all()
-
-        S = Processo.Status
-        
-        # Mapeamento de status que exigem ação por perfil de operador
-        ACTION_STATUSES_BY_ROLE = {
-            'controle_interno': [S.ANALISE_ADMIN, S.PC_EM_ANALISE],
-            'assinatura': [S.AGUARDANDO_ASSINATURAS_SOLICITACAO, S.AGUARDANDO_ASSINATURAS_PC],
-            'contabilidade': [S.AGUARDANDO_EMPENHO, S.PC_ANALISE_CONTABILIDADE],
-            'pagamento': [S.AGUARDANDO_PAGAMENTO],
-        }
-
-        # Status considerados "Finalizados"
-        STATUS_FINALIZADOS = [S.ARQUIVADO, S.INDEFERIDO, S.CANCELADO]
+        if self.action == 'list':
+            # listagem: só as colunas que o ProcessoListSerializer vai devolver
+            campos = ProcessoListSerializer.campos_solicitados(self.request)
+            qs = Processo.objects.only(*ProcessoListSerializer.colunas(campos))
+            if 'solicitante_nome' in campos:
+                qs = qs.select_related('solicitante')
+        else:
+            qs = Processo.objects.select_related('solicitante', 'solicitante__profile').all()
+            if self.action == 'completo':
+                qs = qs.prefetch_related(
+                    Prefetch('historico', queryset=ProcessoHistorico.objects.select_related('responsavel').order_by('timestamp')),
+                    Prefetch('anotacoes', queryset=Anotacao.objects.select_related('autor').order_by('created_at')),
+                    Prefetch('documentos', queryset=Documento.objects.select_related('uploaded_by').order_by('uploaded_at')),
+                )
 
         # 1. Filtro por Perfil (Autorização)
         if active_role == 'solicitante':
@@ -168,10 +217,10 @@ class ProcessoViewSet(viewsets.ModelViewSet):
             else: # Padrão é 'in_progress'
                 qs = qs.exclude(status__in=STATUS_FINALIZADOS)
 
-        elif active_role in ACTION_STATUSES_BY_ROLE:
+        elif active_role in STATUS_ACAO_POR_PERFIL:
             # 2. Filtro por Visualização para Operadores
             if view_mode == 'action_needed':
-                action_statuses = ACTION_STATUSES_BY_ROLE.get(active_role, [])
+                action_statuses = STATUS_ACAO_POR_PERFIL.get(active_role, [])
                 qs = qs.filter(status__in=action_statuses)
             # Se view_mode for 'all' ou não especificado, o operador vê todos os processos
 
@@ -221,15 +270,21 @@ class ProcessoViewSet(viewsets.ModelViewSet):
 
         # 5) salva alterações finais
         processo_instance.save()
+
+    @action(detail=False, methods=['get'], url_path='contadores')
+    def contadores(self, request):
+        """Quantidade de processos por bucket de visualização do perfil ativo (X-Active-Role)."""
+        perfil = request.headers.get('X-Active-Role', 'solicitante')
+        return Response(contadores_service.contadores(request.user, perfil))
     
     @action(detail=False, methods=['post'], url_path='submit', permission_classes=[permissions.IsAuthenticated])
     def submit(self, request, *args, **kwargs):
         """
         Endpoint multipart aprimorado:
         - Espera 'processo' (JSON) e 'files' (anexos).
-        - Usa os cálculos do frontend para preencher o documento.
-        - Faz o upload dos arquivos para o Google Drive.
-        - Preenche todas as tags do template corretamente.
+        - Salva o processo e os anexos e responde 202 com o id da tarefa.
+        - Pastas no Drive, upload dos anexos, documento e e-mails são feitos
+          pela tarefa assíncrona (ver core.services.submissao_service).
         """
         # 1. Obter e validar payload JSON
         try:
@@ -243,14 +298,16 @@ class ProcessoViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # 2. Salvar processo inicial e gerar número/ano
+        attachments = request.FILES.getlist('files') or request.FILES.getlist('files[]')
+        logger.info("Submit anexos recebidos: %s -> %s", len(attachments), [f.name for f in attachments])
+
+        # 2. Salvar processo inicial, gerar número/ano e enfileirar a tarefa de submissão
         try:
             with transaction.atomic():
                 processo_instance = serializer.save(solicitante=request.user)
                 ano_atual = timezone.now().year
-                last_num = Processo.objects.filter(ano=ano_atual).aggregate(Max('numero'))['numero__max'] or 0
                 processo_instance.ano = ano_atual
-                processo_instance.numero = int(last_num) + 1
+                processo_instance.numero = SequenciaProcesso.proximo_numero(ano_atual)
                 
                 # Atualiza o processo com os valores calculados do frontend para persistência
                 processo_instance.valor_total_diarias = Decimal(calculos_frontend.get('calculo_diarias', {}).get('valor_total_diarias', 0))
@@ -260,252 +317,106 @@ class ProcessoViewSet(viewsets.ModelViewSet):
                 
                 processo_instance.save()
 
-        except Exception as e:
-            logger.exception("Falha ao criar processo no banco de dados: %s", e)
-            return Response({"error": "Erro interno ao salvar o processo."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        # 3. Orquestração com o Google Drive
-        try:
-            # Cria a estrutura de pastas
-            root_folder_id = settings.GDRIVE_ROOT_FOLDER_ID
-            ano_folder = google_drive_service.ensure_folder(root_folder_id, str(processo_instance.ano))
-            processo_folder_name = f"Diária {processo_instance.numero}-{processo_instance.ano} - {processo_instance.solicitante.get_full_name()}"
-            processo_folder = google_drive_service.ensure_folder(ano_folder['id'], processo_folder_name)
-            docs_folder = google_drive_service.ensure_folder(
-                processo_folder['id'],
-                "1 - Documentos recebidos na solicitação"  # (opcional) padronização do nome
-            )
-
-            
-            # Salva o ID da pasta principal no processo
-            processo_instance.gdrive_folder_id = processo_folder['id']
-            processo_instance.save(update_fields=['gdrive_folder_id'])
-
-            # 4. Faz o upload dos arquivos anexados
-            attachments = request.FILES.getlist('files') or request.FILES.getlist('files[]')
-            logger.info("Submit anexos recebidos: %s -> %s", len(attachments), [f.name for f in attachments])
-            if not attachments:
-                logger.info("Nenhum anexo recebido na submissão do processo %s", processo_instance.id)
-
-
-            for f in attachments:
-                uploaded_file = google_drive_service.upload_file(docs_folder['id'], f.name, f, f.content_type)
-                Documento.objects.create(
+                # Drive, Docs e e-mails rodam no worker (`manage.py processar_tarefas`)
+                tarefa = tarefas_service.enfileirar(
+                    Tarefa.Tipo.SUBMISSAO,
                     processo=processo_instance,
-                    nome_arquivo=f.name,
-                    gdrive_file_id=uploaded_file['id'],
-                    gdrive_file_url=uploaded_file.get('webViewLink'),
-                    tipo_documento=Documento.TipoDocumento.OUTRO,
-                    uploaded_by=request.user
+                    payload={'calculos': calculos_frontend, 'tem_anexos': bool(attachments)},
                 )
-
-            # 5. Prepara os dados para o template do Google Docs
-            local_created_at = timezone.localtime(processo_instance.created_at)
-            
-            # Cálculo correto do período da viagem
-            delta_dias = processo_instance.data_retorno - processo_instance.data_saida
-            numero_dias = math.ceil(delta_dias.total_seconds() / 86400)
-            periodo_viagem_str = f"{int(numero_dias)} dia(s)"
-
-            diarias_data = calculos_frontend.get('calculo_diarias', {})
-            deslocamento_data = calculos_frontend.get('calculo_deslocamento', {})
-
-            # Dicionário de substituição de tags CORRIGIDO
-            replacements = {
-                'Numero': f"{processo_instance.numero}-{processo_instance.ano}",
-                'Nome': processo_instance.solicitante.get_full_name(),
-                'CPF': processo_instance.solicitante.profile.cpf or '',
-                'Cargo': processo_instance.solicitante.profile.cargo or '',
-                'Local_Destino': processo_instance.destino,
-                'Hora_Partida': timezone.localtime(processo_instance.data_saida).strftime('%d/%m/%Y %H:%M'),
-                'Hora_Retorno': timezone.localtime(processo_instance.data_retorno).strftime('%d/%m/%Y %H:%M'),
-                'Transporte': processo_instance.get_meio_transporte_display(),
-                'placa': f"Placa: {processo_instance.placa_veiculo}" if processo_instance.placa_veiculo else '-----',
-                'solicitadoEm': local_created_at.strftime('%d/%m/%Y %H:%M'),
-                'Periodo_Viagem': periodo_viagem_str,
-
-                'numCom': format_tag_value(diarias_data.get('num_com_pernoite', 0)),
-                'upmCom': format_tag_value(diarias_data.get('upm_com_pernoite', 0)),
-                'vlrUPM': format_tag_value(diarias_data.get('valor_upm_usado', 0), is_currency=True),
-                'totalCom': format_tag_value(diarias_data.get('total_com_pernoite', 0), is_currency=True),
-                'numSem': format_tag_value(diarias_data.get('num_sem_pernoite', 0)),
-                'upmSem': format_tag_value(diarias_data.get('upm_sem_pernoite', 0)),
-                'totalSem': format_tag_value(diarias_data.get('total_sem_pernoite', 0), is_currency=True),
-                'numMeia': format_tag_value(diarias_data.get('num_meia_diaria', 0)),
-                'upmMeia': format_tag_value(diarias_data.get('upm_meia_diaria', 0)),
-                'totalMeia': format_tag_value(diarias_data.get('total_meia_diaria', 0), is_currency=True),
-                'totalDiarias': format_tag_value(diarias_data.get('valor_total_diarias', 0), is_currency=True),
-
-                'kmTotal': format_tag_value(deslocamento_data.get('distancia_km', 0)),
-                'precoGas': format_tag_value(deslocamento_data.get('preco_gas_usado', 0), is_currency=True),
-                'vlrDeslocamento': format_tag_value(deslocamento_data.get('valor_deslocamento', 0), is_currency=True),
-
-                'totEmpenhar': format_tag_value(calculos_frontend.get('total_empenhar', 0), is_currency=True),
-                'Total_Empenhar': format_tag_value(calculos_frontend.get('total_empenhar', 0), is_currency=True),
-                'Vlr_Total_Extenso': (
-                    valor_extenso_sem_centavos_if_round(calculos_frontend.get('total_empenhar', 0))
-                    if calculos_frontend.get('total_empenhar', 0) else '-----'
-                ),
-
-                'Finalidade': processo_instance.objetivo_viagem,
-                'constaAnexo': 'Sim' if attachments else 'Não',
-                'ponto': 'SIM',
-                'Pagamento_Curso': (
-                    'Sim - ' + format_tag_value(processo_instance.valor_taxa_inscricao, is_currency=True)
-                ) if processo_instance.solicita_pagamento_inscricao else 'Não',
-                'justificaViagemAntecipada': processo_instance.justificativa_viagem_antecipada or '',
-                'observacoes': processo_instance.observacoes or '-----',
-                'extrair_data': format_date(local_created_at.date(), format='d \'de\' MMMM \'de\' yyyy', locale='pt_BR'),
-                'NomePresidente': get_nome_presidente(),
-            }
-
-            # 6. Cria o documento no Drive e preenche as tags
-            doc_copy = google_drive_service.copy_file(
-                file_id=settings.GDOC_TEMPLATE_ID,
-                new_title=f"Solicitação de Diária - {processo_folder_name}",
-                parent_id=docs_folder['id']
-            )
-            google_docs_service.replace_tags(doc_copy['id'], replacements)
-            
-            # Envia e-mails, etc.
-
-            # Adicione esta linha para capturar o retorno da orquestração
-            orq_res = {
-                "doc_url": doc_copy.get('webViewLink'),
-                "folder_url": google_drive_service.get_folder_link(processo_folder['id']),
-            }
-            
-            # Envia e-mails, etc.
-        except Exception as e:
-            logger.exception("Erro ao orquestrar criação no GDrive: %s", e)
-            return Response({"error": "Erro ao salvar documentos no Google Drive."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        # 9. salvar link da pasta no processo (campo gdrive_folder_id já existente)
-
-                # 10. enviar emails
-        controle_emails: list[str] = []
-
-        try:
-            role = (
-                Role.objects.filter(slug__iexact="controle_interno").first()
-                or Role.objects.filter(name__iexact="controle interno").first()
-                or Role.objects.filter(name__iexact="controle interno.").first()  # tolerância
-                or Role.objects.filter(name__iexact="controle interno ").first()
-                or Role.objects.filter(name__iexact="Controle Interno").first()
-            )
-            if role:
-                controle_emails = list(
-                    Profile.objects
-                        .filter(roles=role, user__is_active=True, user__email__isnull=False)
-                        .values_list("user__email", flat=True)
-                )
-        except Exception:
-            pass
-
-        # (2) Grupo Django
-        if not controle_emails:
-            try:
-                grp = Group.objects.filter(name__iexact='Controle Interno').first()
-                if grp:
-                    controle_emails = list(
-                        grp.user_set.filter(is_active=True, email__isnull=False)
-                        .values_list('email', flat=True)
+                for f in attachments:
+                    AnexoPendente.objects.create(
+                        tarefa=tarefa, arquivo=f, nome_arquivo=f.name, content_type=f.content_type or ''
                     )
-            except Exception:
-                pass
-
-        # (3) Flag em Profile
-        if not controle_emails:
-            try:
-                controle_emails = list(
-                    Profile.objects
-                        .filter(controle_interno=True, user__is_active=True)
-                        .values_list('user__email', flat=True)
-                )
-            except Exception:
-                pass
-
-        # (4) Parametrização (campo textos separados por vírgula)
-        if not controle_emails:
-            try:
-                params = ParametrosSistema.objects.first()
-                raw = getattr(params, 'emails_controle_interno', None)
-                if raw:
-                    if isinstance(raw, str):
-                        controle_emails = [e.strip() for e in raw.split(',') if e.strip()]
-                    elif isinstance(raw, (list, tuple)):
-                        controle_emails = list(raw)
-            except Exception:
-                pass
-
-        # saneamento final (dedupe, remove vazios)
-        controle_emails = sorted({(e or "").strip().lower() for e in controle_emails if e})
-        logger.info(
-            "Destinatários Controle Interno resolvidos para processo %s: %s",
-            processo_instance.id, controle_emails
-        )
-            
-        status_anterior = processo_instance.status
-        processo_instance.status = Processo.Status.ANALISE_ADMIN
-        processo_instance.save(update_fields=['status'])
-
-        ProcessoHistorico.objects.create(
-            processo=processo_instance,
-            status_anterior=status_anterior,
-            status_novo=processo_instance.status,
-            responsavel=request.user,
-            anotacao="Documento gerado no submit."
-        )
-
-
-        try:
-            send_process_created_email(
-                processo_instance,
-                controle_emails,
-                requester_email=request.user.email,
-                doc_url=orq_res.get('doc_url'),
-                folder_url=orq_res.get('folder_url')
-            )
-
-            msg_id = send_process_created_email(
-                processo_instance,
-                controle_emails,
-                requester_email=request.user.email,
-                doc_url=orq_res.get('doc_url'),
-                folder_url=orq_res.get('folder_url'),
-                reply_to_message_id=getattr(processo_instance, "email_message_id", None),  # se não existir, fica None
-            )
-
-            # (opcional) se seu modelo Processo tiver um campo email_message_id, salve para próximas respostas
-            if msg_id and hasattr(processo_instance, "email_message_id") and not processo_instance.email_message_id:
-                processo_instance.email_message_id = msg_id
-                processo_instance.save(update_fields=["email_message_id"])
-
-        except Exception:
-            logger.exception("Falha ao enviar emails de notificação para processo %s", processo_instance.id)
 
+        except Exception as e:
+            logger.exception("Falha ao criar processo no banco de dados: %s", e)
+            return Response({"error": "Erro interno ao salvar o processo."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # 11. resposta
+        # 3. resposta imediata; o frontend acompanha o andamento em /tarefas/{id}/
+        tarefa.refresh_from_db()
         return Response({
             "id": processo_instance.id, "numero": processo_instance.numero, "ano": processo_instance.ano,
-            "gdrive_doc_url": orq_res.get('doc_url'), "gdrive_folder_url": orq_res.get('folder_url'),
-        }, status=status.HTTP_201_CREATED)
+            "tarefa_id": tarefa.id, "tarefa_status": tarefa.status,
+            "gdrive_doc_url": tarefa.resultado.get('doc_url'), "gdrive_folder_url": tarefa.resultado.get('folder_url'),
+        }, status=status.HTTP_202_ACCEPTED)
     
+    # --- GET condicional (ETag / Last-Modified) ---
+    # A versão vem de uma consulta curta (updated_at do processo ou MAX/COUNT dos
+    # filhos) feita antes de qualquer serialização; se o cliente já tem essa
+    # versão a resposta é um 304 sem corpo.
+
+    def _versao(self, pk, **agregados):
+        try:
+            qs = self.get_queryset().select_related(None).filter(pk=pk)
+            if agregados:
+                return qs.annotate(**agregados).values_list(*agregados).first()
+            return qs.values_list('updated_at').first()
+        except (TypeError, ValueError):
+            return None  # pk inválido: o get_object() devolve o 404
+
+    def _condicional(self, request, etag, ultima_modificacao):
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+        last_modified = int(ultima_modificacao.timestamp()) if ultima_modificacao else None
+        if last_modified:
+            headers['Last-Modified'] = http_date(last_modified)
+        nao_modificado = get_conditional_response(request, etag=headers['ETag'], last_modified=last_modified)
+        if nao_modificado is not None:
+            for nome, valor in headers.items():
+                nao_modificado[nome] = valor
+        return nao_modificado, headers
+
+    @staticmethod
+    def _etag(prefixo, pk, ultima_modificacao, total=None):
+        marca = int(ultima_modificacao.timestamp() * 1_000_000) if ultima_modificacao else 0
+        return f"{prefixo}{pk}-{total}-{marca}" if total is not None else f"{prefixo}{pk}-{marca}"
+
+    def retrieve(self, request, *args, **kwargs):
+        versao = self._versao(kwargs['pk'])
+        if versao is None:
+            return super().retrieve(request, *args, **kwargs)
+        (updated_at,) = versao
+        nao_modificado, headers = self._condicional(request, self._etag('p', kwargs['pk'], updated_at), updated_at)
+        if nao_modificado is not None:
+            return nao_modificado
+        response = super().retrieve(request, *args, **kwargs)
+        for nome, valor in headers.items():
+            response[nome] = valor
+        return response
+
+    @action(detail=True, methods=['get'], url_path='completo')
+    def completo(self, request, pk=None):
+        """Processo + histórico + anotações + documentos + ações permitidas, em uma só resposta."""
+        return Response(self.get_serializer(self.get_object()).data)
+
     @action(detail=True, methods=['get'], url_path='historico')
     def historico(self, request, pk=None):
+        versao = self._versao(pk, ultimo=Max('historico__timestamp'), total=Count('historico'))
+        headers = {}
+        if versao is not None:
+            ultimo, total = versao
+            nao_modificado, headers = self._condicional(request, self._etag('h', pk, ultimo, total), ultimo)
+            if nao_modificado is not None:
+                return nao_modificado
         proc = self.get_object()
         qs = proc.historico.select_related('responsavel').order_by('timestamp')
-        return Response(ProcessoHistoricoSerializer(qs, many=True).data)
+        return Response(ProcessoHistoricoSerializer(qs, many=True).data, headers=headers)
 
     @action(detail=True, methods=['get', 'post'], url_path='anotacoes')
     def anotacoes(self, request, pk=None):
+        headers = {}
+        if request.method == 'GET':
+            versao = self._versao(pk, ultima=Max('anotacoes__created_at'), total=Count('anotacoes'))
+            if versao is not None:
+                ultima, total = versao
+                nao_modificado, headers = self._condicional(request, self._etag('a', pk, ultima, total), ultima)
+                if nao_modificado is not None:
+                    return nao_modificado
         proc = self.get_object()
         if request.method == 'GET':
             qs = proc.anotacoes.select_related('autor').order_by('created_at')
-            return Response(AnotacaoSerializer(qs, many=True).data)
+            return Response(AnotacaoSerializer(qs, many=True).data, headers=headers)
         texto = (request.data.get('texto') or '').strip()
         if not texto: return Response({"texto": ["Este campo é obrigatório."]}, status=400)
-        from core.models import Anotacao
         a = Anotacao.objects.create(processo=proc, autor=request.user, texto=texto)
         return Response(AnotacaoSerializer(a).data, status=201)
 
@@ -521,6 +432,32 @@ class ProcessoViewSet(viewsets.ModelViewSet):
         except PermissionError as e: return Response({"detail": str(e)}, status=403)
         except ValueError as e: return Response({"detail": str(e)}, status=400)
 
+    MAX_TRANSICAO_LOTE = 500
+
+    @action(detail=False, methods=['post'], url_path='transicionar-lote')
+    def transicionar_lote(self, request):
+        """
+        Aplica a mesma transição a vários processos: {"ids": [...], "destino": ..., "observacao": ...}.
+        Responde com os ids atualizados e as falhas individuais (os demais seguem).
+        """
+        ids = request.data.get('ids')
+        destino = request.data.get('destino')
+        observacao = request.data.get('observacao') or ''
+        if not destino: return Response({"destino": ["Obrigatório"]}, status=400)
+        if not isinstance(ids, list) or not ids:
+            return Response({"ids": ["Informe uma lista de ids."]}, status=400)
+        if len(ids) > self.MAX_TRANSICAO_LOTE:
+            return Response({"ids": [f"Máximo de {self.MAX_TRANSICAO_LOTE} processos por lote."]}, status=400)
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            return Response({"ids": ["Os ids devem ser inteiros."]}, status=400)
+
+        resultado = workflow_service.transicionar_lote(
+            ids, destino, request.user, observacao, queryset=self.get_queryset().select_related(None)
+        )
+        return Response({"ok": not resultado["falhas"], "status": destino, **resultado})
+
 
 
 
@@ -537,6 +474,20 @@ class FeriadoViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = FeriadoSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+class TarefaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Acompanhamento das tarefas assíncronas (ex.: submissão de processo).
+    O frontend consulta /tarefas/{id}/ até o status ser CONCLUIDA ou FALHOU.
+    """
+    serializer_class = TarefaSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = Tarefa.objects.all()
+        if not self.request.user.is_staff:
+            qs = qs.filter(processo__solicitante=self.request.user)
+        return qs.order_by('-created_at')
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     """
     View para ler e atualizar o perfil do usuário logado.
@@ -572,70 +523,78 @@ class CalculoPreviewAPIView(APIView):
             return [self._decimals_to_primitives(v) for v in obj]
         return obj
 
-    def post(self, request, *args, **kwargs):
-        serializer = CalculoPreviewSerializer(data=request.data)
-        if not serializer.is_valid():
-            logger.debug('CalculoPreviewSerializer inválido: %s', serializer.errors)
-            print('CalculoPreviewSerializer inválido:', serializer.errors)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    def _montar_preview(self, data, parametros=None, distancia_metros=None):
+        """
+        Calcula diárias + deslocamento de um cenário já validado.
+        `distancia_metros` pode vir pré-resolvida (ou como CalculoServiceError) no modo em lote.
+        """
+        # monta kwargs opcionais apenas com os campos realmente presentes (None é ok)
+        # monta kwargs opcionais para diárias
+        optional_kwargs = {}
+        for k in ('num_com_pernoite', 'num_sem_pernoite', 'num_meia_diaria', 'regiao_diaria'):
+            if k in data:
+                optional_kwargs[k] = data.get(k)
+
+        # cálculo das diárias (sempre)
+        detalhes_diarias = calcular_valor_diarias(
+            destino=data['destino'],
+            data_saida=data['data_saida'],
+            data_retorno=data['data_retorno'],
+            parametros=parametros,
+            **optional_kwargs
+        )
+
+        meio_transporte = data.get('meio_transporte')
 
-        data = serializer.validated_data
+        # tenta calcular deslocamento (distância + preco)
         try:
-            # monta kwargs opcionais apenas com os campos realmente presentes (None é ok)
-            # monta kwargs opcionais para diárias
-            optional_kwargs = {}
-            for k in ('num_com_pernoite', 'num_sem_pernoite', 'num_meia_diaria', 'regiao_diaria'):
-                if k in data:
-                    optional_kwargs[k] = data.get(k)
-
-            # cálculo das diárias (sempre)
-            detalhes_diarias = calcular_valor_diarias(
+            if isinstance(distancia_metros, CalculoServiceError):
+                raise distancia_metros
+            detalhes_deslocamento = calcular_valor_deslocamento(
                 destino=data['destino'],
                 data_saida=data['data_saida'],
                 data_retorno=data['data_retorno'],
-                **optional_kwargs
+                parametros=parametros,
+                distancia_metros=distancia_metros,
             )
+        except CalculoServiceError as e:
+            logger.debug('Erro ao calcular deslocamento: %s', str(e))
+            # fallback com zeros — mas manter a resposta padronizada
+            detalhes_deslocamento = {
+                "valor_deslocamento": Decimal('0'),
+                "distancia_km": Decimal('0'),
+                "preco_gas_usado": Decimal('0'),
+            }
 
-            meio_transporte = data.get('meio_transporte')
+        # se não for veículo próprio, manter distancia e preco, mas zerar o valor do pagamento
+        if meio_transporte != 'VEICULO_PROPRIO':
+            # mantemos distancia_km e preco_gas_usado para exibição, mas valor_deslocamento = 0
+            detalhes_deslocamento['valor_deslocamento'] = Decimal('0')
 
-            # tenta calcular deslocamento (distância + preco)
-            try:
-                detalhes_deslocamento = calcular_valor_deslocamento(
-                    destino=data['destino'],
-                    data_saida=data['data_saida'],
-                    data_retorno=data['data_retorno'],
-                    # passe outros parâmetros se a função exigir
-                )
-            except CalculoServiceError as e:
-                logger.debug('Erro ao calcular deslocamento: %s', str(e))
-                # fallback com zeros — mas manter a resposta padronizada
-                detalhes_deslocamento = {
-                    "valor_deslocamento": Decimal('0'),
-                    "distancia_km": Decimal('0'),
-                    "preco_gas_usado": Decimal('0'),
-                }
-
-            # se não for veículo próprio, manter distancia e preco, mas zerar o valor do pagamento
-            if meio_transporte != 'VEICULO_PROPRIO':
-                # mantemos distancia_km e preco_gas_usado para exibição, mas valor_deslocamento = 0
-                detalhes_deslocamento['valor_deslocamento'] = Decimal('0')
-
-            # Normaliza Decimals -> floats (sua função já faz isso)
-            detalhes_diarias_norm = self._decimals_to_primitives(detalhes_diarias)
-            detalhes_deslocamento_norm = self._decimals_to_primitives(detalhes_deslocamento)
-
-            total_empenhar = (
-                (detalhes_diarias_norm.get('valor_total_diarias') or 0) +
-                (detalhes_deslocamento_norm.get('valor_deslocamento') or 0)
-            )
+        # Normaliza Decimals -> floats (sua função já faz isso)
+        detalhes_diarias_norm = self._decimals_to_primitives(detalhes_diarias)
+        detalhes_deslocamento_norm = self._decimals_to_primitives(detalhes_deslocamento)
 
-            response_data = {
-                'calculo_diarias': detalhes_diarias_norm,
-                'calculo_deslocamento': detalhes_deslocamento_norm,
-                'total_empenhar': total_empenhar
-            }
+        total_empenhar = (
+            (detalhes_diarias_norm.get('valor_total_diarias') or 0) +
+            (detalhes_deslocamento_norm.get('valor_deslocamento') or 0)
+        )
+
+        return {
+            'calculo_diarias': detalhes_diarias_norm,
+            'calculo_deslocamento': detalhes_deslocamento_norm,
+            'total_empenhar': total_empenhar
+        }
 
+    def post(self, request, *args, **kwargs):
+        serializer = CalculoPreviewSerializer(data=request.data)
+        if not serializer.is_valid():
+            logger.debug('CalculoPreviewSerializer inválido: %s', serializer.errors)
+            print('CalculoPreviewSerializer inválido:', serializer.errors)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            response_data = self._montar_preview(serializer.validated_data)
             return Response(response_data, status=status.HTTP_200_OK)
 
         except CalculoServiceError as e:
@@ -648,6 +607,47 @@ class CalculoPreviewAPIView(APIView):
             return Response({'error': 'Erro interno no servidor ao calcular preview.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class CalculoPreviewLoteAPIView(CalculoPreviewAPIView):
+    """
+    Preview de vários cenários numa única requisição.
+    Aceita uma lista de cenários (mesmo formato de /calcular-preview/) ou
+    {"cenarios": [...]} e responde uma lista na mesma ordem. Os parâmetros do
+    sistema são carregados uma vez e as rotas dos destinos distintos são
+    consultadas em paralelo.
+    """
+    MAX_CENARIOS = 50
+
+    def post(self, request, *args, **kwargs):
+        cenarios = request.data.get('cenarios') if isinstance(request.data, dict) else request.data
+        if not isinstance(cenarios, list) or not cenarios:
+            return Response({'error': 'Envie uma lista de cenários.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(cenarios) > self.MAX_CENARIOS:
+            return Response(
+                {'error': f'Máximo de {self.MAX_CENARIOS} cenários por requisição.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = CalculoPreviewSerializer(data=cenarios, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            parametros = ParametrosSistema.current()
+            distancias = calculos_service.obter_distancias_metros(
+                {c['destino'] for c in serializer.validated_data}
+            )
+            resultados = []
+            for cenario in serializer.validated_data:
+                try:
+                    resultados.append(self._montar_preview(cenario, parametros, distancias[cenario['destino']]))
+                except CalculoServiceError as e:
+                    resultados.append({'error': str(e)})
+            return Response(resultados, status=status.HTTP_200_OK)
+        except Exception:
+            logger.exception('Erro inesperado em CalculoPreviewLoteAPIView')
+            return Response({'error': 'Erro interno no servidor ao calcular preview.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class ConfigDataView(APIView):
     """
     Endpoint que fornece dados de configuração essenciais para o frontend.
@@ -658,21 +658,15 @@ class ConfigDataView(APIView):
         # 1. Busca o valor da UPM dos parâmetros do sistema
         valor_upm = Decimal('0.00')
         try:
-            parametros = ParametrosSistema.objects.first()
+            parametros = ParametrosSistema.current()
             if parametros:
                 valor_upm = parametros.valor_upm
         except Exception:
             # Se algo der errado, continua com o valor padrão para não quebrar o frontend
             pass
 
-        # 2. Lista estática de capitais do Brasil para a lógica de inferência de região
-        capitais_brasil = [
-            "aracaju", "belém", "belo horizonte", "boa vista", "brasília", "campo grande",
-            "cuiabá", "fortaleza", "goiânia", "joão pessoa",
-            "macapá", "maceió", "manaus", "natal", "palmas", "porto alegre", "porto velho",
-            "recife", "rio branco", "rio de janeiro", "salvador", "são luís", "são paulo",
-            "teresina", "vitória"
-        ]
+        # 2. Capitais do Brasil para a lógica de inferência de região (mesmo índice do backend)
+        capitais_brasil = list(CAPITAIS_BRASIL)
 
         # 3. Monta e retorna a resposta
         config_data = {
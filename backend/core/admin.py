@@ -1,6 +1,6 @@
 # backend/core/admin.py
 from django.contrib import admin
-from .models import Processo, ParametrosSistema, Feriado, ProcessoHistorico, Documento, Profile, Role
+from .models import Processo, ParametrosSistema, Feriado, ProcessoHistorico, Documento, Profile, Role, Tarefa, AnexoPendente, DistanciaRota, SequenciaProcesso, EmailPendente, Notificacao
 
 @admin.register(Role)
 class RoleAdmin(admin.ModelAdmin):
@@ -57,6 +57,38 @@ class FeriadoAdmin(admin.ModelAdmin):
     list_display = ('data', 'descricao')
     ordering = ('data',)
 
+class AnexoPendenteInline(admin.TabularInline):
+    model = AnexoPendente
+    extra = 0
+    readonly_fields = ('nome_arquivo', 'content_type', 'arquivo', 'created_at')
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'processo', 'status', 'etapa_atual', 'tentativas', 'executar_apos', 'updated_at')
+    list_filter = ('tipo', 'status')
+    readonly_fields = ('created_at', 'updated_at', 'iniciada_em')
+    inlines = [AnexoPendenteInline]
+
+@admin.register(EmailPendente)
+class EmailPendenteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'processo', 'evento', 'status', 'tentativas', 'executar_apos', 'enviado_em')
+    list_filter = ('status', 'evento')
+    readonly_fields = ('message_id', 'created_at', 'enviado_em', 'iniciado_em')
+
+@admin.register(Notificacao)
+class NotificacaoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'destinatario', 'processo', 'status_anterior', 'status_novo', 'resumo', 'created_at')
+    search_fields = ('destinatario',)
+
+@admin.register(DistanciaRota)
+class DistanciaRotaAdmin(admin.ModelAdmin):
+    list_display = ('origem', 'destino', 'distancia_metros', 'atualizado_em')
+    search_fields = ('destino',)
+
+@admin.register(SequenciaProcesso)
+class SequenciaProcessoAdmin(admin.ModelAdmin):
+    list_display = ('ano', 'ultimo_numero')
+
 # Registrando os outros modelos para simples visualização
 admin.site.register(Documento)
 admin.site.register(ProcessoHistorico)
\ No newline at end of file
@@ -6,6 +6,9 @@ class CoreConfig(AppConfig):
     name = 'core'
 
     def ready(self):
+        import core.checks
         import core.signals
+        from core.services import template_service
+        template_service.carregar_template_padrao()
 
 
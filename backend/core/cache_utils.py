@@ -0,0 +1,100 @@
+# backend/core/cache_utils.py
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+_MISSING = object()
+
+# Validade da camada em memória do processo na frente dos caches versionados.
+# Limita por quanto tempo um processo segue com o valor antigo quando a troca de
+# versão não chega até ele (cache local por processo, UPDATE direto no banco...).
+MEMORIA_TTL = 60
+
+
+class LRUCache:
+    """
+    Cache LRU em memória do processo, thread-safe, com TTL opcional (segundos).
+    Usado como primeira camada na frente dos caches persistidos no banco.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Remove as entradas cujo (chave, valor) satisfaz `predicate`."""
+        with self._lock:
+            for key in [k for k, (v, _) in self._data.items() if predicate(k, v)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def cache_compartilhado() -> bool:
+    """False quando o cache default vive em cada processo (LocMem): os contadores de versão não chegam aos demais."""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+# --- Contadores de versão no cache do Django ---
+# Cada "namespace" cacheado tem um contador; invalidar = incrementar. Com um
+# backend de cache compartilhado (Redis, banco...) todos os workers enxergam a
+# nova versão na próxima leitura, sem polling ao banco.
+
+def _chave_versao(nome):
+    return f"versao:{nome}"
+
+def _versao_inicial():
+    # baseada no relógio: se a chave for despejada do cache, a nova versão
+    # nunca coincide com uma versão antiga ainda guardada em memória
+    return int(time.time() * 1000)
+
+def get_versao(nome):
+    chave = _chave_versao(nome)
+    versao = cache.get(chave)
+    if versao is None:
+        cache.add(chave, _versao_inicial(), timeout=None)
+        versao = cache.get(chave)
+    return versao
+
+def incrementar_versao(nome):
+    chave = _chave_versao(nome)
+    try:
+        return cache.incr(chave)
+    except ValueError:
+        versao = _versao_inicial()
+        cache.set(chave, versao, timeout=None)
+        return versao
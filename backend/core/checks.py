@@ -0,0 +1,38 @@
+# backend/core/checks.py
+from django.core.checks import Tags, Warning, register
+
+
+@register()
+def verificar_workflow(app_configs, **kwargs):
+    """Expõe em `manage.py check` as inconsistências do grafo de status do workflow."""
+    from core.models import Processo, STATUS_ACAO_POR_PERFIL
+    from core.services.workflow_service import MAQUINA
+
+    # CORRECAO (PC devolvida) ainda não tem saída: o fluxo de correção não foi
+    # definido pelo produto. Retirar daqui quando as transições forem declaradas.
+    sem_saida_conhecidos = [Processo.Status.CORRECAO_PENDENTE]
+    avisos = [Warning(problema, id='core.W001') for problema in MAQUINA.problemas(sem_saida_conhecidos)]
+    for perfil, statuses in STATUS_ACAO_POR_PERFIL.items():
+        if frozenset(statuses) != MAQUINA.status_do_perfil(perfil):
+            avisos.append(Warning(
+                f"STATUS_ACAO_POR_PERFIL['{perfil}'] difere dos status em que o perfil atua no workflow.",
+                hint=f"Workflow: {sorted(MAQUINA.status_do_perfil(perfil))}",
+                id='core.W002',
+            ))
+    return avisos
+
+
+@register(Tags.caches, deploy=True)
+def verificar_cache_compartilhado(app_configs, **kwargs):
+    """Web e workers (processar_tarefas, enviar_emails...) só enxergam as invalidações uns dos outros com um cache compartilhado."""
+    from core.cache_utils import cache_compartilhado
+
+    if cache_compartilhado():
+        return []
+    return [Warning(
+        "O cache default (LocMemCache) é separado em cada processo: parâmetros, signatários e "
+        "demais caches versionados só se atualizam nos outros workers quando expiram.",
+        hint="Defina DJANGO_CACHE_BACKEND/DJANGO_CACHE_LOCATION com um backend compartilhado "
+             "(Redis, Memcached ou django.core.cache.backends.db.DatabaseCache + createcachetable).",
+        id='core.W003',
+    )]
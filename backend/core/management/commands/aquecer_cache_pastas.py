@@ -0,0 +1,23 @@
+# backend/core/management/commands/aquecer_cache_pastas.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.services import google_drive_service
+
+
+class Command(BaseCommand):
+    help = "Pré-carrega o cache de pastas do Drive a partir de uma árvore existente."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--raiz', default=None,
+            help="ID da pasta raiz (padrão: settings.GDRIVE_ROOT_FOLDER_ID)."
+        )
+        parser.add_argument(
+            '--profundidade', type=int, default=3,
+            help="Quantos níveis percorrer (padrão: 3 = ano -> processo -> subpastas)."
+        )
+
+    def handle(self, *args, **options):
+        raiz = options['raiz'] or settings.GDRIVE_ROOT_FOLDER_ID
+        total = google_drive_service.warm_folder_cache(raiz, depth=options['profundidade'])
+        self.stdout.write(self.style.SUCCESS(f"{total} pasta(s) registradas no cache."))
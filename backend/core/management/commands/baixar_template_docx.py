@@ -0,0 +1,27 @@
+# backend/core/management/commands/baixar_template_docx.py
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.services import google_drive_service, template_service
+
+
+class Command(BaseCommand):
+    help = "Exporta o template do Google Docs (GDOC_TEMPLATE_ID) como .docx para DOCX_TEMPLATE_PATH."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--template-id', default=None, help="ID do Google Docs (padrão: settings.GDOC_TEMPLATE_ID).")
+        parser.add_argument('--destino', default=None, help="Arquivo de saída (padrão: settings.DOCX_TEMPLATE_PATH).")
+
+    def handle(self, *args, **options):
+        template_id = options['template_id'] or settings.GDOC_TEMPLATE_ID
+        destino = options['destino'] or settings.DOCX_TEMPLATE_PATH
+        conteudo = google_drive_service.export_file(template_id, template_service.DOCX_MIMETYPE)
+
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        with open(destino, 'wb') as fh:
+            fh.write(conteudo)
+
+        template = template_service.get_template(destino)
+        self.stdout.write(self.style.SUCCESS(
+            f"Template salvo em {destino} ({len(template.tags)} tags: {', '.join(sorted(template.tags))})"
+        ))
@@ -0,0 +1,33 @@
+# backend/core/management/commands/enviar_emails.py
+from django.core.management.base import BaseCommand
+from core.services import email_service
+
+
+class Command(BaseCommand):
+    help = "Worker da caixa de saída de e-mails (EmailPendente), com uma conexão SMTP por lote."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Envia os e-mails disponíveis uma única vez e encerra."
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=10.0,
+            help="Segundos de espera quando a caixa de saída está vazia (padrão: 10)."
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            total = 0
+            while True:
+                enviados = email_service.enviar_pendentes()
+                if not enviados:
+                    break
+                total += enviados
+            self.stdout.write(self.style.SUCCESS(f"{total} e-mail(s) enviado(s)."))
+            return
+        self.stdout.write(f"Worker de e-mails iniciado (intervalo={options['intervalo']}s)...")
+        try:
+            email_service.rodar_envio(intervalo=options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker encerrado.")
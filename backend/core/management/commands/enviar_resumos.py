@@ -0,0 +1,28 @@
+# backend/core/management/commands/enviar_resumos.py
+from django.core.management.base import BaseCommand
+from core.services import notificacoes_service
+
+
+class Command(BaseCommand):
+    help = "Agrupa as notificações de mudança de status em um e-mail de resumo por destinatário."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Gera os resumos pendentes uma única vez e encerra."
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=notificacoes_service.INTERVALO_RESUMO_SEGUNDOS,
+            help="Segundos entre resumos (padrão: NOTIFICACOES_INTERVALO_RESUMO_SEGUNDOS)."
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            total = notificacoes_service.gerar_resumos()
+            self.stdout.write(self.style.SUCCESS(f"{total} resumo(s) enfileirado(s)."))
+            return
+        self.stdout.write(f"Worker de resumos iniciado (intervalo={options['intervalo']}s)...")
+        try:
+            notificacoes_service.rodar_resumos(intervalo=options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker encerrado.")
@@ -0,0 +1,36 @@
+# backend/core/management/commands/processar_tarefas.py
+from django.core.management.base import BaseCommand
+from core.cache_utils import cache_compartilhado
+from core.services import pessoas_service, tarefas_service
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de tarefas assíncronas (Drive e Docs da submissão)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Processa as tarefas disponíveis uma única vez e encerra."
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=2.0,
+            help="Segundos de espera quando a fila está vazia (padrão: 2)."
+        )
+
+    def handle(self, *args, **options):
+        if not cache_compartilhado():
+            self.stderr.write(self.style.WARNING(
+                "Cache local por processo (LocMemCache): edições de parâmetros e signatários "
+                "feitas no web só chegam a este worker quando o cache expira (ver core.W003)."
+            ))
+        # signatários dos documentos já em memória antes da primeira tarefa
+        pessoas_service.aquecer()
+        if options['once']:
+            total = tarefas_service.processar_pendentes()
+            self.stdout.write(self.style.SUCCESS(f"{total} tarefa(s) processada(s)."))
+            return
+        self.stdout.write(f"Worker iniciado; aguardando tarefas (intervalo={options['intervalo']}s)...")
+        try:
+            tarefas_service.rodar_worker(intervalo=options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker encerrado.")
@@ -0,0 +1,37 @@
+# backend/core/management/commands/semear_cache_rotas.py
+from django.core.management.base import BaseCommand
+from core.services.calculos_service import obter_distancia_metros, CalculoServiceError
+
+DESTINOS_FREQUENTES = [
+    "Florianópolis, SC",
+    "Curitiba, PR",
+    "Joinville, SC",
+    "Itajaí, SC",
+    "Balneário Camboriú, SC",
+    "Blumenau, SC",
+    "São Francisco do Sul, SC",
+    "Garuva, SC",
+    "Brasília, DF",
+]
+
+
+class Command(BaseCommand):
+    help = "Pré-carrega o cache de distâncias com os destinos mais frequentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'destinos', nargs='*',
+            help="Destinos a consultar (padrão: lista de destinos frequentes)."
+        )
+        parser.add_argument(
+            '--forcar', action='store_true',
+            help="Consulta a API mesmo que o destino já esteja no cache."
+        )
+
+    def handle(self, *args, **options):
+        for destino in options['destinos'] or DESTINOS_FREQUENTES:
+            try:
+                metros = obter_distancia_metros(destino, forcar=options['forcar'])
+                self.stdout.write(self.style.SUCCESS(f"{destino}: {metros / 1000:.1f} km"))
+            except CalculoServiceError as e:
+                self.stdout.write(self.style.ERROR(f"{destino}: {e}"))
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_anotacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('SUBMISSAO', 'Submissão de Processo')], max_length=30)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('EM_EXECUCAO', 'Em Execução'), ('CONCLUIDA', 'Concluída'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=20)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Dados de entrada da tarefa.')),
+                ('resultado', models.JSONField(blank=True, default=dict, help_text='Dados produzidos pelas etapas já executadas.')),
+                ('etapa_atual', models.CharField(blank=True, max_length=50)),
+                ('etapas_concluidas', models.JSONField(blank=True, default=list)),
+                ('tentativas', models.PositiveIntegerField(default=0)),
+                ('max_tentativas', models.PositiveIntegerField(default=5)),
+                ('executar_apos', models.DateTimeField(default=django.utils.timezone.now)),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_erro', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('processo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tarefas', to='core.processo')),
+            ],
+            options={
+                'verbose_name': 'Tarefa Assíncrona',
+                'verbose_name_plural': 'Tarefas Assíncronas',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnexoPendente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arquivo', models.FileField(upload_to='anexos_pendentes/%Y/%m/')),
+                ('nome_arquivo', models.CharField(max_length=255, verbose_name='Nome do Arquivo')),
+                ('content_type', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tarefa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anexos', to='core.tarefa')),
+            ],
+            options={
+                'verbose_name': 'Anexo Pendente',
+                'verbose_name_plural': 'Anexos Pendentes',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['status', 'executar_apos'], name='tarefa_status_exec_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_tarefa_anexopendente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PastaDriveCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parent_id', models.CharField(max_length=100)),
+                ('nome', models.CharField(max_length=255)),
+                ('folder_id', models.CharField(db_index=True, max_length=100)),
+                ('web_view_link', models.URLField(blank=True, max_length=500)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Cache de Pasta do Drive',
+                'verbose_name_plural': 'Cache de Pastas do Drive',
+                'constraints': [models.UniqueConstraint(fields=('parent_id', 'nome'), name='unique_pasta_drive_parent_nome')],
+            },
+        ),
+    ]
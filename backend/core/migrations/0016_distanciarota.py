@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_pastadrivecache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistanciaRota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origem', models.CharField(max_length=255)),
+                ('destino', models.CharField(max_length=255)),
+                ('distancia_metros', models.PositiveIntegerField(verbose_name='Distância (m, somente ida)')),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Distância de Rota',
+                'verbose_name_plural': 'Distâncias de Rotas',
+                'constraints': [models.UniqueConstraint(fields=('origem', 'destino'), name='unique_distancia_rota')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-16 21:01
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def popular_sequencias(apps, schema_editor):
+    """Inicializa a sequência de cada ano com o maior número já emitido."""
+    Processo = apps.get_model('core', 'Processo')
+    SequenciaProcesso = apps.get_model('core', 'SequenciaProcesso')
+
+    duplicados = list(
+        Processo.objects.filter(ano__isnull=False, numero__isnull=False)
+        .values('ano', 'numero').annotate(total=Count('id')).filter(total__gt=1)
+    )
+    if duplicados:
+        lista = ", ".join(f"{d['numero']}-{d['ano']} ({d['total']}x)" for d in duplicados)
+        raise RuntimeError(
+            f"Existem processos com número repetido no mesmo ano: {lista}. "
+            "Corrija a numeração antes de aplicar a restrição unique (ano, numero)."
+        )
+
+    for row in Processo.objects.filter(ano__isnull=False).values('ano').annotate(ultimo=Max('numero')):
+        SequenciaProcesso.objects.update_or_create(ano=row['ano'], defaults={'ultimo_numero': row['ultimo'] or 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_distanciarota'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaProcesso',
+            fields=[
+                ('ano', models.PositiveIntegerField(primary_key=True, serialize=False, verbose_name='Ano')),
+                ('ultimo_numero', models.PositiveIntegerField(default=0, verbose_name='Último Número Emitido')),
+            ],
+            options={
+                'verbose_name': 'Sequência de Processos',
+                'verbose_name_plural': 'Sequências de Processos',
+            },
+        ),
+        migrations.RunPython(popular_sequencias, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='processo',
+            constraint=models.UniqueConstraint(fields=('ano', 'numero'), name='unique_processo_ano_numero'),
+        ),
+    ]
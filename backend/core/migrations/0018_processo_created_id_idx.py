@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-16 21:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_sequenciaprocesso'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['-created_at', '-id'], name='processo_created_id_idx'),
+        ),
+    ]
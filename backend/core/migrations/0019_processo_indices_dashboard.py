@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-16 21:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_processo_created_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='processo',
+            name='solicitante',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='solicitacoes', to=settings.AUTH_USER_MODEL, verbose_name='Solicitante'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['solicitante', 'status', '-created_at'], name='processo_solic_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['status', '-created_at'], name='processo_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(condition=models.Q(('status__in', ('ARQUIVADO', 'INDEFERIDO', 'CANCELADO')), _negated=True), fields=['solicitante', '-created_at'], name='processo_solic_ativos_idx'),
+        ),
+    ]
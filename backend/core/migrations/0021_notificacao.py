@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-16 21:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_emailpendente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notificacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destinatario', models.EmailField(max_length=254)),
+                ('status_anterior', models.CharField(choices=[('RASCUNHO', 'Rascunho'), ('ANALISE_ADMIN', 'Aguardando Análise Administrativa'), ('AG_ASS_SOL', 'Aguardando Assinaturas (Solicitação)'), ('AG_INSCRICAO', 'Aguardando Comprovante de Inscrição'), ('AG_EMPENHO', 'Aguardando Empenho'), ('AG_PAGAMENTO', 'Aguardando Pagamento'), ('AG_PC', 'Aguardando Prestação de Contas'), ('PC_ANALISE', 'PC em Análise (Controle Interno)'), ('AG_ASS_PC', 'Aguardando Assinaturas (PC)'), ('PC_ANALISE_CONT', 'PC em Análise (Contabilidade)'), ('ARQUIVADO', 'Processo Arquivado'), ('CORRECAO', 'Correção Pendente'), ('INDEFERIDO', 'Indeferido'), ('CANCELADO', 'Cancelado')], max_length=20)),
+                ('status_novo', models.CharField(choices=[('RASCUNHO', 'Rascunho'), ('ANALISE_ADMIN', 'Aguardando Análise Administrativa'), ('AG_ASS_SOL', 'Aguardando Assinaturas (Solicitação)'), ('AG_INSCRICAO', 'Aguardando Comprovante de Inscrição'), ('AG_EMPENHO', 'Aguardando Empenho'), ('AG_PAGAMENTO', 'Aguardando Pagamento'), ('AG_PC', 'Aguardando Prestação de Contas'), ('PC_ANALISE', 'PC em Análise (Controle Interno)'), ('AG_ASS_PC', 'Aguardando Assinaturas (PC)'), ('PC_ANALISE_CONT', 'PC em Análise (Contabilidade)'), ('ARQUIVADO', 'Processo Arquivado'), ('CORRECAO', 'Correção Pendente'), ('INDEFERIDO', 'Indeferido'), ('CANCELADO', 'Cancelado')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificacoes', to='core.processo')),
+                ('resumo', models.ForeignKey(blank=True, help_text='E-mail de resumo em que a notificação foi incluída (vazio = pendente).', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notificacoes', to='core.emailpendente')),
+            ],
+            options={
+                'verbose_name': 'Notificação',
+                'verbose_name_plural': 'Notificações',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('resumo__isnull', True)), fields=['destinatario'], name='notificacao_pendente_idx')],
+            },
+        ),
+    ]
@@ -1,6 +1,10 @@
 # backend/core/models.py
 from django.db import models
 from django.conf import settings 
+from django.utils import timezone
+from django.core.cache import cache
+
+from core.cache_utils import LRUCache, MEMORIA_TTL
 
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
@@ -54,6 +58,10 @@ class ParametrosSistema(models.Model):
         help_text="Preço médio do litro da gasolina para cálculo de deslocamento."
     )
 
+    CACHE_NAMESPACE = 'parametros_sistema'
+    # curto: com cache local por processo (LocMem) é o que limita a defasagem entre workers
+    CACHE_TIMEOUT = 300
+
     class Meta:
         verbose_name = "Parâmetro do Sistema"
         verbose_name_plural = "Parâmetros do Sistema"
@@ -61,6 +69,34 @@ class ParametrosSistema(models.Model):
     def __str__(self):
         return f"Configurações Atuais do Sistema"
 
+    @classmethod
+    def current(cls):
+        """
+        Retorna a linha de parâmetros (ou None) sem ir ao banco a cada chamada.
+        Camadas: memória do processo (MEMORIA_TTL) -> cache do Django -> banco,
+        todas presas a um contador de versão que os signals de post_save/post_delete
+        incrementam.
+        """
+        from core.cache_utils import get_versao
+        versao = get_versao(cls.CACHE_NAMESPACE)
+        local = _parametros_em_memoria.get(versao, _AUSENTE)
+        if local is not _AUSENTE:
+            return local
+
+        chave = f"{cls.CACHE_NAMESPACE}:{versao}"
+        parametros = cache.get(chave)
+        if parametros is None:
+            parametros = cls.objects.first()
+            if parametros is not None:
+                cache.set(chave, parametros, timeout=cls.CACHE_TIMEOUT)
+        _parametros_em_memoria.set(versao, parametros)
+        return parametros
+
+
+# versão -> instância de ParametrosSistema (ou None) mantida em memória pelo processo
+_parametros_em_memoria = LRUCache(maxsize=1, ttl=MEMORIA_TTL)
+_AUSENTE = object()
+
 
 class Feriado(models.Model):
     """
@@ -77,6 +113,11 @@ class Feriado(models.Model):
         return f"{self.data.strftime('%d/%m/%Y')} - {self.descricao}"
 
 
+# Status considerados "Finalizados" (fora das filas de trabalho). Ficam em nível
+# de módulo porque também definem o índice parcial de Processo.Meta.
+STATUS_FINALIZADOS = ('ARQUIVADO', 'INDEFERIDO', 'CANCELADO')
+
+
 class Processo(models.Model):
     """
     O modelo central que representa uma solicitação de diária e todo o seu ciclo de vida.
@@ -109,7 +150,8 @@ class Processo(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.PROTECT,
         related_name='solicitacoes',
-        verbose_name="Solicitante"
+        verbose_name="Solicitante",
+        db_index=False,  # coberto por processo_solic_status_idx (solicitante é o prefixo)
     )
     status = models.CharField(
         max_length=20,
@@ -194,6 +236,26 @@ class Processo(models.Model):
         verbose_name = "Processo de Diária"
         verbose_name_plural = "Processos de Diárias"
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['ano', 'numero'], name='unique_processo_ano_numero'),
+        ]
+        indexes = [
+            # paginação por cursor do dashboard (ver api.views.DashboardCursorPagination)
+            models.Index(fields=['-created_at', '-id'], name='processo_created_id_idx'),
+            # caminhos de acesso de ProcessoViewSet.get_queryset:
+            # solicitante (+ status finalizados) ordenado por data
+            models.Index(fields=['solicitante', 'status', '-created_at'], name='processo_solic_status_idx'),
+            # operadores filtrando pela fila do perfil (status__in)
+            models.Index(fields=['status', '-created_at'], name='processo_status_created_idx'),
+            # visão "em andamento" do solicitante: só as linhas não finalizadas entram no índice.
+            # O SQLite só casa índices parciais com literais (o Django envia parâmetros), então
+            # lá a consulta cai em processo_solic_status_idx; no PostgreSQL este é o escolhido.
+            models.Index(
+                fields=['solicitante', '-created_at'],
+                condition=~models.Q(status__in=STATUS_FINALIZADOS),
+                name='processo_solic_ativos_idx',
+            ),
+        ]
 
     def __str__(self):
         if getattr(self, 'numero', None) and getattr(self, 'ano', None):
@@ -201,6 +263,40 @@ class Processo(models.Model):
         return f"Processo #{self.id} - {self.solicitante.get_full_name()}"
 
 
+# Status que exigem ação de cada perfil de operador
+STATUS_ACAO_POR_PERFIL = {
+    'controle_interno': (Processo.Status.ANALISE_ADMIN, Processo.Status.PC_EM_ANALISE),
+    'assinatura': (Processo.Status.AGUARDANDO_ASSINATURAS_SOLICITACAO, Processo.Status.AGUARDANDO_ASSINATURAS_PC),
+    'contabilidade': (Processo.Status.AGUARDANDO_EMPENHO, Processo.Status.PC_ANALISE_CONTABILIDADE),
+    'pagamento': (Processo.Status.AGUARDANDO_PAGAMENTO,),
+}
+
+
+class SequenciaProcesso(models.Model):
+    """
+    Último número de processo emitido em cada ano. O incremento é feito com a
+    linha bloqueada (select_for_update) na mesma transação que grava o Processo,
+    então a numeração não se repete entre workers e não deixa lacunas em rollback.
+    """
+    ano = models.PositiveIntegerField("Ano", primary_key=True)
+    ultimo_numero = models.PositiveIntegerField("Último Número Emitido", default=0)
+
+    class Meta:
+        verbose_name = "Sequência de Processos"
+        verbose_name_plural = "Sequências de Processos"
+
+    def __str__(self):
+        return f"{self.ano}: {self.ultimo_numero}"
+
+    @classmethod
+    def proximo_numero(cls, ano: int) -> int:
+        """Reserva o próximo número do ano. Deve ser chamado dentro de transaction.atomic()."""
+        cls.objects.get_or_create(ano=ano)
+        seq = cls.objects.select_for_update().get(ano=ano)
+        seq.ultimo_numero += 1
+        seq.save(update_fields=['ultimo_numero'])
+        return seq.ultimo_numero
+
 
 class ProcessoHistorico(models.Model):
     """
@@ -269,3 +365,185 @@ class Anotacao(models.Model):
 
     def __str__(self):
         return f"Anotação de {self.autor_id} em {self.processo_id}"
+
+
+class Tarefa(models.Model):
+    """
+    Fila de tarefas assíncronas persistida no banco. Cada tarefa executa uma
+    sequência de etapas (ver `core.services.tarefas_service`) pelo comando
+    `processar_tarefas`; em caso de falha é reagendada a partir da etapa que falhou.
+    """
+    class Tipo(models.TextChoices):
+        SUBMISSAO = 'SUBMISSAO', 'Submissão de Processo'
+
+    class Status(models.TextChoices):
+        PENDENTE = 'PENDENTE', 'Pendente'
+        EM_EXECUCAO = 'EM_EXECUCAO', 'Em Execução'
+        CONCLUIDA = 'CONCLUIDA', 'Concluída'
+        FALHOU = 'FALHOU', 'Falhou'
+
+    tipo = models.CharField(max_length=30, choices=Tipo.choices)
+    processo = models.ForeignKey(
+        Processo, on_delete=models.CASCADE, related_name='tarefas', null=True, blank=True
+    )
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDENTE)
+    payload = models.JSONField(default=dict, blank=True, help_text="Dados de entrada da tarefa.")
+    resultado = models.JSONField(default=dict, blank=True, help_text="Dados produzidos pelas etapas já executadas.")
+    etapa_atual = models.CharField(max_length=50, blank=True)
+    etapas_concluidas = models.JSONField(default=list, blank=True)
+    tentativas = models.PositiveIntegerField(default=0)
+    max_tentativas = models.PositiveIntegerField(default=5)
+    executar_apos = models.DateTimeField(default=timezone.now)
+    iniciada_em = models.DateTimeField(null=True, blank=True)
+    ultimo_erro = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Tarefa Assíncrona"
+        verbose_name_plural = "Tarefas Assíncronas"
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'executar_apos'], name='tarefa_status_exec_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tarefa #{self.id} ({self.tipo}) - {self.status}"
+
+
+class EmailPendente(models.Model):
+    """
+    Caixa de saída de e-mails. A mensagem é gravada na mesma transação que a
+    mudança de status que a originou e enviada depois pelo comando
+    `enviar_emails`, que reaproveita uma única conexão SMTP por lote.
+    (processo, evento) é único: reenfileirar o mesmo evento não duplica o envio.
+    """
+    class Status(models.TextChoices):
+        PENDENTE = 'PENDENTE', 'Pendente'
+        ENVIANDO = 'ENVIANDO', 'Enviando'
+        ENVIADO = 'ENVIADO', 'Enviado'
+        FALHOU = 'FALHOU', 'Falhou'
+
+    processo = models.ForeignKey(
+        Processo, on_delete=models.CASCADE, related_name='emails', null=True, blank=True
+    )
+    evento = models.CharField(max_length=100, help_text="Ex.: 'processo_criado'.")
+    assunto = models.CharField(max_length=255)
+    corpo = models.TextField()
+    destinatarios = models.JSONField(default=list)
+    copia = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    message_id = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDENTE)
+    tentativas = models.PositiveIntegerField(default=0)
+    max_tentativas = models.PositiveIntegerField(default=5)
+    executar_apos = models.DateTimeField(default=timezone.now)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+    ultimo_erro = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "E-mail Pendente"
+        verbose_name_plural = "Caixa de Saída de E-mails"
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['processo', 'evento'], name='unique_email_processo_evento'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'executar_apos'], name='email_status_exec_idx'),
+        ]
+
+    def __str__(self):
+        return f"E-mail #{self.id} ({self.evento}) - {self.status}"
+
+
+class Notificacao(models.Model):
+    """
+    Aviso de mudança de status para um destinatário. As notificações pendentes
+    são agrupadas periodicamente em um único e-mail de resumo por pessoa
+    (comando `enviar_resumos`), em vez de um e-mail por transição.
+    """
+    destinatario = models.EmailField()
+    processo = models.ForeignKey(Processo, on_delete=models.CASCADE, related_name='notificacoes')
+    status_anterior = models.CharField(max_length=20, choices=Processo.Status.choices)
+    status_novo = models.CharField(max_length=20, choices=Processo.Status.choices)
+    resumo = models.ForeignKey(
+        EmailPendente, on_delete=models.SET_NULL, null=True, blank=True, related_name='notificacoes',
+        help_text="E-mail de resumo em que a notificação foi incluída (vazio = pendente).",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Notificação"
+        verbose_name_plural = "Notificações"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['destinatario'], condition=models.Q(resumo__isnull=True), name='notificacao_pendente_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notificação #{self.id} para {self.destinatario} ({self.status_novo})"
+
+
+class AnexoPendente(models.Model):
+    """
+    Anexo recebido na submissão e mantido em disco até que a tarefa
+    assíncrona faça o upload para o Google Drive.
+    """
+    tarefa = models.ForeignKey(Tarefa, on_delete=models.CASCADE, related_name='anexos')
+    arquivo = models.FileField(upload_to='anexos_pendentes/%Y/%m/')
+    nome_arquivo = models.CharField("Nome do Arquivo", max_length=255)
+    content_type = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Anexo Pendente"
+        verbose_name_plural = "Anexos Pendentes"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.nome_arquivo} (tarefa {self.tarefa_id})"
+
+
+class PastaDriveCache(models.Model):
+    """
+    Cache persistente de (pasta pai, nome) -> id de pasta no Google Drive,
+    usado por `google_drive_service.ensure_folder` para evitar `files().list`.
+    """
+    parent_id = models.CharField(max_length=100)
+    nome = models.CharField(max_length=255)
+    folder_id = models.CharField(max_length=100, db_index=True)
+    web_view_link = models.URLField(max_length=500, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Cache de Pasta do Drive"
+        verbose_name_plural = "Cache de Pastas do Drive"
+        constraints = [
+            models.UniqueConstraint(fields=['parent_id', 'nome'], name='unique_pasta_drive_parent_nome'),
+        ]
+
+    def __str__(self):
+        return f"{self.nome} ({self.folder_id})"
+
+
+class DistanciaRota(models.Model):
+    """
+    Cache persistente de distâncias (Google Directions) entre origem e destino
+    normalizados, usado por `calculos_service.calcular_valor_deslocamento`.
+    """
+    origem = models.CharField(max_length=255)
+    destino = models.CharField(max_length=255)
+    distancia_metros = models.PositiveIntegerField("Distância (m, somente ida)")
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Distância de Rota"
+        verbose_name_plural = "Distâncias de Rotas"
+        constraints = [
+            models.UniqueConstraint(fields=['origem', 'destino'], name='unique_distancia_rota'),
+        ]
+
+    def __str__(self):
+        return f"{self.origem} -> {self.destino}: {self.distancia_metros / 1000:.1f} km"
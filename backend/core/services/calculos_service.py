@@ -1,51 +1,35 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal, ROUND_HALF_UP
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.conf import settings
-from ..models import ParametrosSistema
-from unicodedata import normalize as _normalize
+from django.utils import timezone
+from ..cache_utils import LRUCache, get_versao, incrementar_versao
+from ..models import ParametrosSistema, DistanciaRota
+from .regioes_service import classificar_regiao, normalizar
 
 # --- Constantes (sem alteração funcional) ---
-CIDADES_GRUPO_1 = ['florianopolis', 'curitiba']
 VALORES_DIARIA_UPM = {
     'grupo_1': {'com_pernoite': Decimal('100.00'), 'sem_pernoite': Decimal('40.00'), 'meia_diaria': Decimal('20.00')},
     'grupo_2': {'com_pernoite': Decimal('200.00'), 'sem_pernoite': Decimal('80.00'), 'meia_diaria': Decimal('0.00')}
 }
 
-# Lista de capitais (usada para inferir região) — mesma lista que o backend devolve via /config/
-CAPITAIS_BRASIL = [
-    "aracaju", "belém", "belo horizonte", "boa vista", "brasília", "campo grande",
-    "cuiabá", "fortaleza", "goiânia", "joão pessoa", "macapá", "maceió", "manaus",
-    "natal", "palmas", "porto alegre", "porto velho", "recife", "rio branco",
-    "rio de janeiro", "salvador", "são luís", "são paulo", "teresina", "vitória"
-]
+ORIGEM_PADRAO = "Câmara Municipal de Itapoá, SC"
 
-
-class CalculoServiceError(Exception):
-    pass
+# Cache de distâncias: LRU em memória na frente da tabela DistanciaRota. As
+# chaves levam um contador de versão, trocado quando uma rota é corrigida ou
+# removida (ver core.signals), para que todos os processos releiam o banco.
+ROTAS_CACHE_TTL = timedelta(days=getattr(settings, "ROTAS_CACHE_TTL_DIAS", 90))
+ROTAS_CACHE_NAMESPACE = 'rotas'
+_rotas_cache = LRUCache(maxsize=getattr(settings, "ROTAS_CACHE_TAMANHO", 512), ttl=3600)
 
 
-def _normalize_city(s: str) -> str:
-    if not s:
-        return ''
-    return _normalize('NFD', s).encode('ascii', 'ignore').decode('ascii').lower().strip()
+def invalidar_rotas():
+    incrementar_versao(ROTAS_CACHE_NAMESPACE)
 
 
-def _infer_region_from_destino(destino: str) -> str:
-    """
-    Retorna 'LOCAL' ou 'OUTROS' baseado no nome da cidade presente em `destino`.
-    regras:
-      - se cidade é Florianópolis/Curitiba -> LOCAL (grupo_1)
-      - se cidade é capital brasileira (exceto as duas acima) -> OUTROS
-      - senão -> LOCAL (interior)
-    """
-    city = destino.split(',')[0].strip()
-    normalized = _normalize_city(city)
-    if normalized in [c.lower() for c in CIDADES_GRUPO_1]:
-        return 'LOCAL'
-    if normalized in [_normalize_city(c) for c in CAPITAIS_BRASIL]:
-        return 'OUTROS'
-    return 'LOCAL'
+class CalculoServiceError(Exception):
+    pass
 
 
 def calcular_valor_diarias(
@@ -56,6 +40,7 @@ def calcular_valor_diarias(
     num_sem_pernoite: int = None,
     num_meia_diaria: int = None,
     regiao_diaria: str = None,  # 'LOCAL' | 'OUTROS' (opcional)
+    parametros: ParametrosSistema = None,
 ) -> dict:
     """
     Calcula o valor das diárias.
@@ -65,7 +50,7 @@ def calcular_valor_diarias(
     Retorna dicionário com Decimal para valores monetários.
     """
     try:
-        parametros = ParametrosSistema.objects.first()
+        parametros = parametros or ParametrosSistema.current()
         if not parametros or parametros.valor_upm is None:
             raise CalculoServiceError("Valor da UPM não cadastrado nos parâmetros do sistema.")
     except ParametrosSistema.DoesNotExist:
@@ -95,7 +80,7 @@ def calcular_valor_diarias(
         except Exception:
             region = None
     if not region:
-        region = _infer_region_from_destino(destino)
+        region = classificar_regiao(destino)
 
     grupo = 'grupo_1' if region == 'LOCAL' else 'grupo_2'
     regras_upm = VALORES_DIARIA_UPM[grupo]
@@ -140,13 +125,131 @@ def calcular_valor_diarias(
     return detalhes
 
 
-def calcular_valor_deslocamento(destino, data_saida=None, data_retorno=None, **kwargs):
+def _chave_rota(texto: str) -> str:
+    """Normaliza origem/destino para a chave do cache (sem acentos, caixa e espaços extras)."""
+    return normalizar(texto.replace(",", ", ")).strip(" ,")
+
+
+def _consultar_distancia_api(destino: str, origem: str = ORIGEM_PADRAO) -> int:
+    """Consulta a Google Directions API e retorna a distância (somente ida) em metros."""
+    api_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', None)
+    if not api_key:
+        raise CalculoServiceError("GOOGLE_MAPS_API_KEY não configurada.")
+
+    url = "https://maps.googleapis.com/maps/api/directions/json"
+    params = {
+        'origin': origem,
+        'destination': destino,
+        'key': api_key,
+        'mode': 'driving',
+        'units': 'metric'
+    }
+    try:
+        resp = requests.get(url, params=params, timeout=10)
+        resp.raise_for_status()
+        data = resp.json()
+    except requests.exceptions.RequestException as e:
+        raise CalculoServiceError(f"Erro de comunicação com a API de Rotas: {e}")
+
+    if data.get('status') == 'OK' and data.get('routes'):
+        try:
+            return int(data['routes'][0]['legs'][0]['distance']['value'])
+        except (KeyError, IndexError, TypeError) as e:
+            raise CalculoServiceError("Resposta inesperada da API de Rotas. O destino é válido? " + str(e))
+    error_message = data.get('error_message') or data.get('status') or 'Unknown error from Google Directions API'
+    raise CalculoServiceError(f"Erro na API de Rotas: {error_message}")
+
+
+def _distancia_em_cache(origem_key: str, destino_key: str):
+    chave = (get_versao(ROTAS_CACHE_NAMESPACE), origem_key, destino_key)
+    metros = _rotas_cache.get(chave)
+    if metros is not None:
+        return metros
+    row = (
+        DistanciaRota.objects
+        .filter(origem=origem_key, destino=destino_key, atualizado_em__gte=timezone.now() - ROTAS_CACHE_TTL)
+        .values_list('distancia_metros', flat=True)
+        .first()
+    )
+    if row is not None:
+        _rotas_cache.set(chave, row)
+    return row
+
+
+def _gravar_distancia(origem_key: str, destino_key: str, metros: int):
+    DistanciaRota.objects.update_or_create(
+        origem=origem_key, destino=destino_key, defaults={'distancia_metros': metros}
+    )
+    # depois de gravar: a atualização de uma rota existente troca a versão
+    _rotas_cache.set((get_versao(ROTAS_CACHE_NAMESPACE), origem_key, destino_key), metros)
+
+
+def obter_distancia_metros(destino: str, origem: str = ORIGEM_PADRAO, forcar: bool = False) -> int:
+    """
+    Distância (somente ida, em metros) entre origem e destino.
+    Consulta o cache (memória -> banco, respeitando ROTAS_CACHE_TTL_DIAS) antes da API.
+    """
+    origem_key, destino_key = _chave_rota(origem), _chave_rota(destino)
+    if not forcar:
+        metros = _distancia_em_cache(origem_key, destino_key)
+        if metros is not None:
+            return metros
+    metros = _consultar_distancia_api(destino, origem)
+    _gravar_distancia(origem_key, destino_key, metros)
+    return metros
+
+
+def obter_distancias_metros(destinos, origem: str = ORIGEM_PADRAO, max_workers: int = 4) -> dict:
+    """
+    Resolve as distâncias de vários destinos de uma vez: deduplica pela chave
+    normalizada, atende o que estiver no cache e consulta a API em paralelo só
+    para o restante. Retorna {destino: metros | CalculoServiceError}.
+    """
+    origem_key = _chave_rota(origem)
+    por_chave = {}
+    for destino in destinos:
+        por_chave.setdefault(_chave_rota(destino), []).append(destino)
+
+    resolvidos = {}
+    faltantes = []
+    for chave, nomes in por_chave.items():
+        metros = _distancia_em_cache(origem_key, chave)
+        if metros is not None:
+            resolvidos[chave] = metros
+        else:
+            faltantes.append((chave, nomes[0]))
+
+    def _consultar(item):
+        chave, destino = item
+        try:
+            return chave, _consultar_distancia_api(destino, origem)
+        except CalculoServiceError as e:
+            return chave, e
+
+    if faltantes:
+        # threads fazem só o HTTP; a gravação no cache (banco) fica na thread da requisição
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(faltantes)))) as pool:
+            for chave, resultado in pool.map(_consultar, faltantes):
+                if not isinstance(resultado, CalculoServiceError):
+                    _gravar_distancia(origem_key, chave, resultado)
+                resolvidos[chave] = resultado
+
+    return {
+        destino: resolvidos[chave]
+        for chave, nomes in por_chave.items()
+        for destino in nomes
+    }
+
+
+def calcular_valor_deslocamento(destino, data_saida=None, data_retorno=None, parametros=None, distancia_metros=None, **kwargs):
     """
     Calcula o valor do deslocamento via Google Directions (ida e volta).
+    A distância vem do cache de rotas sempre que possível; `distancia_metros`
+    (somente ida) pode ser passada quando já foi obtida, como no preview em lote.
     Retorna números primitivos (floats) para serialização JSON.
     """
     try:
-        parametros = ParametrosSistema.objects.first()
+        parametros = parametros or ParametrosSistema.current()
         if not parametros or parametros.preco_medio_gasolina is None:
             raise CalculoServiceError("Preço da gasolina não cadastrado nos parâmetros do sistema.")
 
@@ -157,44 +260,18 @@ def calcular_valor_deslocamento(destino, data_saida=None, data_retorno=None, **k
             "preco_gas_usado": float(preco_gasolina)
         }
 
-        api_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', None)
-        if not api_key:
-            raise CalculoServiceError("GOOGLE_MAPS_API_KEY não configurada.")
-
-        origem = "Câmara Municipal de Itapoá, SC"
-        url = "https://maps.googleapis.com/maps/api/directions/json"
-        params = {
-            'origin': origem,
-            'destination': destino,
-            'key': api_key,
-            'mode': 'driving',
-            'units': 'metric'
-        }
-
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-
-        if data.get('status') == 'OK' and data.get('routes'):
-            try:
-                distancia_metros = data['routes'][0]['legs'][0]['distance']['value']
-                distancia_km = Decimal(distancia_metros) / Decimal(1000)
-                distancia_total_km = distancia_km * 2  # ida e volta
+        if distancia_metros is None:
+            distancia_metros = obter_distancia_metros(destino)
+        distancia_km = Decimal(distancia_metros) / Decimal(1000)
+        distancia_total_km = distancia_km * 2  # ida e volta
 
-                valor = (distancia_total_km / Decimal(10)) * Decimal(preco_gasolina)
+        valor = (distancia_total_km / Decimal(10)) * Decimal(preco_gasolina)
 
-                resultado["valor_deslocamento"] = float(round(valor, 2))
-                resultado["distancia_km"] = float(round(distancia_total_km, 1))
-                resultado["preco_gas_usado"] = float(preco_gasolina)
-                return resultado
-            except (KeyError, IndexError, TypeError) as e:
-                raise CalculoServiceError("Resposta inesperada da API de Rotas. O destino é válido? " + str(e))
-        else:
-            error_message = data.get('error_message') or data.get('status') or 'Unknown error from Google Directions API'
-            raise CalculoServiceError(f"Erro na API de Rotas: {error_message}")
+        resultado["valor_deslocamento"] = float(round(valor, 2))
+        resultado["distancia_km"] = float(round(distancia_total_km, 1))
+        resultado["preco_gas_usado"] = float(preco_gasolina)
+        return resultado
 
-    except requests.exceptions.RequestException as e:
-        raise CalculoServiceError(f"Erro de comunicação com a API de Rotas: {e}")
     except CalculoServiceError:
         raise
     except Exception as e:
@@ -0,0 +1,66 @@
+# backend/core/services/contadores_service.py
+"""
+Contadores do dashboard (badges "12 aguardando sua ação") por perfil ativo.
+
+Uma única consulta `GROUP BY status` no escopo do perfil; os buckets usam os
+mesmos nomes do parâmetro `view` da listagem. O resultado fica no cache por
+perfil (e por usuário, quando o escopo é o do próprio solicitante) e é
+invalidado por um contador de versão sempre que um processo é criado, muda de
+status ou é excluído (receptor em core.signals; transições em lote chamam
+`invalidar` diretamente, já que usam queryset.update()).
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from core.cache_utils import get_versao, incrementar_versao
+from core.models import Processo, STATUS_FINALIZADOS, STATUS_ACAO_POR_PERFIL
+
+CACHE_NAMESPACE = 'contadores_processos'
+CACHE_TIMEOUT = 300
+
+
+def invalidar():
+    """Descarta todos os contadores (após o commit da transação corrente, se houver)."""
+    transaction.on_commit(lambda: incrementar_versao(CACHE_NAMESPACE))
+
+
+def _contar_por_status(qs) -> dict:
+    return dict(qs.order_by().values_list('status').annotate(total=Count('id')))
+
+
+def _calcular(user, perfil: str) -> dict:
+    if perfil in STATUS_ACAO_POR_PERFIL:
+        por_status = _contar_por_status(Processo.objects.all())
+        buckets = {
+            'action_needed': sum(por_status.get(s, 0) for s in STATUS_ACAO_POR_PERFIL[perfil]),
+            'all': sum(por_status.values()),
+        }
+    elif perfil == 'admin_geral':
+        por_status = _contar_por_status(Processo.objects.all())
+        buckets = {'all': sum(por_status.values())}
+    else:
+        # solicitante (e perfis desconhecidos): apenas os próprios processos
+        por_status = _contar_por_status(Processo.objects.filter(solicitante=user))
+        finalizados = sum(por_status.get(s, 0) for s in STATUS_FINALIZADOS)
+        buckets = {'in_progress': sum(por_status.values()) - finalizados}
+        if perfil == 'solicitante':
+            buckets['finished'] = finalizados
+        else:
+            por_status = {s: n for s, n in por_status.items() if s not in STATUS_FINALIZADOS}
+    return {'buckets': buckets, 'por_status': por_status}
+
+
+def contadores(user, perfil: str) -> dict:
+    if perfil in STATUS_ACAO_POR_PERFIL or perfil == 'admin_geral':
+        chave_perfil, escopo = perfil, 'todos'
+    else:
+        # o header é livre: perfis desconhecidos compartilham uma única chave por usuário
+        chave_perfil = 'solicitante' if perfil == 'solicitante' else 'outro'
+        escopo = user.pk
+    chave = f"{CACHE_NAMESPACE}:{get_versao(CACHE_NAMESPACE)}:{chave_perfil}:{escopo}"
+    dados = cache.get(chave)
+    if dados is None:
+        dados = _calcular(user, perfil)
+        cache.set(chave, dados, CACHE_TIMEOUT)
+    return {'perfil': perfil, **dados}
@@ -0,0 +1,89 @@
+# backend/core/services/destinatarios_service.py
+"""
+Diretório de destinatários das notificações por perfil (Role).
+
+O mapa perfil -> e-mails de usuários ativos é montado de uma vez e guardado no
+cache do Django; alterações em Profile.roles, Role, Profile, User ou Group
+trocam a versão (ver core.signals) e o mapa é remontado na próxima leitura.
+Cada perfil é encontrado pelo slug ou pelo nome do Role (ex.: "Controle
+Interno") e, se nenhum Role tiver membros, por um Grupo do Django com o mesmo
+nome. Perfis sem ninguém cadastrado caem na configuração `<PERFIL>_EMAILS` do
+settings (ex.: CONTROLE_INTERNO_EMAILS).
+"""
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from core.cache_utils import get_versao, incrementar_versao
+from core.models import Profile
+
+PERFIS_NOTIFICACAO = ('controle_interno', 'contabilidade', 'assinatura', 'pagamento')
+
+CACHE_NAMESPACE = 'destinatarios'
+CACHE_TIMEOUT = 3600
+
+
+def invalidar():
+    incrementar_versao(CACHE_NAMESPACE)
+
+
+def _chave(texto) -> str:
+    """Slug ou nome ("Controle Interno.") -> chave do mapa ("controle_interno")."""
+    return re.sub(r'[\s-]+', '_', (texto or '').strip().strip('.').strip().lower())
+
+
+def _acumular(mapa, chaves, email):
+    email = (email or '').strip().lower()
+    if email:
+        for chave in chaves:
+            if chave:
+                mapa[chave].add(email)
+
+
+def _montar_mapa() -> dict:
+    # 1) membros de cada Role, pelo slug e pelo nome
+    por_role = defaultdict(set)
+    linhas = (
+        Profile.roles.through.objects
+        .filter(profile__user__is_active=True)
+        .exclude(profile__user__email='')
+        .values_list('role__slug', 'role__name', 'profile__user__email')
+    )
+    for slug, nome, email in linhas:
+        _acumular(por_role, {_chave(slug), _chave(nome)}, email)
+
+    # 2) Grupo do Django com o nome do perfil, para os perfis sem ninguém via Role
+    por_grupo = defaultdict(set)
+    linhas = (
+        get_user_model().groups.through.objects
+        .filter(user__is_active=True)
+        .exclude(user__email='')
+        .values_list('group__name', 'user__email')
+    )
+    for nome, email in linhas:
+        chave = _chave(nome)
+        if chave not in por_role:
+            _acumular(por_grupo, {chave}, email)
+
+    return {chave: sorted(emails) for chave, emails in {**por_grupo, **por_role}.items()}
+
+
+def mapa_emails() -> dict:
+    """{slug do perfil: [e-mails]} de todos os perfis com usuários ativos."""
+    chave = f"{CACHE_NAMESPACE}:{get_versao(CACHE_NAMESPACE)}"
+    mapa = cache.get(chave)
+    if mapa is None:
+        mapa = _montar_mapa()
+        cache.set(chave, mapa, CACHE_TIMEOUT)
+    return mapa
+
+
+def emails_do_perfil(perfil: str) -> list[str]:
+    emails = mapa_emails().get(_chave(perfil))
+    if emails:
+        return list(emails)
+    fallback = getattr(settings, f"{perfil.upper()}_EMAILS", None) or []
+    return sorted({e.strip().lower() for e in fallback if e and e.strip()})
@@ -1,88 +1,76 @@
-from django.core.mail import send_mail, EmailMessage, EmailMultiAlternatives
+# backend/core/services/email_service.py
+"""
+Caixa de saída de e-mails (EmailPendente).
+
+`enfileirar_email` grava a mensagem na mesma transação da mudança que a
+originou; `enviar_pendentes` (comando `enviar_emails`) reserva um lote e o
+envia por uma única conexão SMTP, reagendando as falhas com backoff.
+"""
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
 from email.utils import make_msgid
 import logging
+import time
 
-logger = logging.getLogger(__name__)
-# (novo) para montar links do Drive se vier apenas o ID no Processo
-try:
-    from core.services import google_drive_service
-except Exception:
-    google_drive_service = None
+from core.models import EmailPendente
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_FROM = getattr(settings, "DEFAULT_FROM_EMAIL", None) or "no-reply@example.com"
-EMAIL_DOMAIN = getattr(settings, "EMAIL_DOMAIN", None) or "camaraitapoa.local"
+# --- Caixa de saída (EmailPendente) ---
 
-def _template_exists(path):
-    from django.template import TemplateDoesNotExist
-    from django.template.loader import get_template
-    try:
-        get_template(path)
-        return True
-    except Exception:
-        return False
+BACKOFF_BASE_SEGUNDOS = getattr(settings, "EMAILS_BACKOFF_BASE_SEGUNDOS", 60)
+BACKOFF_MAX_SEGUNDOS = getattr(settings, "EMAILS_BACKOFF_MAX_SEGUNDOS", 3600)
+# e-mail "enviando" há mais tempo que isso é considerado abandonado (worker morreu)
+TIMEOUT_ENVIO_SEGUNDOS = getattr(settings, "EMAILS_TIMEOUT_ENVIO_SEGUNDOS", 600)
+LOTE_ENVIO = getattr(settings, "EMAILS_LOTE_ENVIO", 50)
 
-def _resolve_links(processo, doc_url, folder_url):
+
+def enfileirar_email(processo, evento: str, assunto: str, corpo: str, destinatarios, copia=None,
+                     reply_to_message_id: str | None = None) -> EmailPendente | None:
     """
-    Garante que tenhamos URLs clicáveis para doc/pasta:
-    - Usa os valores passados (preferência)
-    - Se não vierem, tenta resolver a partir dos IDs gravados no processo
+    Grava o e-mail na caixa de saída (use dentro da transação que muda o status).
+    Idempotente por (processo, evento): se já existir, devolve o registro existente.
     """
-    resolved_doc_url = doc_url or ""
-    resolved_folder_url = folder_url or ""
+    to_list = [e for e in dict.fromkeys(destinatarios or []) if e]
+    if not to_list:
+        logger.warning("Sem destinatários para o evento '%s' do processo %s; e-mail não enfileirado.",
+                       evento, getattr(processo, "id", None))
+        return None
 
-    # tentar resolver link da pasta pelo ID
-    if not resolved_folder_url:
-        fid = getattr(processo, "gdrive_folder_id", "") or ""
-        if fid and google_drive_service:
-            try:
-                resolved_folder_url = google_drive_service.get_folder_link(fid) or ""
-            except Exception:
-                pass
-
-    # Doc: só resolvemos se você futuramente armazenar um ID do doc no processo
-    # (gdrive_doc_id). Por ora mantemos vazio se não vier por parâmetro.
-    if not resolved_doc_url:
-        did = getattr(processo, "gdrive_doc_id", "") or ""
-        if did and google_drive_service:
-            try:
-                # não há um get_doc_link pronto; normalmente é o webViewLink do arquivo
-                # se você criar uma função get_file_link(did), pode usá-la aqui:
-                resolved_doc_url = google_drive_service.get_file_link(did) or ""
-            except Exception:
-                pass
+    # Message-ID definido já na gravação, para poder ser referenciado em respostas
+    message_id = make_msgid(domain=getattr(settings, "EMAIL_MESSAGE_ID_DOMAIN", None))
+    headers = {"Message-ID": message_id}
+    if reply_to_message_id:
+        headers["In-Reply-To"] = reply_to_message_id
+        headers["References"] = reply_to_message_id
 
-    return resolved_doc_url, resolved_folder_url
+    email, criado = EmailPendente.objects.get_or_create(
+        processo=processo, evento=evento,
+        defaults=dict(
+            assunto=assunto, corpo=corpo, destinatarios=to_list,
+            copia=[e for e in (copia or []) if e and e not in to_list],
+            headers=headers, message_id=message_id,
+        ),
+    )
+    if criado and getattr(settings, "TAREFAS_MODO_SINCRONO", False):
+        transaction.on_commit(enviar_pendentes)
+    return email
 
-def _make_thread_message_id(processo):
-    """
-    Gera um Message-ID determinístico por processo para facilitar threading básico.
-    Observação: alguns provedores podem sobrescrever o Message-ID.
-    """
-    pid = getattr(processo, "id", None) or "x"
-    num = getattr(processo, "numero", None) or "x"
-    ano = getattr(processo, "ano", None) or "x"
-    return f"<diaria-{pid}-{num}-{ano}@{EMAIL_DOMAIN}>"
 
-def send_process_created_email(
+def enfileirar_email_processo_criado(
     processo,
     controle_emails: list[str],
     requester_email: str | None = None,
     doc_url: str | None = None,
     folder_url: str | None = None,
-    reply_to_message_id: str | None = None,   # ⬅️ novo nome, opcional
+    reply_to_message_id: str | None = None,
 ):
-    to_list = list(controle_emails or [])
-    if not to_list:
-        logger.warning("Sem destinatários de Controle Interno para processo %s; e-mail não enviado.", processo.id)
-        return None
-
-# corpo para controle interno
+    """Aviso de nova solicitação ao Controle Interno (cópia ao solicitante). Retorna o Message-ID."""
     assunto = f"[Diárias] Nova solicitação {processo.numero}/{processo.ano} - {processo.solicitante.get_full_name()}"
-
     corpo = (
         f"Foi aberta uma solicitação de diária.\n\n"
         f"Número: {processo.numero}/{processo.ano}\n"
@@ -91,24 +79,108 @@ def send_process_created_email(
         f"Documento: {doc_url or '-'}\n"
         f"Pasta: {folder_url or '-'}\n"
     )
+    email = enfileirar_email(
+        processo, "processo_criado", assunto, corpo, controle_emails,
+        copia=[requester_email] if requester_email else None,
+        reply_to_message_id=reply_to_message_id,
+    )
+    return email.message_id if email else None
 
-    
-     # headers para threading
-    headers = {}
-    message_id = make_msgid(domain=getattr(settings, "EMAIL_MESSAGE_ID_DOMAIN", None))
-    headers["Message-ID"] = message_id
-    if reply_to_message_id:
-        headers["In-Reply-To"] = reply_to_message_id
-        headers["References"] = reply_to_message_id
 
-    msg = EmailMultiAlternatives(
-        subject=assunto,
-        body=corpo,
+def _backoff(tentativas: int) -> timedelta:
+    segundos = min(BACKOFF_BASE_SEGUNDOS * (2 ** max(tentativas - 1, 0)), BACKOFF_MAX_SEGUNDOS)
+    return timedelta(seconds=segundos)
+
+
+def _candidatos(limite: int, agora) -> list[tuple]:
+    """(id, status, iniciado_em) dos e-mails disponíveis: pendentes vencidos ou envios abandonados."""
+    limite_abandono = agora - timedelta(seconds=TIMEOUT_ENVIO_SEGUNDOS)
+    return list(
+        EmailPendente.objects
+        .filter(
+            Q(status=EmailPendente.Status.PENDENTE, executar_apos__lte=agora)
+            | Q(status=EmailPendente.Status.ENVIANDO, iniciado_em__lt=limite_abandono)
+        )
+        .order_by('executar_apos', 'id')
+        .values_list('id', 'status', 'iniciado_em')[:limite]
+    )
+
+
+def _reservar_lote(limite: int) -> list[EmailPendente]:
+    """
+    Reserva e-mails disponíveis com UPDATE condicional (status + iniciado_em lidos
+    nos candidatos): se outro worker reservou a linha no meio tempo, o UPDATE não
+    afeta nada e o e-mail fica com ele. Dois workers nunca enviam o mesmo e-mail.
+    """
+    agora = timezone.now()
+    reservados = []
+    for email_id, status_atual, iniciado_em in _candidatos(limite, agora):
+        if EmailPendente.objects.filter(
+            id=email_id, status=status_atual, iniciado_em=iniciado_em
+        ).update(status=EmailPendente.Status.ENVIANDO, iniciado_em=agora):
+            reservados.append(email_id)
+    return list(EmailPendente.objects.filter(id__in=reservados).order_by('id'))
+
+
+def _mensagem(email: EmailPendente, connection) -> EmailMultiAlternatives:
+    return EmailMultiAlternatives(
+        subject=email.assunto,
+        body=email.corpo,
         from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-        to=to_list,
-        cc=[requester_email] if requester_email else None,
-        headers=headers,
+        to=email.destinatarios,
+        cc=email.copia or None,
+        headers=email.headers,
+        connection=connection,
     )
-    msg.send(fail_silently=False)
-    logger.info("Email enviado para %s (cc: %s) — Message-ID=%s", to_list, requester_email, message_id)
-    return message_id
+
+
+def enviar_pendentes(limite: int | None = None) -> int:
+    """
+    Envia um lote da caixa de saída por uma única conexão SMTP.
+    Falhas são reagendadas com backoff exponencial até `max_tentativas`.
+    Retorna quantos e-mails foram enviados.
+    """
+    lote = _reservar_lote(limite or LOTE_ENVIO)
+    if not lote:
+        return 0
+
+    enviados = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        for email in lote:
+            try:
+                connection.send_messages([_mensagem(email, connection)])
+            except Exception as e:
+                logger.exception("Falha ao enviar e-mail %s (%s, tentativa %s)", email.id, email.evento, email.tentativas + 1)
+                # a conexão pode ter caído: a próxima mensagem reabre
+                connection.close()
+                email.tentativas += 1
+                email.ultimo_erro = str(e)
+                if email.tentativas >= email.max_tentativas:
+                    email.status = EmailPendente.Status.FALHOU
+                else:
+                    email.status = EmailPendente.Status.PENDENTE
+                    email.executar_apos = timezone.now() + _backoff(email.tentativas)
+                email.iniciado_em = None
+                email.save(update_fields=['tentativas', 'ultimo_erro', 'status', 'executar_apos', 'iniciado_em'])
+                continue
+            email.status = EmailPendente.Status.ENVIADO
+            email.tentativas += 1
+            email.enviado_em = timezone.now()
+            email.iniciado_em = None
+            email.ultimo_erro = ''
+            email.save(update_fields=['status', 'tentativas', 'enviado_em', 'iniciado_em', 'ultimo_erro'])
+            enviados += 1
+            logger.info("E-mail %s (%s) enviado para %s — Message-ID=%s",
+                        email.id, email.evento, email.destinatarios, email.message_id)
+    finally:
+        connection.close()
+    return enviados
+
+
+def rodar_envio(intervalo: float = 10.0):
+    """Loop do worker de e-mails: esvazia a caixa de saída e dorme quando vazia."""
+    logger.info("Worker de e-mails iniciado (intervalo=%ss)", intervalo)
+    while True:
+        if not enviar_pendentes():
+            time.sleep(intervalo)
@@ -0,0 +1,118 @@
+# backend/core/services/google_auth_service.py
+"""
+Login com Google: troca do authorization code e verificação local do id_token.
+
+O id_token (JWT RS256) é validado aqui mesmo — assinatura contra as chaves
+públicas do Google (JWKS), emissor, audiência (nosso client_id) e validade —
+e os dados do usuário saem direto das claims; não há chamadas a userinfo ou
+tokeninfo. As chaves ficam em memória pelo max-age do Cache-Control da
+resposta do Google; um `kid` desconhecido (rotação antecipada) força uma
+nova busca, limitada a uma a cada INTERVALO_MINIMO_RECARGA segundos.
+"""
+import logging
+import re
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+CERTS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+EMISSORES = ("accounts.google.com", "https://accounts.google.com")
+ALGORITMOS = ["RS256"]
+
+TIMEOUT = getattr(settings, "GOOGLE_AUTH_TIMEOUT_SEGUNDOS", 10)
+MAX_AGE_PADRAO = 3600
+INTERVALO_MINIMO_RECARGA = 60
+TOLERANCIA_RELOGIO = 60  # segundos de diferença aceitos em exp/iat
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+_lock = threading.Lock()
+_chaves = {"por_kid": {}, "expira_em": 0.0, "buscado_em": 0.0}
+
+
+class TokenInvalidoError(Exception):
+    """id_token ausente, malformado, com assinatura inválida ou claims inválidas."""
+    pass
+
+
+def trocar_code(code: str, client_id: str, client_secret: str) -> dict:
+    """Troca o authorization code (fluxo 'postmessage') pelos tokens do Google."""
+    res = requests.post(
+        TOKEN_URL,
+        data={
+            "code": code, "client_id": client_id, "client_secret": client_secret,
+            "redirect_uri": "postmessage", "grant_type": "authorization_code",
+        },
+        timeout=TIMEOUT,
+    )
+    return res.json()
+
+
+def _max_age(cache_control: str) -> int:
+    m = _MAX_AGE_RE.search(cache_control or "")
+    return int(m.group(1)) if m else MAX_AGE_PADRAO
+
+
+def _buscar_chaves():
+    res = requests.get(CERTS_URL, timeout=TIMEOUT)
+    res.raise_for_status()
+    por_kid = {}
+    for jwk in res.json().get("keys", []):
+        try:
+            por_kid[jwk["kid"]] = jwt.PyJWK(jwk).key
+        except (KeyError, jwt.PyJWKError):
+            logger.warning("Chave JWKS do Google ignorada: %s", jwk.get("kid"))
+    agora = time.time()
+    _chaves.update(por_kid=por_kid, expira_em=agora + _max_age(res.headers.get("Cache-Control")), buscado_em=agora)
+    logger.info("Chaves públicas do Google carregadas (%s chave(s))", len(por_kid))
+
+
+def _chave(kid: str):
+    agora = time.time()
+    chave = _chaves["por_kid"].get(kid) if agora < _chaves["expira_em"] else None
+    if chave is not None:
+        return chave
+    with _lock:
+        # outra thread pode ter recarregado enquanto esperávamos
+        expirado = time.time() >= _chaves["expira_em"]
+        desconhecido = kid not in _chaves["por_kid"]
+        if expirado or (desconhecido and time.time() - _chaves["buscado_em"] >= INTERVALO_MINIMO_RECARGA):
+            _buscar_chaves()
+        return _chaves["por_kid"].get(kid)
+
+
+def invalidar_chaves():
+    """Descarta as chaves em memória; a próxima verificação busca de novo."""
+    with _lock:
+        _chaves.update(por_kid={}, expira_em=0.0, buscado_em=0.0)
+
+
+def verificar_id_token(id_token: str, client_id: str) -> dict:
+    """
+    Valida o id_token e devolve suas claims (email, given_name, family_name,
+    picture...). Levanta TokenInvalidoError; falhas de rede ao buscar as
+    chaves sobem como requests.RequestException.
+    """
+    try:
+        kid = jwt.get_unverified_header(id_token).get("kid")
+    except jwt.PyJWTError as e:
+        raise TokenInvalidoError(f"id_token malformado: {e}") from e
+    chave = _chave(kid) if kid else None
+    if chave is None:
+        raise TokenInvalidoError(f"Chave de assinatura desconhecida: {kid}")
+    try:
+        claims = jwt.decode(
+            id_token, chave, algorithms=ALGORITMOS, audience=client_id,
+            leeway=TOLERANCIA_RELOGIO, options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+        )
+    except jwt.PyJWTError as e:
+        raise TokenInvalidoError(f"id_token inválido: {e}") from e
+    if claims.get("iss") not in EMISSORES:
+        raise TokenInvalidoError(f"Emissor inválido: {claims.get('iss')}")
+    return claims
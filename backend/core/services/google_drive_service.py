@@ -2,16 +2,21 @@
 
 import io
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from core.cache_utils import LRUCache
+from core.models import PastaDriveCache
 
 try:
     from googleapiclient.discovery import build
-    from googleapiclient.http import MediaIoBaseUpload
+    from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
     from googleapiclient.errors import HttpError
     from google.oauth2 import service_account
 except ModuleNotFoundError:  # pragma: no cover - fallback for environments sem googleapiclient
     build = None
     MediaIoBaseUpload = None
+    MediaIoBaseDownload = None
     service_account = None
 
     class HttpError(Exception):
@@ -26,12 +31,23 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive.metadata",
 ]
 
+# Credenciais lidas uma única vez por processo: todos os clientes (inclusive os
+# das threads de upload) compartilham o arquivo lido e o token de acesso.
+_credentials = None
+_credentials_lock = threading.Lock()
+def _get_credentials():
+    global _credentials
+    if _credentials is None:
+        with _credentials_lock:
+            if _credentials is None:
+                sa_file = getattr(settings, "GOOGLE_SERVICE_ACCOUNT_FILE", None)
+                if not sa_file or service_account is None or build is None:
+                    raise RuntimeError("Dependências do Google Drive não configuradas corretamente.")
+                _credentials = service_account.Credentials.from_service_account_file(sa_file, scopes=SCOPES)
+    return _credentials
+
 def _get_drive_service():
-    sa_file = getattr(settings, "GOOGLE_SERVICE_ACCOUNT_FILE", None)
-    if not sa_file or service_account is None or build is None:
-        raise RuntimeError("Dependências do Google Drive não configuradas corretamente.")
-    creds = service_account.Credentials.from_service_account_file(sa_file, scopes=SCOPES)
-    return build("drive", "v3", credentials=creds, cache_discovery=False)
+    return build("drive", "v3", credentials=_get_credentials(), cache_discovery=False)
 
 _drive_service = None
 def _service():
@@ -40,6 +56,63 @@ def _service():
         _drive_service = _get_drive_service()
     return _drive_service
 
+# O cliente do googleapiclient (httplib2) não é thread-safe: cada thread de
+# upload paralelo mantém o seu próprio cliente (só o build(); as credenciais
+# são as do processo).
+_thread_local = threading.local()
+def _thread_service():
+    svc = getattr(_thread_local, "drive_service", None)
+    if svc is None:
+        svc = _thread_local.drive_service = _get_drive_service()
+    return svc
+
+UPLOAD_MAX_WORKERS = getattr(settings, "GDRIVE_UPLOAD_MAX_WORKERS", 4)
+
+FOLDER_MIMETYPE = "application/vnd.google-apps.folder"
+
+def is_not_found(e):
+    return getattr(getattr(e, "resp", None), "status", None) == 404
+
+# --- Cache (parent_id, name) -> pasta ---
+# Camada 1: LRU em memória do processo; camada 2: tabela PastaDriveCache.
+_folder_cache = LRUCache(maxsize=getattr(settings, "GDRIVE_FOLDER_CACHE_SIZE", 1024))
+
+def _cache_get_folder(parent_id, name):
+    key = (parent_id, name)
+    meta = _folder_cache.get(key)
+    if meta is not None:
+        return meta
+    row = PastaDriveCache.objects.filter(parent_id=parent_id, nome=name).only("folder_id", "web_view_link").first()
+    if row is None:
+        return None
+    meta = {"id": row.folder_id, "name": name, "webViewLink": row.web_view_link or None}
+    _folder_cache.set(key, meta)
+    return meta
+
+def _cache_set_folder(parent_id, name, meta):
+    meta = {"id": meta["id"], "name": name, "webViewLink": meta.get("webViewLink")}
+    _folder_cache.set((parent_id, name), meta)
+    PastaDriveCache.objects.update_or_create(
+        parent_id=parent_id, nome=name,
+        defaults={"folder_id": meta["id"], "web_view_link": meta.get("webViewLink") or ""},
+    )
+    return meta
+
+def invalidate_folder(folder_id):
+    """
+    Remove do cache a pasta `folder_id` e tudo o que estava abaixo dela.
+    Chamado quando o Drive devolve 404 ao usar um id vindo do cache.
+    """
+    if not folder_id:
+        return
+    _folder_cache.delete_where(lambda key, meta: meta["id"] == folder_id or key[0] == folder_id)
+    PastaDriveCache.objects.filter(folder_id=folder_id).delete()
+    PastaDriveCache.objects.filter(parent_id=folder_id).delete()
+    logger.warning("Pasta %s removida do cache (não encontrada no Drive)", folder_id)
+
+def clear_folder_cache():
+    _folder_cache.clear()
+
 def find_folder(parent_id, name):
     """
     Procura por uma pasta com nome `name` dentro de parent_id.
@@ -49,7 +122,7 @@ def find_folder(parent_id, name):
         svc = _service()
         safe_name = name.replace("'", "\\'")
         q = (
-            "mimeType='application/vnd.google-apps.folder' and "
+            f"mimeType='{FOLDER_MIMETYPE}' and "
             f"name = '{safe_name}' and "
             f"'{parent_id}' in parents and trashed = false"
         )
@@ -69,20 +142,69 @@ def create_folder(name, parent_id=None):
     svc = _service()
     body = {
         "name": name,
-        "mimeType": "application/vnd.google-apps.folder",
+        "mimeType": FOLDER_MIMETYPE,
     }
     if parent_id:
         body["parents"] = [parent_id]
-    created = svc.files().create(
-        body=body,
-        fields="id, name, webViewLink, driveId",
-        supportsAllDrives=True
-    ).execute()
+    try:
+        created = svc.files().create(
+            body=body,
+            fields="id, name, webViewLink, driveId",
+            supportsAllDrives=True
+        ).execute()
+    except HttpError as e:
+        if is_not_found(e):
+            invalidate_folder(parent_id)
+        raise
     return created
 
 def ensure_folder(parent_id, name):
+    """
+    Retorna a pasta `name` dentro de `parent_id`, criando-a se não existir.
+    Consulta primeiro o cache (memória -> banco); só vai ao Drive em caso de miss.
+    """
+    cached = _cache_get_folder(parent_id, name)
+    if cached:
+        return cached
     found = find_folder(parent_id, name)
-    return found if found else create_folder(name, parent_id)
+    folder = found if found else create_folder(name, parent_id)
+    return _cache_set_folder(parent_id, name, folder)
+
+def list_child_folders(parent_id):
+    """Lista (paginando) todas as subpastas diretas de `parent_id`."""
+    svc = _service()
+    q = f"mimeType='{FOLDER_MIMETYPE}' and '{parent_id}' in parents and trashed = false"
+    folders, page_token = [], None
+    while True:
+        res = svc.files().list(
+            q=q,
+            fields="nextPageToken, files(id, name, webViewLink)",
+            pageSize=1000,
+            pageToken=page_token,
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True
+        ).execute()
+        folders.extend(res.get("files", []))
+        page_token = res.get("nextPageToken")
+        if not page_token:
+            return folders
+
+def warm_folder_cache(root_id, depth=2):
+    """
+    Percorre a árvore do Drive a partir de `root_id` (até `depth` níveis)
+    gravando cada pasta no cache. Retorna o número de pastas registradas.
+    """
+    total = 0
+    nivel = [root_id]
+    for _ in range(depth):
+        proximo = []
+        for parent_id in nivel:
+            for folder in list_child_folders(parent_id):
+                _cache_set_folder(parent_id, folder["name"], folder)
+                proximo.append(folder["id"])
+                total += 1
+        nivel = proximo
+    return total
 
 def copy_file(file_id, new_title=None, parent_id=None):
     svc = _service()
@@ -101,10 +223,18 @@ def copy_file(file_id, new_title=None, parent_id=None):
         return copied
     except HttpError as e:
         logger.exception("Erro ao copiar arquivo %s: %s", file_id, e)
+        if is_not_found(e) and parent_id:
+            invalidate_folder(parent_id)
         raise
 
-def upload_file(parent_id, filename, fileobj, mimetype=None):
-    svc = _service()
+def upload_file(parent_id, filename, fileobj, mimetype=None, svc=None, target_mimetype=None, invalidate_on_404=True):
+    """
+    Envia `fileobj` para a pasta `parent_id`. Com `target_mimetype` (ex.:
+    'application/vnd.google-apps.document') o Drive converte o arquivo no upload.
+    `invalidate_on_404=False` deixa a invalidação do cache de pastas para quem
+    chamou (as threads de `upload_files` não tocam no ORM).
+    """
+    svc = svc or _service()
     try:
         fileobj.seek(0)
     except Exception:
@@ -115,6 +245,8 @@ def upload_file(parent_id, filename, fileobj, mimetype=None):
         "name": filename,
         "parents": [parent_id] if parent_id else []
     }
+    if target_mimetype:
+        body["mimeType"] = target_mimetype
     try:
         created = svc.files().create(
             body=body,
@@ -125,15 +257,36 @@ def upload_file(parent_id, filename, fileobj, mimetype=None):
         return created
     except HttpError as e:
         logger.exception("Erro upload_file %s: %s", filename, e)
+        if is_not_found(e) and parent_id and invalidate_on_404:
+            invalidate_folder(parent_id)
         raise
 
-def set_permission(file_id, role="reader", perm_type="user", email=None, allow_file_discovery=False):
+def export_file(file_id, mimetype):
+    """Exporta um arquivo nativo do Google (Docs, Sheets...) e retorna os bytes."""
     svc = _service()
+    request = svc.files().export_media(fileId=file_id, mimeType=mimetype)
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request)
+    done = False
+    try:
+        while not done:
+            _, done = downloader.next_chunk()
+        return fh.getvalue()
+    except HttpError as e:
+        logger.exception("Erro export_file %s: %s", file_id, e)
+        raise
+
+def _permission_body(role="reader", perm_type="user", email=None, allow_file_discovery=False):
     body = {"role": role, "type": perm_type}
     if perm_type == "user" and email:
         body["emailAddress"] = email
     if perm_type == "anyone":
         body["allowFileDiscovery"] = allow_file_discovery
+    return body
+
+def set_permission(file_id, role="reader", perm_type="user", email=None, allow_file_discovery=False):
+    svc = _service()
+    body = _permission_body(role, perm_type, email, allow_file_discovery)
 
     try:
         perm = svc.permissions().create(
@@ -147,6 +300,75 @@ def set_permission(file_id, role="reader", perm_type="user", email=None, allow_f
         logger.exception("Erro set_permission em %s: %s", file_id, e)
         raise
 
+class DriveBatch:
+    """
+    Agrupa várias chamadas ao Drive (permissions().create e files().get) em
+    requisições batch multipart: até 100 chamadas custam um único round trip.
+
+        batch = DriveBatch()
+        batch.add_permission(doc_id, role="writer", email="fulano@...")
+        batch.add_get(folder_id)
+        for item in batch.execute():
+            item["ok"], item["result"], item["error"]
+
+    Falhas são reportadas por item; `execute` não propaga exceções das chamadas.
+    """
+    MAX_POR_LOTE = 100  # limite do endpoint batch do Drive
+
+    def __init__(self, svc=None):
+        self._svc = svc or _service()
+        self._itens = []
+
+    def __len__(self):
+        return len(self._itens)
+
+    def _add(self, descricao, request):
+        self._itens.append((descricao, request))
+        return len(self._itens) - 1
+
+    def add_permission(self, file_id, role="reader", perm_type="user", email=None, allow_file_discovery=False):
+        request = self._svc.permissions().create(
+            fileId=file_id,
+            body=_permission_body(role, perm_type, email, allow_file_discovery),
+            supportsAllDrives=True,
+            sendNotificationEmail=False
+        )
+        return self._add({"op": "permission", "file_id": file_id, "email": email, "role": role}, request)
+
+    def add_get(self, file_id, fields="id, name, webViewLink, driveId"):
+        request = self._svc.files().get(fileId=file_id, fields=fields, supportsAllDrives=True)
+        return self._add({"op": "get", "file_id": file_id}, request)
+
+    def execute(self):
+        """
+        Executa as chamadas acumuladas. Retorna uma lista na ordem em que foram
+        adicionadas: {"op", "file_id", ..., "ok", "result", "error"}.
+        """
+        resultados = [dict(descricao, ok=False, result=None, error=None) for descricao, _ in self._itens]
+
+        def _callback(request_id, response, exception):
+            item = resultados[int(request_id)]
+            if exception is not None:
+                item["error"] = str(exception)
+                logger.error("Erro no batch do Drive (%s %s): %s", item["op"], item["file_id"], exception)
+            else:
+                item["ok"], item["result"] = True, response
+
+        for inicio in range(0, len(self._itens), self.MAX_POR_LOTE):
+            lote = self._svc.new_batch_http_request(callback=_callback)
+            for idx in range(inicio, min(inicio + self.MAX_POR_LOTE, len(self._itens))):
+                lote.add(self._itens[idx][1], request_id=str(idx))
+            try:
+                lote.execute()
+            except HttpError as e:
+                logger.exception("Erro ao executar batch do Drive: %s", e)
+                for item in resultados[inicio:inicio + self.MAX_POR_LOTE]:
+                    if not item["ok"] and item["error"] is None:
+                        item["error"] = str(e)
+
+        self._itens = []
+        return resultados
+
 def get_file_link(file_id):
     svc = _service()
     try:
@@ -162,3 +384,39 @@ def get_file_link(file_id):
 
 def get_folder_link(folder_id):
     return get_file_link(folder_id)
+
+def upload_files(parent_id, files, max_workers=None):
+    """
+    Faz o upload de vários arquivos em paralelo (pool limitado de threads).
+    `files`: lista de tuplas (filename, fileobj, mimetype).
+    Retorna uma lista na mesma ordem da entrada, com um item por arquivo:
+      {"filename": ..., "ok": True, "file": <metadata do Drive>, "error": None, "not_found": False}
+      {"filename": ..., "ok": False, "file": None, "error": "<mensagem>", "not_found": <404?>}
+    Falhas são reportadas por arquivo; nenhuma exceção é propagada. Se o Drive
+    responder 404 (pasta `parent_id` sumiu), o cache de pastas é invalidado na
+    thread que chamou, depois que o pool termina.
+    """
+    files = list(files or [])
+    if not files:
+        return []
+
+    def _upload(item):
+        filename, fileobj, mimetype = item
+        try:
+            meta = upload_file(
+                parent_id, filename, fileobj, mimetype, svc=_thread_service(), invalidate_on_404=False
+            )
+            return {"filename": filename, "ok": True, "file": meta, "error": None, "not_found": False}
+        except Exception as e:
+            logger.exception("Erro upload_files %s: %s", filename, e)
+            return {"filename": filename, "ok": False, "file": None, "error": str(e), "not_found": is_not_found(e)}
+
+    workers = max(1, min(max_workers or UPLOAD_MAX_WORKERS, len(files)))
+    if workers == 1:
+        resultados = [_upload(item) for item in files]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gdrive-upload") as pool:
+            resultados = list(pool.map(_upload, files))
+    if any(r["not_found"] for r in resultados):
+        invalidate_folder(parent_id)
+    return resultados
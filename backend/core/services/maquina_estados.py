@@ -0,0 +1,99 @@
+# backend/core/services/maquina_estados.py
+"""
+Máquina de estados compilada a partir das tabelas declarativas do workflow.
+
+As tabelas (status -> destinos, status -> perfis) são convertidas uma única
+vez em frozensets e tabelas auxiliares: perfil x status -> destinos,
+status em que cada perfil atua, estados alcançáveis, finais e sem saída.
+Todas as consultas em tempo de requisição são acessos O(1) a dicts/sets.
+"""
+from collections import defaultdict, deque
+
+from django.core.exceptions import ImproperlyConfigured
+
+_VAZIO = frozenset()
+
+
+class MaquinaEstados:
+
+    def __init__(self, transicoes: dict, permissoes: dict, estados, iniciais, finais, externas=None):
+        """
+        `externas`: transições feitas fora do workflow (ex.: o submit tira o
+        processo de RASCUNHO). Contam para a análise do grafo, mas não são
+        oferecidas como ações.
+        """
+        self.estados = frozenset(estados)
+        externas = externas or {}
+        desconhecidos = (
+            set(transicoes) | {d for ds in transicoes.values() for d in ds} | set(permissoes)
+            | set(externas) | {d for ds in externas.values() for d in ds}
+            | set(iniciais) | set(finais)
+        ) - self.estados
+        if desconhecidos:
+            raise ImproperlyConfigured(f"Workflow referencia status inexistentes: {sorted(desconhecidos)}")
+
+        # destinos na ordem declarada (é a ordem exibida nos botões do frontend)
+        self._ordem = {
+            origem: tuple(dict.fromkeys(destinos)) for origem, destinos in transicoes.items() if destinos
+        }
+        self.transicoes = {origem: frozenset(destinos) for origem, destinos in self._ordem.items()}
+        self.permissoes = {status: frozenset(perfis) for status, perfis in permissoes.items()}
+
+        por_perfil = defaultdict(set)
+        self.destinos_por_perfil = {}
+        for status, perfis in self.permissoes.items():
+            for perfil in perfis:
+                por_perfil[perfil].add(status)
+                self.destinos_por_perfil[(perfil, status)] = self.transicoes.get(status, _VAZIO)
+        self.status_por_perfil = {perfil: frozenset(st) for perfil, st in por_perfil.items()}
+
+        grafo = defaultdict(set)
+        for origem, destinos in [*self.transicoes.items(), *externas.items()]:
+            grafo[origem].update(destinos)
+        self.iniciais = frozenset(iniciais)
+        self.finais = frozenset(finais)
+        self.alcancaveis = self._alcancaveis(grafo, self.iniciais)
+        self.inalcancaveis = self.estados - self.alcancaveis
+        self.terminais = frozenset(s for s in self.estados if not grafo.get(s))
+        self.sem_saida = self.alcancaveis & self.terminais - self.finais
+
+    @staticmethod
+    def _alcancaveis(grafo, origens) -> frozenset:
+        vistos = set(origens)
+        fila = deque(origens)
+        while fila:
+            for destino in grafo.get(fila.popleft(), _VAZIO):
+                if destino not in vistos:
+                    vistos.add(destino)
+                    fila.append(destino)
+        return frozenset(vistos)
+
+    # --- consultas ---
+
+    def destinos(self, status) -> tuple:
+        return self._ordem.get(status, ())
+
+    def pode_transicionar(self, origem, destino) -> bool:
+        return destino in self.transicoes.get(origem, _VAZIO)
+
+    def perfis_podem_operar(self, status, perfis) -> bool:
+        return not self.permissoes.get(status, _VAZIO).isdisjoint(perfis)
+
+    def status_do_perfil(self, perfil) -> frozenset:
+        return self.status_por_perfil.get(perfil, _VAZIO)
+
+    def problemas(self, sem_saida_conhecidos=()) -> list[str]:
+        """
+        Inconsistências do grafo (não impedem o funcionamento; ver core.checks).
+        `sem_saida_conhecidos`: status sem saída já sabidos, que não são reportados.
+        """
+        problemas = []
+        if self.inalcancaveis:
+            problemas.append(f"Status inalcançáveis a partir de {sorted(self.iniciais)}: {sorted(self.inalcancaveis)}")
+        sem_saida = self.sem_saida - frozenset(sem_saida_conhecidos)
+        if sem_saida:
+            problemas.append(f"Status sem saída que não são finais: {sorted(sem_saida)}")
+        sem_operador = sorted(s for s in self.transicoes if not self.permissoes.get(s))
+        if sem_operador:
+            problemas.append(f"Status com transições mas sem perfil autorizado: {sem_operador}")
+        return problemas
@@ -0,0 +1,113 @@
+# backend/core/services/notificacoes_service.py
+"""
+Notificações de mudança de status, entregues em resumos periódicos.
+
+Cada transição do workflow (sinal `workflow_service.processo_transicionado`)
+gera uma Notificacao por destinatário — os perfis que operam o novo status e
+o solicitante — na mesma transação da mudança. O comando `enviar_resumos`
+junta, a cada intervalo, as notificações pendentes de cada pessoa em um único
+e-mail na caixa de saída: uma transição em lote de 50 processos vira um
+resumo por pessoa, não 50 e-mails.
+"""
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from core.models import Notificacao, Processo
+from core.services import destinatarios_service, email_service
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_RESUMO_SEGUNDOS = getattr(settings, "NOTIFICACOES_INTERVALO_RESUMO_SEGUNDOS", 900)
+
+STATUS_LABELS = dict(Processo.Status.choices)
+
+
+def registrar_transicoes(transicoes, destino: str, usuario=None) -> int:
+    """
+    Cria as notificações de um conjunto de transições para o mesmo `destino`.
+    `transicoes`: [(processo_id, solicitante_id, status_anterior), ...].
+    Quem executou a transição não é notificado.
+    """
+    from core.services.workflow_service import MAQUINA
+
+    # 'solicitante' nas permissões significa o dono do processo, não o perfil inteiro
+    perfis = MAQUINA.permissoes.get(destino, frozenset()) - {'solicitante'}
+    operadores = {e for perfil in perfis for e in destinatarios_service.emails_do_perfil(perfil)}
+
+    solicitantes = dict(
+        get_user_model().objects
+        .filter(pk__in={sol for _, sol, _ in transicoes})
+        .exclude(email='')
+        .values_list('pk', 'email')
+    )
+    ignorar = (getattr(usuario, 'email', '') or '').strip().lower()
+
+    notificacoes = []
+    for processo_id, solicitante_id, anterior in transicoes:
+        emails = set(operadores)
+        if solicitantes.get(solicitante_id):
+            emails.add(solicitantes[solicitante_id].strip().lower())
+        emails.discard(ignorar)
+        notificacoes.extend(
+            Notificacao(
+                destinatario=email, processo_id=processo_id,
+                status_anterior=anterior, status_novo=destino,
+            )
+            for email in sorted(emails)
+        )
+    Notificacao.objects.bulk_create(notificacoes)
+    return len(notificacoes)
+
+
+def _corpo_resumo(itens) -> str:
+    linhas = [f"Houve {len(itens)} movimentação(ões) em processos de diárias:\n"]
+    for n in itens:
+        p = n.processo
+        numero = f"{p.numero}/{p.ano}" if p.numero and p.ano else f"#{p.pk}"
+        linhas.append(
+            f"- Processo {numero} ({p.destino}): "
+            f"{STATUS_LABELS.get(n.status_anterior, n.status_anterior)} → {STATUS_LABELS.get(n.status_novo, n.status_novo)}"
+        )
+    return "\n".join(linhas) + "\n"
+
+
+def gerar_resumos() -> int:
+    """
+    Agrupa as notificações pendentes em um e-mail de resumo por destinatário
+    (gravado na caixa de saída). Retorna quantos resumos foram enfileirados.
+    """
+    with transaction.atomic():
+        # trava só as notificações: o JOIN com Processo não deve bloquear as transições
+        pendentes = list(
+            Notificacao.objects.select_for_update(of=('self',))
+            .filter(resumo__isnull=True)
+            .select_related('processo')
+            .order_by('id')
+        )
+        por_destinatario = defaultdict(list)
+        for n in pendentes:
+            por_destinatario[n.destinatario].append(n)
+
+        for destinatario, itens in por_destinatario.items():
+            email = email_service.enfileirar_email(
+                None, f"resumo:{itens[0].id}",
+                f"[Diárias] Resumo: {len(itens)} movimentação(ões) de processos",
+                _corpo_resumo(itens), [destinatario],
+            )
+            Notificacao.objects.filter(id__in=[n.id for n in itens]).update(resumo=email)
+    if por_destinatario:
+        logger.info("%s resumo(s) enfileirado(s) com %s notificação(ões)", len(por_destinatario), len(pendentes))
+    return len(por_destinatario)
+
+
+def rodar_resumos(intervalo: float = INTERVALO_RESUMO_SEGUNDOS):
+    """Loop do worker: gera os resumos pendentes a cada `intervalo` segundos."""
+    logger.info("Worker de resumos iniciado (intervalo=%ss)", intervalo)
+    while True:
+        gerar_resumos()
+        time.sleep(intervalo)
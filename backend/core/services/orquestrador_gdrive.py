@@ -1,7 +1,7 @@
 # core/services/orquestrador_gdrive.py
 import logging
 from django.conf import settings
-from .google_drive_service import ensure_folder, copy_file, upload_file, set_permission, get_folder_link, get_file_link, find_folder
+from .google_drive_service import ensure_folder, copy_file, upload_file, upload_files, set_permission, get_folder_link, get_file_link, find_folder, DriveBatch
 from .google_docs_service import replace_tags
 from core.models import Documento
 from django.contrib.auth import get_user_model
@@ -72,39 +72,45 @@ def create_process_folder_and_doc(processo, replacements: dict, attachments: lis
     except Exception:
         logger.exception("Falha ao criar registro Documento para o doc copiado (processo %s)", processo.id)
 
-    # 7) setar permissões
-    # solicitante -> reader
+    # 7) setar permissões num único batch (requester: view, controle interno: edit);
+    #    o link da pasta vem do create/cache e só é buscado no mesmo batch se faltar
+    batch = DriveBatch()
     if requester_email:
-        try:
-            set_permission(doc_id, role="reader", perm_type="user", email=requester_email)
-        except Exception:
-            logger.exception("Falha ao setar permissão reader para solicitante %s", requester_email)
-
-    # controle interno -> writer
+        batch.add_permission(doc_id, role="reader", perm_type="user", email=requester_email)
     for email in (controle_interno_emails or []):
-        try:
-            set_permission(doc_id, role="writer", perm_type="user", email=email)
-        except Exception:
-            logger.exception("Falha ao setar permissão writer para %s", email)
-
-    # 8) upload attachments - cada anexo vira Documento(tipo OUTRO)
-    for f in (attachments or []):
-        try:
-            # file-like object (Django UploadedFile)
-            # upload_file já seeka para 0
-            uploaded = upload_file(parent_id=recebidos_folder_id, filename=getattr(f, "name", "anexo"), fileobj=f, mimetype=getattr(f, "content_type", None))
-            doc_obj = Documento.objects.create(
+        batch.add_permission(doc_id, role="writer", perm_type="user", email=email)
+    folder_url = process_folder.get("webViewLink")
+    if not folder_url:
+        batch.add_get(process_folder_id, fields="id, webViewLink")
+    for item in (batch.execute() if len(batch) else []):
+        if item["op"] == "get":
+            folder_url = (item["result"] or {}).get("webViewLink")
+        elif not item["ok"]:
+            logger.error("Falha ao setar permissão %s para %s: %s", item["role"], item["email"], item["error"])
+
+    # 8) upload attachments em paralelo - cada anexo vira Documento(tipo OUTRO), gravados em lote
+    arquivos = [
+        (getattr(f, "name", "anexo"), f, getattr(f, "content_type", None))
+        for f in (attachments or [])
+    ]
+    resultados = upload_files(recebidos_folder_id, arquivos)
+    for res in resultados:
+        if not res["ok"]:
+            logger.error("Falha ao fazer upload do anexo %s para processo %s: %s", res["filename"], processo.id, res["error"])
+    try:
+        created_documents += Documento.objects.bulk_create([
+            Documento(
                 processo=processo,
-                nome_arquivo=getattr(f, "name", "anexo"),
-                gdrive_file_id=uploaded.get("id"),
+                nome_arquivo=res["filename"],
+                gdrive_file_id=res["file"].get("id"),
+                gdrive_file_url=res["file"].get("webViewLink"),
                 tipo_documento=Documento.TipoDocumento.OUTRO,
                 uploaded_by=solicitante_user
             )
-            created_documents.append(doc_obj)
-        except Exception:
-            logger.exception("Falha ao fazer upload do anexo %s para processo %s", getattr(f, "name", "anexo"), processo.id)
-
-    folder_url = get_folder_link(process_folder_id)
+            for res in resultados if res["ok"]
+        ])
+    except Exception:
+        logger.exception("Falha ao criar registros Documento dos anexos (processo %s)", processo.id)
 
     return {
         "process_folder_id": process_folder_id,
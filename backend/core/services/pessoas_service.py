@@ -1,39 +1,124 @@
 # backend/core/services/pessoas_service.py
-from core.models import Profile, Role
+"""
+Diretório dos ocupantes de cargos (signatários dos documentos).
+
+Os nomes mudam raramente, então o diretório é montado uma vez (poucas
+consultas para todos os cargos), guardado no cache do Django e memorizado no
+processo; alterações em Profile, Role, Group ou User trocam a versão (ver
+core.signals). Preencher o template não faz nenhuma consulta ao banco.
+
+As edições acontecem no processo web e o template é preenchido pelo worker
+(processar_tarefas): a troca de versão só chega até ele com um cache
+compartilhado. As duas camadas expiram sozinhas (MEMORIA_TTL e CACHE_TIMEOUT)
+para que um cache local por processo não deixe um signatário antigo para sempre.
+"""
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.core.cache import cache
 
-def _nome_user(u) -> str:
-    if not u:
-        return ""
-    return (u.get_full_name() or u.first_name or u.email or "").strip()
+from core.cache_utils import LRUCache, MEMORIA_TTL, get_versao, incrementar_versao
+from core.models import Profile, Role
 
-def get_nome_presidente() -> str:
-    """
-    Resolve o nome do Presidente:
-      1) Role com slug/name 'presidente' (case-insensitive)
-      2) Grupo Django 'Presidente'
-      3) Fallback: 'Presidente da Câmara'
-    """
-    # 1) Role (slug ou name), sem quebrar se maiúsculas/minúsculas diferirem
-    role = (
-        Role.objects.filter(slug__iexact="presidente").first()
-        or Role.objects.filter(name__iexact="presidente").first()
-    )
-    if role:
-        prof = Profile.objects.filter(roles=role).select_related("user").first()
-        if prof and prof.user:
-            nome = _nome_user(prof.user)
-            if nome:
-                return nome
-
-    # 2) Grupo Django "Presidente"
-    grp = Group.objects.filter(name__iexact="Presidente").first()
-    if grp:
-        u = grp.user_set.filter(is_active=True).order_by("id").first()
-        if u:
-            nome = _nome_user(u)
+# cargo (slug do Role ou nome do Grupo, sem diferenciar maiúsculas) -> texto padrão
+CARGOS = {
+    'presidente': "Presidente da Câmara",
+    'contador': "Contador",
+    'controlador': "Controlador Interno",
+}
+
+CACHE_NAMESPACE = 'pessoas'
+CACHE_TIMEOUT = 300
+
+_em_memoria = LRUCache(maxsize=1, ttl=MEMORIA_TTL)
+
+
+def _nome_user(first_name, last_name, email) -> str:
+    return (f"{first_name or ''} {last_name or ''}".strip() or email or "").strip()
+
+
+def _primeiros_por_cargo(cargo_por_id, linhas) -> dict:
+    """Primeiro usuário (menor id) com nome de cada cargo; `linhas` vem ordenado por usuário."""
+    nomes = {}
+    for ref_id, first_name, last_name, email in linhas:
+        cargo = cargo_por_id[ref_id]
+        if cargo not in nomes:
+            nome = _nome_user(first_name, last_name, email)
             if nome:
-                return nome
+                nomes[cargo] = nome
+    return nomes
+
+
+def _cargo(*textos):
+    for texto in textos:
+        cargo = (texto or '').strip().lower()
+        if cargo in CARGOS:
+            return cargo
+    return None
+
+
+def _montar() -> dict:
+    # 1) Role com slug/name do cargo
+    roles = {}
+    for r_id, slug, name in Role.objects.order_by().values_list('id', 'slug', 'name'):
+        cargo = _cargo(slug, name)
+        if cargo:
+            roles[r_id] = cargo
+    nomes = {}
+    if roles:
+        nomes = _primeiros_por_cargo(roles, (
+            Profile.roles.through.objects
+            .filter(role_id__in=roles, profile__user__is_active=True)
+            .order_by('profile__user_id')
+            .values_list('role_id', 'profile__user__first_name', 'profile__user__last_name', 'profile__user__email')
+        ))
+
+    # 2) Grupo Django com o nome do cargo (para os cargos ainda sem ninguém)
+    faltantes = set(CARGOS) - set(nomes)
+    grupos = {}
+    for g_id, name in Group.objects.values_list('id', 'name'):
+        cargo = _cargo(name)
+        if cargo in faltantes:
+            grupos[g_id] = cargo
+    if grupos:
+        User = get_user_model()
+        por_grupo = _primeiros_por_cargo(grupos, (
+            User.groups.through.objects
+            .filter(group_id__in=grupos, user__is_active=True)
+            .order_by('user_id')
+            .values_list('group_id', 'user__first_name', 'user__last_name', 'user__email')
+        ))
+        nomes.update(por_grupo)
 
     # 3) fallback
-    return "Presidente da Câmara"
+    return {cargo: nomes.get(cargo) or padrao for cargo, padrao in CARGOS.items()}
+
+
+def diretorio() -> dict:
+    """{cargo: nome} de todos os cargos em CARGOS (memória -> cache -> banco)."""
+    versao = get_versao(CACHE_NAMESPACE)
+    nomes = _em_memoria.get(versao)
+    if nomes is None:
+        chave = f"{CACHE_NAMESPACE}:{versao}"
+        nomes = cache.get(chave)
+        if nomes is None:
+            nomes = _montar()
+            cache.set(chave, nomes, CACHE_TIMEOUT)
+        _em_memoria.set(versao, nomes)
+    return nomes
+
+
+def nome_do_cargo(cargo: str) -> str:
+    return diretorio().get(cargo.lower()) or CARGOS.get(cargo.lower(), "")
+
+
+def get_nome_presidente() -> str:
+    return nome_do_cargo('presidente')
+
+
+def aquecer() -> dict:
+    """Carrega o diretório antecipadamente (início dos workers)."""
+    return diretorio()
+
+
+def invalidar():
+    incrementar_versao(CACHE_NAMESPACE)
@@ -0,0 +1,70 @@
+# backend/core/services/principal_service.py
+"""
+"Principal": os slugs de perfil (Role) de um usuário, resolvidos uma vez.
+
+O objeto fica memorizado na própria instância do usuário (que a autenticação
+do DRF cria a cada requisição), então vale pela requisição inteira; entre
+requisições, os slugs ficam no cache do Django por PRINCIPAL_CACHE_TTL
+segundos. Alterações em Profile.roles, em Role ou a exclusão do Profile
+invalidam o cache (ver core.signals). Checagens de permissão viram consultas
+a um frozenset em memória.
+"""
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache_utils import get_versao, incrementar_versao
+from core.models import Role
+
+CACHE_NAMESPACE = 'principal'
+CACHE_TIMEOUT = getattr(settings, 'PRINCIPAL_CACHE_TTL', 60)
+_ATRIBUTO = '_principal'
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    slugs: frozenset
+
+    def tem_algum(self, slugs) -> bool:
+        return not self.slugs.isdisjoint(slugs)
+
+
+def _chave(user_id) -> str:
+    return f"{CACHE_NAMESPACE}:{get_versao(CACHE_NAMESPACE)}:{user_id}"
+
+
+def _carregar_slugs(user_id) -> frozenset:
+    chave = _chave(user_id)
+    slugs = cache.get(chave)
+    if slugs is None:
+        slugs = frozenset(
+            s.lower() for s in Role.objects.filter(profiles__user_id=user_id).order_by().values_list('slug', flat=True)
+        )
+        cache.set(chave, slugs, CACHE_TIMEOUT)
+    return slugs
+
+
+def principal_de(user) -> Principal:
+    """Principal do usuário, memorizado na instância (uma resolução por requisição)."""
+    principal = getattr(user, _ATRIBUTO, None)
+    if principal is None:
+        if not getattr(user, 'is_authenticated', False):
+            return Principal(user_id=None, slugs=frozenset())
+        slugs = _carregar_slugs(user.pk)
+        # “flags” comuns — ajuste se tiver
+        if user.is_staff:
+            slugs = slugs | {'adm'}
+        principal = Principal(user_id=user.pk, slugs=slugs)
+        setattr(user, _ATRIBUTO, principal)
+    return principal
+
+
+def invalidar_usuario(user_id):
+    cache.delete(_chave(user_id))
+
+
+def invalidar_todos():
+    """Troca a versão: todas as entradas em cache deixam de valer (ex.: slug de Role alterado)."""
+    incrementar_versao(CACHE_NAMESPACE)
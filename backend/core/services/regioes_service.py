@@ -0,0 +1,91 @@
+# backend/core/services/regioes_service.py
+"""
+Classificação de destinos em região de diária ('LOCAL' | 'OUTROS').
+
+Os índices são montados uma única vez na importação do módulo (conjuntos de
+nomes normalizados + aliases), então classificar um destino é uma consulta
+O(1) a um dict; resultados de destinos repetidos vêm de um lru_cache.
+"""
+import re
+from functools import lru_cache
+from unicodedata import normalize as _normalize
+
+LOCAL = 'LOCAL'
+OUTROS = 'OUTROS'
+
+# grupo_1 da tabela de diárias (Resolução): capitais "locais"
+CIDADES_GRUPO_1 = ('florianopolis', 'curitiba')
+
+# Lista de capitais (usada para inferir região) — é a mesma lista que o backend devolve via /config/
+CAPITAIS_BRASIL = (
+    "aracaju", "belém", "belo horizonte", "boa vista", "brasília", "campo grande",
+    "cuiabá", "fortaleza", "goiânia", "joão pessoa", "macapá", "maceió", "manaus",
+    "natal", "palmas", "porto alegre", "porto velho", "recife", "rio branco",
+    "rio de janeiro", "salvador", "são luís", "são paulo", "teresina", "vitória"
+)
+
+# apelidos/abreviações comuns -> nome normalizado da cidade
+ALIASES = {
+    'floripa': 'florianopolis',
+    'fpolis': 'florianopolis',
+    'cwb': 'curitiba',
+    'bh': 'belo horizonte',
+    'bhz': 'belo horizonte',
+    'bsb': 'brasilia',
+    'poa': 'porto alegre',
+    'rio': 'rio de janeiro',
+    'sampa': 'sao paulo',
+    'sp': 'sao paulo',
+    'rj': 'rio de janeiro',
+    'ssa': 'salvador',
+    'sao luiz': 'sao luis',
+}
+
+UFS = frozenset((
+    'ac', 'al', 'ap', 'am', 'ba', 'ce', 'df', 'es', 'go', 'ma', 'mt', 'ms', 'mg', 'pa',
+    'pb', 'pr', 'pe', 'pi', 'rj', 'rn', 'rs', 'ro', 'rr', 'sc', 'sp', 'se', 'to',
+))
+
+# "Curitiba - PR", "Florianópolis, SC, Brasil", "Joinville/SC": a cidade é o primeiro trecho
+_SEPARADORES_RE = re.compile(r"\s*(?:,|/|\s-\s|\(|;)\s*")
+# "Curitiba-PR" (UF colada por hífen) ou "São Paulo SP" (separada só por espaço)
+_UF_SUFIXO_RE = re.compile(r"(?:-\s*|\s)([a-z]{2})$")
+_ESPACOS_RE = re.compile(r"\s+")
+
+
+def normalizar(texto: str) -> str:
+    """Remove acentos, passa para minúsculas e colapsa espaços."""
+    if not texto:
+        return ''
+    sem_acento = _normalize('NFD', texto).encode('ascii', 'ignore').decode('ascii')
+    return _ESPACOS_RE.sub(' ', sem_acento.lower()).strip()
+
+
+def extrair_cidade(destino: str) -> str:
+    """Nome normalizado da cidade contida em `destino` (sem UF/país, aliases resolvidos)."""
+    texto = normalizar(destino)
+    cidade = _SEPARADORES_RE.split(texto, maxsplit=1)[0].strip(' .-')
+    m = _UF_SUFIXO_RE.search(cidade)
+    if m and m.group(1) in UFS and cidade[:m.start()].strip(' -'):
+        cidade = cidade[:m.start()].strip(' -')
+    return ALIASES.get(cidade, cidade)
+
+
+_GRUPO_1 = frozenset(CIDADES_GRUPO_1)
+_CAPITAIS = frozenset(normalizar(c) for c in CAPITAIS_BRASIL) - _GRUPO_1
+REGIAO_POR_CIDADE = {
+    **{c: OUTROS for c in _CAPITAIS},
+    **{c: LOCAL for c in _GRUPO_1},
+}
+
+
+@lru_cache(maxsize=1024)
+def classificar_regiao(destino: str) -> str:
+    """
+    Retorna 'LOCAL' ou 'OUTROS' baseado no nome da cidade presente em `destino`.
+    regras:
+      - se cidade é Florianópolis/Curitiba -> LOCAL (grupo_1)
+      - se cidade é capital brasileira (exceto as duas acima) -> OUTROS
+      - senão -> LOCAL (interior)
+    """
+    return REGIAO_POR_CIDADE.get(extrair_cidade(destino or ''), LOCAL)
@@ -0,0 +1,321 @@
+# backend/core/services/submissao_service.py
+"""
+Etapas assíncronas da submissão de um processo (ver `tarefas_service`).
+
+O endpoint `submit` apenas grava o `Processo`, guarda os anexos em disco e
+enfileira uma `Tarefa` do tipo SUBMISSAO; as etapas abaixo fazem o trabalho
+pesado (Drive, Docs e e-mail) fora do ciclo da requisição.
+"""
+import io
+import logging
+import math
+from contextlib import ExitStack, contextmanager
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from num2words import num2words
+
+from core.models import Processo, ProcessoHistorico, Documento
+from core.services import destinatarios_service, google_drive_service, google_docs_service, pessoas_service, template_service
+from core.services.email_service import enfileirar_email_processo_criado
+
+# babel é usado apenas para formatações mais sofisticadas de datas. Se não estiver
+# disponível, caímos para uma formatação simples pt-BR.
+try:  # pragma: no cover - fallback para ambientes sem Babel
+    from babel.dates import format_date
+except ModuleNotFoundError:  # pragma: no cover
+    def format_date(date_obj, format="d 'de' MMMM 'de' yyyy", locale="pt_BR"):
+        return date_obj.strftime("%d/%m/%Y")
+
+logger = logging.getLogger(__name__)
+
+PASTA_DOCUMENTOS_RECEBIDOS = "1 - Documentos recebidos na solicitação"
+
+
+def valor_extenso_sem_centavos_if_round(value):
+    v = Decimal(str(value or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    inteiro = int(v // 1)
+    centavos = int((v - inteiro) * 100)
+    if centavos == 0:
+        words = num2words(inteiro, lang='pt_BR', to='cardinal')
+        currency_word = 'real' if abs(inteiro) == 1 else 'reais'
+        return f"{words} {currency_word}"
+    return num2words(float(v), lang='pt_BR', to='currency')
+
+
+def format_tag_value(value, prefix="", suffix="", is_currency=False):
+    if value is None or float(value) == 0:
+        return "-----"
+    if is_currency:
+        formatted_value = f"{float(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        return f"R$ {formatted_value}"
+    return f"{prefix}{value}{suffix}"
+
+
+def nome_pasta_processo(processo) -> str:
+    return f"Diária {processo.numero}-{processo.ano} - {processo.solicitante.get_full_name()}"
+
+
+def montar_replacements(processo, calculos_frontend: dict, tem_anexos: bool) -> dict:
+    """Monta o dicionário de tags do template do documento de solicitação."""
+    local_created_at = timezone.localtime(processo.created_at)
+
+    # Cálculo correto do período da viagem
+    delta_dias = processo.data_retorno - processo.data_saida
+    numero_dias = math.ceil(delta_dias.total_seconds() / 86400)
+    periodo_viagem_str = f"{int(numero_dias)} dia(s)"
+
+    diarias_data = calculos_frontend.get('calculo_diarias', {})
+    deslocamento_data = calculos_frontend.get('calculo_deslocamento', {})
+    signatarios = pessoas_service.diretorio()
+
+    return {
+        'Numero': f"{processo.numero}-{processo.ano}",
+        'Nome': processo.solicitante.get_full_name(),
+        'CPF': processo.solicitante.profile.cpf or '',
+        'Cargo': processo.solicitante.profile.cargo or '',
+        'Local_Destino': processo.destino,
+        'Hora_Partida': timezone.localtime(processo.data_saida).strftime('%d/%m/%Y %H:%M'),
+        'Hora_Retorno': timezone.localtime(processo.data_retorno).strftime('%d/%m/%Y %H:%M'),
+        'Transporte': processo.get_meio_transporte_display(),
+        'placa': f"Placa: {processo.placa_veiculo}" if processo.placa_veiculo else '-----',
+        'solicitadoEm': local_created_at.strftime('%d/%m/%Y %H:%M'),
+        'Periodo_Viagem': periodo_viagem_str,
+
+        'numCom': format_tag_value(diarias_data.get('num_com_pernoite', 0)),
+        'upmCom': format_tag_value(diarias_data.get('upm_com_pernoite', 0)),
+        'vlrUPM': format_tag_value(diarias_data.get('valor_upm_usado', 0), is_currency=True),
+        'totalCom': format_tag_value(diarias_data.get('total_com_pernoite', 0), is_currency=True),
+        'numSem': format_tag_value(diarias_data.get('num_sem_pernoite', 0)),
+        'upmSem': format_tag_value(diarias_data.get('upm_sem_pernoite', 0)),
+        'totalSem': format_tag_value(diarias_data.get('total_sem_pernoite', 0), is_currency=True),
+        'numMeia': format_tag_value(diarias_data.get('num_meia_diaria', 0)),
+        'upmMeia': format_tag_value(diarias_data.get('upm_meia_diaria', 0)),
+        'totalMeia': format_tag_value(diarias_data.get('total_meia_diaria', 0), is_currency=True),
+        'totalDiarias': format_tag_value(diarias_data.get('valor_total_diarias', 0), is_currency=True),
+
+        'kmTotal': format_tag_value(deslocamento_data.get('distancia_km', 0)),
+        'precoGas': format_tag_value(deslocamento_data.get('preco_gas_usado', 0), is_currency=True),
+        'vlrDeslocamento': format_tag_value(deslocamento_data.get('valor_deslocamento', 0), is_currency=True),
+
+        'totEmpenhar': format_tag_value(calculos_frontend.get('total_empenhar', 0), is_currency=True),
+        'Total_Empenhar': format_tag_value(calculos_frontend.get('total_empenhar', 0), is_currency=True),
+        'Vlr_Total_Extenso': (
+            valor_extenso_sem_centavos_if_round(calculos_frontend.get('total_empenhar', 0))
+            if calculos_frontend.get('total_empenhar', 0) else '-----'
+        ),
+
+        'Finalidade': processo.objetivo_viagem,
+        'constaAnexo': 'Sim' if tem_anexos else 'Não',
+        'ponto': 'SIM',
+        'Pagamento_Curso': (
+            'Sim - ' + format_tag_value(processo.valor_taxa_inscricao, is_currency=True)
+        ) if processo.solicita_pagamento_inscricao else 'Não',
+        'justificaViagemAntecipada': processo.justificativa_viagem_antecipada or '',
+        'observacoes': processo.observacoes or '-----',
+        'extrair_data': format_date(local_created_at.date(), format='d \'de\' MMMM \'de\' yyyy', locale='pt_BR'),
+        'NomePresidente': signatarios['presidente'],
+        'NomeContador': signatarios['contador'],
+        'NomeControlador': signatarios['controlador'],
+    }
+
+
+# --- Etapas da tarefa SUBMISSAO ---
+
+def etapa_criar_pastas(tarefa):
+    """root -> ano -> processo -> '1 - Documentos recebidos na solicitação'."""
+    processo = tarefa.processo
+    ano_folder = google_drive_service.ensure_folder(settings.GDRIVE_ROOT_FOLDER_ID, str(processo.ano))
+    processo_folder = google_drive_service.ensure_folder(ano_folder['id'], nome_pasta_processo(processo))
+    docs_folder = google_drive_service.ensure_folder(processo_folder['id'], PASTA_DOCUMENTOS_RECEBIDOS)
+
+    processo.gdrive_folder_id = processo_folder['id']
+    processo.save(update_fields=['gdrive_folder_id', 'updated_at'])
+
+    tarefa.resultado.update({
+        'processo_folder_id': processo_folder['id'],
+        'docs_folder_id': docs_folder['id'],
+        'folder_url': processo_folder.get('webViewLink'),
+    })
+
+
+def _refazer_pastas(tarefa):
+    """
+    A pasta gravada em `tarefa.resultado` sumiu do Drive (404). O cache de pastas
+    já foi invalidado; aqui a etapa 'criar_pastas' volta a ficar pendente para
+    que a próxima tentativa resolva as pastas de novo em vez de repetir o 404.
+    """
+    tarefa.etapas_concluidas = [nome for nome in tarefa.etapas_concluidas if nome != 'criar_pastas']
+    tarefa.resultado.pop('docs_folder_id', None)
+
+
+@contextmanager
+def _pasta_do_drive(tarefa):
+    try:
+        yield
+    except google_drive_service.HttpError as e:
+        if google_drive_service.is_not_found(e):
+            _refazer_pastas(tarefa)
+        raise
+
+
+def etapa_enviar_anexos(tarefa):
+    """
+    Envia em paralelo os anexos guardados em disco e grava os `Documento` em lote.
+    Cada anexo enviado é removido da fila de pendentes, então uma nova tentativa
+    só reenvia os que falharam.
+    """
+    processo = tarefa.processo
+    anexos = list(tarefa.anexos.all())
+    if not anexos:
+        return
+
+    with ExitStack() as stack:
+        arquivos = [
+            (anexo.nome_arquivo, stack.enter_context(anexo.arquivo.open('rb')), anexo.content_type or None)
+            for anexo in anexos
+        ]
+        resultados = google_drive_service.upload_files(tarefa.resultado['docs_folder_id'], arquivos)
+
+    enviados = [(anexo, res['file']) for anexo, res in zip(anexos, resultados) if res['ok']]
+    Documento.objects.bulk_create([
+        Documento(
+            processo=processo,
+            nome_arquivo=anexo.nome_arquivo,
+            gdrive_file_id=meta['id'],
+            gdrive_file_url=meta.get('webViewLink'),
+            tipo_documento=Documento.TipoDocumento.OUTRO,
+            uploaded_by=processo.solicitante
+        )
+        for anexo, meta in enviados
+    ])
+    for anexo, _ in enviados:
+        anexo.arquivo.delete(save=False)
+        anexo.delete()
+
+    falhas = [res for res in resultados if not res['ok']]
+    if any(res['not_found'] for res in falhas):
+        _refazer_pastas(tarefa)
+    if falhas:
+        raise RuntimeError(
+            "Falha no upload de %d anexo(s): %s" % (len(falhas), ", ".join(f"{r['filename']} ({r['error']})" for r in falhas))
+        )
+
+
+def _titulo_documento(processo) -> str:
+    return f"Solicitação de Diária - {nome_pasta_processo(processo)}"
+
+
+def _gerar_documento_local(tarefa, replacements):
+    """Renderiza o .docx localmente e o envia convertido para Google Docs (1 chamada)."""
+    docx = template_service.renderizar_docx(replacements)
+    uploaded = google_drive_service.upload_file(
+        tarefa.resultado['docs_folder_id'], _titulo_documento(tarefa.processo), io.BytesIO(docx),
+        mimetype=template_service.DOCX_MIMETYPE,
+        target_mimetype=template_service.GOOGLE_DOC_MIMETYPE,
+    )
+    # o PDF é um passo à parte: se falhar, a nova tentativa reaproveita o documento
+    tarefa.resultado.update({
+        'doc_id': uploaded['id'], 'doc_url': uploaded.get('webViewLink'),
+        'pdf_pendente': getattr(settings, "GERAR_PDF_LOCAL", False),
+    })
+    tarefa.save(update_fields=['resultado', 'updated_at'])
+
+
+def _gerar_pdf_local(tarefa, replacements):
+    """Converte o .docx renderizado em PDF (LibreOffice) e o envia para a mesma pasta."""
+    docx = template_service.renderizar_docx(replacements)
+    pdf = google_drive_service.upload_file(
+        tarefa.resultado['docs_folder_id'], f"{_titulo_documento(tarefa.processo)}.pdf",
+        io.BytesIO(template_service.converter_para_pdf(docx)),
+        mimetype=template_service.PDF_MIMETYPE,
+    )
+    tarefa.resultado.update({'pdf_url': pdf.get('webViewLink'), 'pdf_pendente': False})
+
+
+def etapa_gerar_documento(tarefa):
+    """
+    Gera o documento de solicitação na pasta do processo. Com um template .docx
+    local (DOCX_TEMPLATE_PATH) o documento é renderizado aqui e enviado num único
+    upload; sem ele, cai no fluxo antigo: cópia do template do Google Docs + replace_tags.
+    """
+    processo = tarefa.processo
+    replacements = montar_replacements(
+        processo,
+        tarefa.payload.get('calculos', {}),
+        tem_anexos=tarefa.payload.get('tem_anexos', False),
+    )
+
+    if not tarefa.resultado.get('doc_id'):
+        with _pasta_do_drive(tarefa):
+            if template_service.template_disponivel():
+                _gerar_documento_local(tarefa, replacements)
+            else:
+                doc_copy = google_drive_service.copy_file(
+                    file_id=settings.GDOC_TEMPLATE_ID,
+                    new_title=_titulo_documento(processo),
+                    parent_id=tarefa.resultado['docs_folder_id']
+                )
+                # grava o id antes do replace: uma nova tentativa reaproveita a cópia
+                tarefa.resultado.update({
+                    'doc_id': doc_copy['id'], 'doc_url': doc_copy.get('webViewLink'), 'tags_pendentes': True
+                })
+                tarefa.save(update_fields=['resultado', 'updated_at'])
+
+    if tarefa.resultado.get('pdf_pendente'):
+        with _pasta_do_drive(tarefa):
+            _gerar_pdf_local(tarefa, replacements)
+
+    if tarefa.resultado.get('tags_pendentes'):
+        google_docs_service.replace_tags(tarefa.resultado['doc_id'], replacements)
+        tarefa.resultado['tags_pendentes'] = False
+
+    if not tarefa.resultado.get('folder_url'):
+        tarefa.resultado['folder_url'] = google_drive_service.get_folder_link(tarefa.resultado['processo_folder_id'])
+
+
+def etapa_concluir_submissao(tarefa):
+    """
+    Move o processo para 'Aguardando Análise Administrativa', registra o
+    histórico e grava o aviso ao Controle Interno na caixa de saída, tudo na
+    mesma transação (o envio fica com o comando `enviar_emails`).
+    """
+    with transaction.atomic():
+        processo = Processo.objects.select_for_update().select_related('solicitante').get(pk=tarefa.processo_id)
+        if processo.status != Processo.Status.RASCUNHO:
+            return
+        status_anterior = processo.status
+        processo.status = Processo.Status.ANALISE_ADMIN
+        processo.save(update_fields=['status', 'updated_at'])
+
+        ProcessoHistorico.objects.create(
+            processo=processo,
+            status_anterior=status_anterior,
+            status_novo=processo.status,
+            responsavel=processo.solicitante,
+            anotacao="Documento gerado no submit."
+        )
+
+        controle_emails = destinatarios_service.emails_do_perfil('controle_interno')
+        logger.info(
+            "Destinatários Controle Interno resolvidos para processo %s: %s",
+            processo.id, controle_emails
+        )
+        tarefa.resultado['email_message_id'] = enfileirar_email_processo_criado(
+            processo,
+            controle_emails,
+            requester_email=processo.solicitante.email,
+            doc_url=tarefa.resultado.get('doc_url'),
+            folder_url=tarefa.resultado.get('folder_url'),
+        )
+    tarefa.processo = processo
+
+
+ETAPAS = [
+    ('criar_pastas', etapa_criar_pastas),
+    ('enviar_anexos', etapa_enviar_anexos),
+    ('gerar_documento', etapa_gerar_documento),
+    ('concluir_submissao', etapa_concluir_submissao),
+]
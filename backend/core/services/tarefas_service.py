@@ -0,0 +1,146 @@
+# backend/core/services/tarefas_service.py
+"""
+Fila de tarefas assíncronas apoiada no banco de dados.
+
+Uma tarefa é uma sequência ordenada de etapas; cada etapa é uma função que
+recebe a `Tarefa` e pode gravar o que produziu em `tarefa.resultado`. As etapas
+concluídas ficam registradas em `etapas_concluidas`, de modo que uma nova
+tentativa recomeça exatamente na etapa que falhou.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Tarefa
+
+logger = logging.getLogger(__name__)
+
+# segundos base do backoff exponencial entre tentativas (30s, 60s, 120s, ...)
+BACKOFF_BASE_SEGUNDOS = getattr(settings, "TAREFAS_BACKOFF_BASE_SEGUNDOS", 30)
+BACKOFF_MAX_SEGUNDOS = getattr(settings, "TAREFAS_BACKOFF_MAX_SEGUNDOS", 3600)
+# tarefa "em execução" há mais tempo que isso é considerada abandonada (worker morreu)
+TIMEOUT_EXECUCAO_SEGUNDOS = getattr(settings, "TAREFAS_TIMEOUT_EXECUCAO_SEGUNDOS", 900)
+
+
+def _etapas(tipo: str):
+    """Lista ordenada de (nome, função) de cada tipo de tarefa."""
+    from core.services import submissao_service
+    return {
+        Tarefa.Tipo.SUBMISSAO: submissao_service.ETAPAS,
+    }[tipo]
+
+
+def nomes_etapas(tipo: str) -> list[str]:
+    return [nome for nome, _ in _etapas(tipo)]
+
+
+def enfileirar(tipo: str, processo=None, payload: dict | None = None) -> Tarefa:
+    """
+    Cria uma tarefa pendente. Se `TAREFAS_MODO_SINCRONO` estiver ativo (útil em
+    desenvolvimento, sem worker rodando), a tarefa é executada logo após o commit.
+    """
+    tarefa = Tarefa.objects.create(tipo=tipo, processo=processo, payload=payload or {})
+    if getattr(settings, "TAREFAS_MODO_SINCRONO", False):
+        transaction.on_commit(lambda: executar(tarefa.id))
+    return tarefa
+
+
+def _backoff(tentativas: int) -> timedelta:
+    segundos = min(BACKOFF_BASE_SEGUNDOS * (2 ** max(tentativas - 1, 0)), BACKOFF_MAX_SEGUNDOS)
+    return timedelta(seconds=segundos)
+
+
+def reservar_proxima() -> Tarefa | None:
+    """
+    Reserva a próxima tarefa disponível para este worker.
+    A reserva é um UPDATE condicional (status + timestamp), então dois workers
+    nunca pegam a mesma tarefa, mesmo em bancos sem SELECT ... FOR UPDATE.
+    """
+    agora = timezone.now()
+    limite_abandono = agora - timedelta(seconds=TIMEOUT_EXECUCAO_SEGUNDOS)
+    disponiveis = (
+        Tarefa.objects
+        .filter(
+            Q(status=Tarefa.Status.PENDENTE, executar_apos__lte=agora)
+            | Q(status=Tarefa.Status.EM_EXECUCAO, iniciada_em__lt=limite_abandono)
+        )
+        .order_by('executar_apos', 'id')
+        .values_list('id', 'status', 'iniciada_em')[:10]
+    )
+    for tarefa_id, status_atual, iniciada_em in disponiveis:
+        reservada = Tarefa.objects.filter(
+            id=tarefa_id, status=status_atual, iniciada_em=iniciada_em
+        ).update(status=Tarefa.Status.EM_EXECUCAO, iniciada_em=agora, updated_at=agora)
+        if reservada:
+            return Tarefa.objects.select_related('processo').get(id=tarefa_id)
+    return None
+
+
+def _executar_etapas(tarefa: Tarefa) -> Tarefa:
+    tarefa.tentativas += 1
+    tarefa.save(update_fields=['tentativas', 'updated_at'])
+
+    for nome, funcao in _etapas(tarefa.tipo):
+        if nome in tarefa.etapas_concluidas:
+            continue
+        tarefa.etapa_atual = nome
+        tarefa.save(update_fields=['etapa_atual', 'updated_at'])
+        try:
+            funcao(tarefa)
+        except Exception as e:
+            logger.exception("Tarefa %s falhou na etapa '%s' (tentativa %s)", tarefa.id, nome, tarefa.tentativas)
+            tarefa.ultimo_erro = f"{nome}: {e}"
+            if tarefa.tentativas >= tarefa.max_tentativas:
+                tarefa.status = Tarefa.Status.FALHOU
+            else:
+                tarefa.status = Tarefa.Status.PENDENTE
+                tarefa.executar_apos = timezone.now() + _backoff(tarefa.tentativas)
+            tarefa.iniciada_em = None
+            tarefa.save()
+            return tarefa
+        tarefa.etapas_concluidas = [*tarefa.etapas_concluidas, nome]
+        tarefa.save(update_fields=['etapas_concluidas', 'resultado', 'updated_at'])
+
+    tarefa.status = Tarefa.Status.CONCLUIDA
+    tarefa.etapa_atual = ''
+    tarefa.ultimo_erro = ''
+    tarefa.iniciada_em = None
+    tarefa.save()
+    logger.info("Tarefa %s concluída após %s tentativa(s)", tarefa.id, tarefa.tentativas)
+    return tarefa
+
+
+def executar(tarefa_id: int) -> Tarefa | None:
+    """Executa imediatamente uma tarefa específica (se não estiver com outro worker)."""
+    agora = timezone.now()
+    reservada = Tarefa.objects.filter(
+        id=tarefa_id, status=Tarefa.Status.PENDENTE
+    ).update(status=Tarefa.Status.EM_EXECUCAO, iniciada_em=agora, updated_at=agora)
+    if not reservada:
+        return None
+    return _executar_etapas(Tarefa.objects.select_related('processo').get(id=tarefa_id))
+
+
+def processar_pendentes(limite: int | None = None) -> int:
+    """Executa tarefas disponíveis até esvaziar a fila (ou atingir `limite`)."""
+    processadas = 0
+    while limite is None or processadas < limite:
+        tarefa = reservar_proxima()
+        if tarefa is None:
+            break
+        _executar_etapas(tarefa)
+        processadas += 1
+    return processadas
+
+
+def rodar_worker(intervalo: float = 2.0):
+    """Loop infinito do worker: processa a fila e dorme `intervalo` segundos quando vazia."""
+    logger.info("Worker de tarefas iniciado (intervalo=%ss)", intervalo)
+    while True:
+        if not processar_pendentes():
+            time.sleep(intervalo)
@@ -0,0 +1,238 @@
+# backend/core/services/template_service.py
+"""
+Renderização local do documento de solicitação a partir de um template .docx.
+
+O template é lido e pré-processado uma única vez: as partes XML com texto
+(document, headers e footers) são compiladas numa lista de segmentos
+literal/tag, e cada geração só faz a junção das strings com os valores.
+Substitui o caminho `files().copy` + `documents().batchUpdate` do Google Docs
+por um único upload (com conversão para Google Docs).
+"""
+import io
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DOCX_MIMETYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+GOOGLE_DOC_MIMETYPE = "application/vnd.google-apps.document"
+PDF_MIMETYPE = "application/pdf"
+
+# partes do pacote .docx que podem conter tags
+_PARTE_RE = re.compile(r"^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$")
+# abertura/fechamento de parágrafo (não casa <w:pPr>, <w:proofErr> etc.)
+_PARAGRAFO_TAG_RE = re.compile(r"<w:p(?:\s[^>]*)?>|</w:p>")
+# marcador de um parágrafo interno já processado; \x00 nunca aparece em XML
+_FILHO_RE = re.compile(r"\x00(\d+)\x00")
+_TEXTO_RE = re.compile(r"(<w:t(?:\s[^>]*)?>)(.*?)(</w:t>)", re.S)
+# no XML, "<<Tag>>" aparece escapado como "&lt;&lt;Tag&gt;&gt;"
+_TAG_RE = re.compile(r"&lt;&lt;(\w+)&gt;&gt;")
+_QUEBRA_LINHA = '</w:t><w:br/><w:t xml:space="preserve">'
+
+
+class TemplateError(Exception):
+    pass
+
+
+def _preservar_espacos(abertura: str) -> str:
+    if "xml:space" in abertura:
+        return abertura
+    return abertura[:-1] + ' xml:space="preserve">'
+
+
+def _unir_runs(paragrafo: str) -> str:
+    """
+    O Word costuma quebrar um "<<Tag>>" em vários runs (<w:t>) por causa de
+    revisão ortográfica/formatação. Quando isso acontece, todo o texto do
+    parágrafo é movido para o primeiro run (mantendo a sua formatação).
+    """
+    textos = _TEXTO_RE.findall(paragrafo)
+    completo = "".join(t[1] for t in textos)
+    tags_no_paragrafo = len(_TAG_RE.findall(completo))
+    if not tags_no_paragrafo:
+        return paragrafo
+    if tags_no_paragrafo == sum(len(_TAG_RE.findall(t[1])) for t in textos):
+        # todas as tags já estão inteiras dentro de um único run
+        return _TEXTO_RE.sub(
+            lambda m: (_preservar_espacos(m.group(1)) if _TAG_RE.search(m.group(2)) else m.group(1)) + m.group(2) + m.group(3),
+            paragrafo,
+        )
+
+    primeiro = [True]
+
+    def _sub(m):
+        if primeiro[0]:
+            primeiro[0] = False
+            return _preservar_espacos(m.group(1)) + completo + m.group(3)
+        return m.group(1) + m.group(3)
+
+    return _TEXTO_RE.sub(_sub, paragrafo)
+
+
+def _restaurar_filhos(paragrafo: str, filhos: list[str]) -> str:
+    if not filhos:
+        return paragrafo
+    return _FILHO_RE.sub(lambda m: filhos[int(m.group(1))], paragrafo)
+
+
+def _unir_runs_dos_paragrafos(xml: str) -> str:
+    """
+    Aplica `_unir_runs` a cada parágrafo do XML. Um parágrafo pode conter
+    outros (caixas de texto: <w:p>...<w:txbxContent><w:p>...</w:p>...</w:p>);
+    os internos são tratados primeiro e ficam mascarados no parágrafo externo,
+    de modo que os runs de um nunca são misturados com os do outro.
+    """
+    # pilha de (partes, filhos); a base guarda o que está fora de parágrafos
+    pilha = [([], [])]
+    pos = 0
+    for m in _PARAGRAFO_TAG_RE.finditer(xml):
+        tag = m.group(0)
+        if tag.endswith("/>"):  # <w:p/>: parágrafo vazio
+            continue
+        pilha[-1][0].append(xml[pos:m.start()])
+        pos = m.end()
+        if tag != "</w:p>":
+            pilha.append(([tag], []))
+            continue
+        if len(pilha) == 1:  # fechamento sem abertura: mantém como está
+            pilha[0][0].append(tag)
+            continue
+        partes, filhos = pilha.pop()
+        partes.append(tag)
+        paragrafo = _restaurar_filhos(_unir_runs("".join(partes)), filhos)
+        pai_partes, pai_filhos = pilha[-1]
+        if len(pilha) == 1:
+            pai_partes.append(paragrafo)
+        else:
+            pai_partes.append(f"\x00{len(pai_filhos)}\x00")
+            pai_filhos.append(paragrafo)
+    pilha[-1][0].append(xml[pos:])
+
+    # parágrafos sem fechamento (XML malformado) voltam sem alteração
+    while len(pilha) > 1:
+        partes, filhos = pilha.pop()
+        pilha[-1][0].append(_restaurar_filhos("".join(partes), filhos))
+    return "".join(pilha[0][0])
+
+
+def _compilar(xml: str) -> list[str]:
+    """Retorna [literal, tag, literal, tag, ..., literal]."""
+    return _TAG_RE.split(_unir_runs_dos_paragrafos(xml))
+
+
+def _valor_xml(valor) -> str:
+    return escape("" if valor is None else str(valor)).replace("\n", _QUEBRA_LINHA)
+
+
+class TemplateDocx:
+    """Template .docx pré-processado, pronto para renderizações repetidas."""
+
+    def __init__(self, conteudo: bytes):
+        try:
+            with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+                self._membros = [(info, zf.read(info.filename)) for info in zf.infolist()]
+        except zipfile.BadZipFile as e:
+            raise TemplateError(f"Template .docx inválido: {e}")
+        self._partes = {
+            info.filename: _compilar(dados.decode("utf-8"))
+            for info, dados in self._membros
+            if _PARTE_RE.match(info.filename)
+        }
+        self.tags = frozenset(
+            tag for segmentos in self._partes.values() for tag in segmentos[1::2]
+        )
+
+    @classmethod
+    def from_path(cls, path):
+        with open(path, "rb") as fh:
+            return cls(fh.read())
+
+    def render(self, replacements: dict) -> bytes:
+        """
+        Substitui cada <<Tag>> pelo valor correspondente em `replacements` e
+        devolve os bytes do .docx final. Tags sem valor permanecem no texto,
+        como no `replaceAllText` do Google Docs.
+        """
+        valores = {k: _valor_xml(v) for k, v in (replacements or {}).items()}
+        saida = io.BytesIO()
+        with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED) as zf:
+            for info, dados in self._membros:
+                segmentos = self._partes.get(info.filename)
+                if segmentos is not None:
+                    partes = segmentos[:]
+                    for i in range(1, len(partes), 2):
+                        tag = partes[i]
+                        partes[i] = valores.get(tag, f"&lt;&lt;{tag}&gt;&gt;")
+                    dados = "".join(partes).encode("utf-8")
+                zf.writestr(info, dados)
+        return saida.getvalue()
+
+
+_lock = threading.Lock()
+_cache: dict = {}
+
+
+def caminho_template() -> str | None:
+    return getattr(settings, "DOCX_TEMPLATE_PATH", None)
+
+
+def template_disponivel() -> bool:
+    path = caminho_template()
+    return bool(path) and os.path.exists(path)
+
+
+def get_template(path=None) -> TemplateDocx:
+    """Template compilado em cache; recarrega apenas se o arquivo mudar em disco."""
+    path = str(path or caminho_template() or "")
+    if not path or not os.path.exists(path):
+        raise TemplateError(f"Template .docx não encontrado: {path or '(DOCX_TEMPLATE_PATH vazio)'}")
+    chave = (path, os.path.getmtime(path))
+    template = _cache.get(chave)
+    if template is None:
+        with _lock:
+            template = _cache.get(chave)
+            if template is None:
+                template = TemplateDocx.from_path(path)
+                _cache.clear()
+                _cache[chave] = template
+                logger.info("Template %s carregado (%d tags)", path, len(template.tags))
+    return template
+
+
+def carregar_template_padrao():
+    """Pré-carrega o template configurado (chamado na inicialização do app)."""
+    if template_disponivel():
+        try:
+            get_template()
+        except TemplateError:
+            logger.exception("Falha ao pré-carregar o template .docx")
+
+
+def renderizar_docx(replacements: dict, path=None) -> bytes:
+    return get_template(path).render(replacements)
+
+
+def converter_para_pdf(docx_bytes: bytes) -> bytes:
+    """Converte um .docx em PDF com o LibreOffice em modo headless."""
+    soffice = shutil.which("soffice") or shutil.which("libreoffice")
+    if not soffice:
+        raise TemplateError("LibreOffice (soffice) não encontrado para gerar o PDF.")
+    with tempfile.TemporaryDirectory() as tmp:
+        origem = os.path.join(tmp, "documento.docx")
+        with open(origem, "wb") as fh:
+            fh.write(docx_bytes)
+        subprocess.run(
+            [soffice, "--headless", "--convert-to", "pdf", "--outdir", tmp, origem],
+            check=True, capture_output=True, timeout=120,
+        )
+        with open(os.path.join(tmp, "documento.pdf"), "rb") as fh:
+            return fh.read()
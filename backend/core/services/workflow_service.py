@@ -1,8 +1,14 @@
 # backend/core/services/workflow_service.py
+from collections import defaultdict
 from typing import List, Dict
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from core.models import Processo, ProcessoHistorico, Profile, Role
+from django.dispatch import Signal
+from django.utils import timezone
+from core.models import Processo, ProcessoHistorico, STATUS_FINALIZADOS
+from core.services import contadores_service
+from core.services.maquina_estados import MaquinaEstados
+from core.services.principal_service import principal_de
 
 User = get_user_model()
 
@@ -29,44 +35,50 @@ TRANSICOES: Dict[str, List[str]] = {
     S.AGUARDANDO_INSCRICAO: [S.AGUARDANDO_EMPENHO, S.CANCELADO],
     S.AGUARDANDO_EMPENHO: [S.AGUARDANDO_PAGAMENTO],
     S.AGUARDANDO_PAGAMENTO: [S.AGUARDANDO_PC],
-    S.AGUARDANDO_PC: [S.PC_EM_ANALISE, S.AGUARDANDO_DEVOLUCAO if hasattr(S, "AGUARDANDO_DEVOLUCAO") else S.PC_EM_ANALISE],
+    S.AGUARDANDO_PC: [S.PC_EM_ANALISE],
     S.PC_EM_ANALISE: [S.AGUARDANDO_ASSINATURAS_PC, S.CORRECAO_PENDENTE],
     S.AGUARDANDO_ASSINATURAS_PC: [S.PC_ANALISE_CONTABILIDADE],
     S.PC_ANALISE_CONTABILIDADE: [S.ARQUIVADO],
 }
 
-def _slugs_do_user(user: User) -> List[str]:
-    try:
-        prof = Profile.objects.get(user=user)
-    except Profile.DoesNotExist:
-        return []
-    slugs = list(prof.roles.values_list("slug", flat=True))
-    # “flags” comuns — ajuste se tiver
-    if user.is_staff and "adm" not in slugs:
-        slugs.append("adm")
-    return [s.lower() for s in slugs]
+# Compilada uma vez na importação; as tabelas acima são só a declaração.
+MAQUINA = MaquinaEstados(
+    TRANSICOES, PERMISSOES,
+    estados=S.values,
+    iniciais=[S.RASCUNHO],
+    finais=STATUS_FINALIZADOS,
+    # o submit (submissao_service) leva o processo de RASCUNHO para a análise
+    externas={S.RASCUNHO: [S.ANALISE_ADMIN]},
+)
 
-def _user_pode_operar(user: User, processo: Processo) -> bool:
-    slugs = _slugs_do_user(user)
+# Disparado dentro da transação de cada transição (unitária ou em lote), com:
+#   transicoes=[(processo_id, solicitante_id, status_anterior), ...], destino, usuario
+# Receptores gravam o que precisarem na mesma transação (ver core.signals).
+processo_transicionado = Signal()
+
+def _perfis(user: User, processo: Processo) -> frozenset:
+    slugs = principal_de(user).slugs
     # solicitante sempre pode quando a permissão exigir 'solicitante'
     if processo.solicitante_id == user.id:
-        slugs.append("solicitante")
-    exigidos = PERMISSOES.get(processo.status, [])
-    return any(s in exigidos for s in slugs) if exigidos else False
+        slugs = slugs | {"solicitante"}
+    return slugs
+
+def _user_pode_operar(user: User, processo: Processo) -> bool:
+    return MAQUINA.perfis_podem_operar(processo.status, _perfis(user, processo))
 
 def acoes_permitidas(processo: Processo, user: User) -> List[str]:
-    return TRANSICOES.get(processo.status, []) if _user_pode_operar(user, processo) else []
+    return list(MAQUINA.destinos(processo.status)) if _user_pode_operar(user, processo) else []
 
 @transaction.atomic
 def transicionar(processo: Processo, destino: str, user: User, observacao: str = "") -> ProcessoHistorico:
-    if destino not in TRANSICOES.get(processo.status, []):
+    if not MAQUINA.pode_transicionar(processo.status, destino):
         raise ValueError(f"Transição inválida: {processo.status} → {destino}")
     if not _user_pode_operar(user, processo):
         raise PermissionError("Usuário sem permissão para esta etapa.")
 
     de = processo.status
     processo.status = destino
-    processo.save(update_fields=["status"])
+    processo.save(update_fields=["status", "updated_at"])
 
     hist = ProcessoHistorico.objects.create(
         processo=processo,
@@ -75,4 +87,55 @@ def transicionar(processo: Processo, destino: str, user: User, observacao: str =
         responsavel=user,
         anotacao=(observacao or "")
     )
+    processo_transicionado.send(
+        sender=Processo, transicoes=[(processo.pk, processo.solicitante_id, de)], destino=destino, usuario=user
+    )
     return hist
+
+
+@transaction.atomic
+def transicionar_lote(processo_ids, destino: str, user: User, observacao: str = "", queryset=None) -> Dict[str, list]:
+    """
+    Aplica a mesma transição a vários processos de uma vez.
+    A validação (TRANSICOES/PERMISSOES) é feita em memória; a gravação é um
+    UPDATE por status de origem e um bulk_create do histórico, tudo na mesma
+    transação. Processos inválidos não impedem os demais: voltam em `falhas`.
+    `queryset` restringe o universo visível (ex.: escopo do perfil ativo).
+    """
+    ids = list(dict.fromkeys(processo_ids))
+    base = Processo.objects.all() if queryset is None else queryset
+    processos = base.select_for_update().filter(pk__in=ids).only("id", "status", "solicitante_id")
+    encontrados = {p.pk: p for p in processos}
+
+    falhas = []
+    por_origem = defaultdict(list)
+    for pk in ids:
+        processo = encontrados.get(pk)
+        if processo is None:
+            falhas.append({"id": pk, "detail": "Processo não encontrado."})
+        elif not MAQUINA.pode_transicionar(processo.status, destino):
+            falhas.append({"id": pk, "detail": f"Transição inválida: {processo.status} → {destino}"})
+        elif not _user_pode_operar(user, processo):
+            falhas.append({"id": pk, "detail": "Usuário sem permissão para esta etapa."})
+        else:
+            por_origem[processo.status].append(pk)
+
+    agora = timezone.now()
+    historicos = []
+    transicoes = []
+    for origem, ids_origem in por_origem.items():
+        Processo.objects.filter(pk__in=ids_origem, status=origem).update(status=destino, updated_at=agora)
+        historicos.extend(
+            ProcessoHistorico(
+                processo_id=pk, status_anterior=origem, status_novo=destino,
+                responsavel=user, anotacao=(observacao or ""),
+            )
+            for pk in ids_origem
+        )
+        transicoes.extend((pk, encontrados[pk].solicitante_id, origem) for pk in ids_origem)
+    if historicos:
+        ProcessoHistorico.objects.bulk_create(historicos)
+        contadores_service.invalidar()
+        processo_transicionado.send(sender=Processo, transicoes=transicoes, destino=destino, usuario=user)
+
+    return {"atualizados": [h.processo_id for h in historicos], "falhas": falhas}
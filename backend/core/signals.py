@@ -1,9 +1,12 @@
 # backend/core/signals.py
 
-from django.db.models.signals import post_save
-from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.contrib.auth.models import Group, User
 from django.dispatch import receiver
-from .models import Profile, Role
+from .cache_utils import incrementar_versao
+from .models import DistanciaRota, Processo, Profile, Role, ParametrosSistema
+from .services import calculos_service, contadores_service, destinatarios_service, notificacoes_service, pessoas_service, principal_service
+from .services.workflow_service import processo_transicionado
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -28,4 +31,87 @@ def create_user_profile(sender, instance, created, **kwargs):
             print("AVISO CRÍTICO: O Perfil de Acesso com slug 'solicitante' não foi encontrado.")
             print(f"O novo usuário '{instance.username}' foi criado sem um perfil padrão.")
             print("Por favor, crie o perfil 'Solicitante' no painel de administração.")
-            print("="*50)
\ No newline at end of file
+            print("="*50)
+
+
+@receiver([post_save, post_delete], sender=ParametrosSistema)
+def invalidar_cache_parametros(sender, **kwargs):
+    """Nova versão dos parâmetros: todos os workers recarregam na próxima leitura."""
+    incrementar_versao(ParametrosSistema.CACHE_NAMESPACE)
+
+
+@receiver([post_save, post_delete], sender=DistanciaRota)
+def invalidar_cache_rotas(sender, created=False, **kwargs):
+    """Rota corrigida ou removida (ex.: pelo admin); rotas novas não deixam nada obsoleto."""
+    if not created:
+        calculos_service.invalidar_rotas()
+
+
+@receiver([post_save, post_delete], sender=Processo)
+def invalidar_contadores_processo(sender, update_fields=None, **kwargs):
+    """
+    Processo criado, editado (ex.: PATCH pelo ProcessoViewSet) ou excluído:
+    os contadores do dashboard são recalculados. Saves que só tocam campos que
+    não entram na contagem (ex.: gdrive_folder_id) não invalidam. Transições em
+    lote usam queryset.update() e invalidam diretamente (workflow_service).
+    """
+    if update_fields and not set(update_fields) & {'status', 'solicitante'}:
+        return
+    contadores_service.invalidar()
+
+
+@receiver(m2m_changed, sender=Profile.roles.through)
+def invalidar_principal_roles(sender, instance, action, reverse, **kwargs):
+    """Perfis de acesso alterados: descarta o principal em cache."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # alterado a partir do Role (role.profiles.add(...)): pode afetar vários usuários
+        principal_service.invalidar_todos()
+    else:
+        principal_service.invalidar_usuario(instance.user_id)
+    destinatarios_service.invalidar()
+    pessoas_service.invalidar()
+
+
+@receiver([post_save, post_delete], sender=Role)
+def invalidar_principal_role(sender, **kwargs):
+    principal_service.invalidar_todos()
+    destinatarios_service.invalidar()
+    pessoas_service.invalidar()
+
+
+@receiver(post_delete, sender=Profile)
+def invalidar_principal_profile(sender, instance, **kwargs):
+    principal_service.invalidar_usuario(instance.user_id)
+    destinatarios_service.invalidar()
+    pessoas_service.invalidar()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidar_destinatarios_usuario(sender, update_fields=None, **kwargs):
+    """Nome, e-mail ou is_active podem ter mudado; o login (só last_login) não conta."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    destinatarios_service.invalidar()
+    pessoas_service.invalidar()
+
+
+@receiver([post_save, post_delete], sender=Group)
+def invalidar_diretorios_grupo(sender, **kwargs):
+    destinatarios_service.invalidar()
+    pessoas_service.invalidar()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_diretorios_membros_grupo(sender, action, **kwargs):
+    """Usuário entrou/saiu de um Grupo (fallback dos perfis e cargos nos diretórios)."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        destinatarios_service.invalidar()
+        pessoas_service.invalidar()
+
+
+@receiver(processo_transicionado)
+def notificar_transicao(sender, transicoes, destino, usuario=None, **kwargs):
+    """Registra as notificações da transição (entregues depois, em resumos)."""
+    notificacoes_service.registrar_transicoes(transicoes, destino, usuario)
@@ -1,3 +1,1054 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import smtplib
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.mail.backends import locmem
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.models import AnexoPendente, DistanciaRota, Documento, EmailPendente, Notificacao, ParametrosSistema, PastaDriveCache, Processo, Role, SequenciaProcesso, Tarefa
+from core import cache_utils, models as core_models
+from core.checks import verificar_cache_compartilhado, verificar_workflow
+from core.services import calculos_service, destinatarios_service, email_service, google_drive_service, notificacoes_service, pessoas_service, regioes_service, submissao_service, tarefas_service, template_service, workflow_service
+
+
+def erro_drive(status):
+    """HttpError com o status HTTP que o googleapiclient anexaria em `resp`."""
+    erro = google_drive_service.HttpError(f"HTTP {status}")
+    erro.resp = mock.Mock(status=status)
+    return erro
+
+
+def criar_processo(solicitante, **kwargs):
+    agora = timezone.now()
+    dados = dict(
+        solicitante=solicitante, objetivo_viagem="Capacitação", destino="Curitiba, PR",
+        data_saida=agora, data_retorno=agora + timedelta(days=1),
+        meio_transporte=Processo.MeioTransporte.VEICULO_OFICIAL, numero=1, ano=agora.year,
+    )
+    dados.update(kwargs)
+    return Processo.objects.create(**dados)
+
+
+class DriveFalsoMixin:
+    """
+    Substitui as chamadas ao Drive/Docs usadas pela tarefa SUBMISSAO por mocks:
+    pastas viram '<nome>@<pai>', uploads sempre dão certo e o documento é a cópia
+    do template do Google Docs (sem .docx local).
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        google_drive_service.clear_folder_cache()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        def _ensure_folder(parent_id, name):
+            return {"id": f"{name}@{parent_id}", "name": name, "webViewLink": f"https://drive/{name}"}
+
+        def _upload_files(parent_id, files):
+            return [
+                {"filename": nome, "ok": True, "file": {"id": f"{nome}@{parent_id}"}, "error": None, "not_found": False}
+                for nome, _, _ in files
+            ]
+
+        self.drive = {}
+        for alvo, nome, kwargs in [
+            (google_drive_service, "ensure_folder", {"side_effect": _ensure_folder}),
+            (google_drive_service, "upload_files", {"side_effect": _upload_files}),
+            (google_drive_service, "copy_file", {"return_value": {"id": "doc", "webViewLink": "https://docs/doc"}}),
+            (google_drive_service, "get_folder_link", {"return_value": "https://drive/processo"}),
+            (submissao_service.google_docs_service, "replace_tags", {}),
+            (submissao_service.template_service, "template_disponivel", {"return_value": False}),
+        ]:
+            patch = mock.patch.object(alvo, nome, **kwargs)
+            self.drive[nome] = patch.start()
+            self.addCleanup(patch.stop)
+
+    def criar_tarefa(self, anexos=(), **kwargs):
+        processo = criar_processo(self.usuario)
+        tarefa = Tarefa.objects.create(
+            tipo=Tarefa.Tipo.SUBMISSAO, processo=processo,
+            payload={"calculos": {}, "tem_anexos": bool(anexos)}, **kwargs,
+        )
+        for nome in anexos:
+            AnexoPendente.objects.create(tarefa=tarefa, arquivo=ContentFile(b"%PDF", name=nome), nome_arquivo=nome)
+        return tarefa
+
+    def executar(self, tarefa):
+        """Roda uma tentativa, ignorando o backoff agendado."""
+        Tarefa.objects.filter(pk=tarefa.pk).update(executar_apos=timezone.now())
+        with mock.patch.object(tarefas_service, "logger"):
+            tarefas_service.executar(tarefa.pk)
+        tarefa.refresh_from_db()
+        return tarefa
+
+
+class TarefaSubmissaoTests(DriveFalsoMixin, TestCase):
+    """Fila de tarefas: retomada por etapa, backoff, FALHOU e limpeza dos anexos pendentes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x", first_name="Ana")
+
+    def test_conclui_todas_as_etapas(self):
+        tarefa = self.executar(self.criar_tarefa())
+        self.assertEqual(tarefa.status, Tarefa.Status.CONCLUIDA)
+        self.assertEqual(tarefa.etapas_concluidas, tarefas_service.nomes_etapas(Tarefa.Tipo.SUBMISSAO))
+        self.assertEqual(tarefa.tentativas, 1)
+        self.assertEqual(tarefa.resultado["doc_url"], "https://docs/doc")
+        tarefa.processo.refresh_from_db()
+        self.assertEqual(tarefa.processo.status, Processo.Status.ANALISE_ADMIN)
+        self.assertEqual(tarefa.processo.gdrive_folder_id, tarefa.resultado["processo_folder_id"])
+
+    def test_pasta_do_processo_atualiza_updated_at(self):
+        # o ETag do detalhe (api.views) é derivado de updated_at
+        self.drive["copy_file"].side_effect = RuntimeError("Docs fora do ar")
+        tarefa = self.criar_tarefa()
+        antes = timezone.now() - timedelta(hours=1)
+        Processo.objects.filter(pk=tarefa.processo_id).update(updated_at=antes)
+        tarefa = self.executar(tarefa)
+        self.assertEqual(tarefa.etapas_concluidas[0], "criar_pastas")
+        tarefa.processo.refresh_from_db()
+        self.assertTrue(tarefa.processo.gdrive_folder_id)
+        self.assertGreater(tarefa.processo.updated_at, antes)
+
+    def test_retoma_da_etapa_que_falhou(self):
+        self.drive["copy_file"].side_effect = [RuntimeError("Docs fora do ar"), {"id": "doc", "webViewLink": "u"}]
+        tarefa = self.executar(self.criar_tarefa(anexos=["a.pdf"]))
+        self.assertEqual(tarefa.status, Tarefa.Status.PENDENTE)
+        self.assertEqual(tarefa.etapa_atual, "gerar_documento")
+        self.assertEqual(tarefa.etapas_concluidas, ["criar_pastas", "enviar_anexos"])
+        self.assertIn("Docs fora do ar", tarefa.ultimo_erro)
+
+        tarefa = self.executar(tarefa)
+        self.assertEqual(tarefa.status, Tarefa.Status.CONCLUIDA)
+        self.assertEqual(tarefa.tentativas, 2)
+        self.assertEqual(tarefa.ultimo_erro, "")
+        # as etapas já concluídas não rodam de novo
+        self.assertEqual(self.drive["ensure_folder"].call_count, 3)
+        self.assertEqual(self.drive["upload_files"].call_count, 1)
+        self.assertEqual(Documento.objects.filter(processo=tarefa.processo).count(), 1)
+
+    def test_backoff_exponencial_entre_tentativas(self):
+        self.drive["copy_file"].side_effect = RuntimeError("falha")
+        tarefa = self.criar_tarefa()
+        for tentativa, segundos in [(1, 30), (2, 60), (3, 120)]:
+            antes = timezone.now()
+            tarefa = self.executar(tarefa)
+            self.assertEqual(tarefa.tentativas, tentativa)
+            self.assertEqual(tarefa.status, Tarefa.Status.PENDENTE)
+            self.assertIsNone(tarefa.iniciada_em)
+            atraso = (tarefa.executar_apos - antes).total_seconds()
+            self.assertAlmostEqual(atraso, segundos, delta=5)
+            # só volta a ser reservada depois do backoff
+            self.assertIsNone(tarefas_service.reservar_proxima())
+        self.assertEqual(tarefas_service._backoff(20), timedelta(seconds=tarefas_service.BACKOFF_MAX_SEGUNDOS))
+
+    def test_falhou_apos_o_maximo_de_tentativas(self):
+        self.drive["ensure_folder"].side_effect = RuntimeError("Drive fora do ar")
+        tarefa = self.criar_tarefa(max_tentativas=2)
+        self.assertEqual(self.executar(tarefa).status, Tarefa.Status.PENDENTE)
+        tarefa = self.executar(tarefa)
+        self.assertEqual(tarefa.status, Tarefa.Status.FALHOU)
+        self.assertEqual(tarefa.tentativas, 2)
+        self.assertEqual(tarefa.etapas_concluidas, [])
+        self.assertIn("criar_pastas: Drive fora do ar", tarefa.ultimo_erro)
+        # nem a fila nem uma execução direta pegam a tarefa de novo
+        Tarefa.objects.filter(pk=tarefa.pk).update(executar_apos=timezone.now())
+        self.assertIsNone(tarefas_service.reservar_proxima())
+        self.assertIsNone(tarefas_service.executar(tarefa.pk))
+
+    def test_anexos_enviados_saem_da_fila_de_pendentes(self):
+        tarefa = self.criar_tarefa(anexos=["a.pdf", "b.pdf"])
+        caminhos = {a.nome_arquivo: a.arquivo.path for a in tarefa.anexos.all()}
+        self.drive["upload_files"].side_effect = [
+            [{"filename": "a.pdf", "ok": True, "file": {"id": "a"}, "error": None, "not_found": False},
+             {"filename": "b.pdf", "ok": False, "file": None, "error": "500", "not_found": False}],
+            [{"filename": "b.pdf", "ok": True, "file": {"id": "b"}, "error": None, "not_found": False}],
+        ]
+        tarefa = self.executar(tarefa)
+        self.assertEqual(tarefa.status, Tarefa.Status.PENDENTE)
+        self.assertEqual(list(tarefa.anexos.values_list("nome_arquivo", flat=True)), ["b.pdf"])
+        self.assertFalse(os.path.exists(caminhos["a.pdf"]))
+        self.assertTrue(os.path.exists(caminhos["b.pdf"]))
+
+        tarefa = self.executar(tarefa)
+        self.assertEqual(tarefa.status, Tarefa.Status.CONCLUIDA)
+        # a segunda tentativa só reenviou o anexo que falhou
+        self.assertEqual([nome for nome, _, _ in self.drive["upload_files"].call_args.args[1]], ["b.pdf"])
+        self.assertFalse(tarefa.anexos.exists())
+        self.assertFalse(os.path.exists(caminhos["b.pdf"]))
+        self.assertEqual(
+            sorted(Documento.objects.filter(processo=tarefa.processo).values_list("gdrive_file_id", flat=True)),
+            ["a", "b"],
+        )
+
+    def test_reserva_nao_entrega_a_mesma_tarefa_duas_vezes(self):
+        tarefa = self.criar_tarefa()
+        self.assertEqual(tarefas_service.reservar_proxima().pk, tarefa.pk)
+        self.assertIsNone(tarefas_service.reservar_proxima())
+        self.assertIsNone(tarefas_service.executar(tarefa.pk))
+
+
+class PastaRemovidaDoDriveTests(DriveFalsoMixin, TestCase):
+    """404 numa pasta vinda do resultado/cache: a tentativa seguinte refaz 'criar_pastas'."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x", first_name="Ana")
+
+    def _tarefa_com_pasta_velha(self, **kwargs):
+        return self.criar_tarefa(
+            etapas_concluidas=["criar_pastas"],
+            resultado={"processo_folder_id": "proc-velha", "docs_folder_id": "docs-velha", "folder_url": "x"},
+            **kwargs,
+        )
+
+    def _assert_pastas_refeitas(self, tarefa):
+        self.assertEqual(tarefa.status, Tarefa.Status.PENDENTE)
+        self.assertNotIn("criar_pastas", tarefa.etapas_concluidas)
+        self.assertNotIn("docs_folder_id", tarefa.resultado)
+
+        tarefa = self.executar(tarefa)
+        self.assertEqual(tarefa.status, Tarefa.Status.CONCLUIDA)
+        self.assertNotEqual(tarefa.resultado["docs_folder_id"], "docs-velha")
+        return tarefa
+
+    def test_404_no_upload_dos_anexos(self):
+        tarefa = self._tarefa_com_pasta_velha(anexos=["a.pdf"])
+        self.drive["upload_files"].side_effect = [
+            [{"filename": "a.pdf", "ok": False, "file": None, "error": "404", "not_found": True}],
+            [{"filename": "a.pdf", "ok": True, "file": {"id": "a"}, "error": None, "not_found": False}],
+        ]
+        tarefa = self._assert_pastas_refeitas(self.executar(tarefa))
+        self.assertEqual(self.drive["upload_files"].call_args.args[0], tarefa.resultado["docs_folder_id"])
+
+    def test_404_ao_gerar_o_documento(self):
+        tarefa = self._tarefa_com_pasta_velha()
+        self.drive["copy_file"].side_effect = [erro_drive(404), {"id": "doc", "webViewLink": "https://docs/doc"}]
+        tarefa = self._assert_pastas_refeitas(self.executar(tarefa))
+        self.assertEqual(self.drive["copy_file"].call_args.kwargs["parent_id"], tarefa.resultado["docs_folder_id"])
+
+    def test_outros_erros_nao_refazem_as_pastas(self):
+        tarefa = self._tarefa_com_pasta_velha()
+        self.drive["copy_file"].side_effect = erro_drive(500)
+        tarefa = self.executar(tarefa)
+        self.assertEqual(tarefa.status, Tarefa.Status.PENDENTE)
+        self.assertEqual(tarefa.etapas_concluidas, ["criar_pastas", "enviar_anexos"])
+        self.assertEqual(tarefa.resultado["docs_folder_id"], "docs-velha")
+
+
+@override_settings(GERAR_PDF_LOCAL=True)
+class DocumentoLocalTests(DriveFalsoMixin, TestCase):
+    """Documento renderizado do .docx local; o PDF é um passo próprio e idempotente."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x", first_name="Ana")
+
+    def setUp(self):
+        super().setUp()
+        self.drive["template_disponivel"].return_value = True
+        for alvo, nome, kwargs in [
+            (template_service, "renderizar_docx", {"return_value": b"docx"}),
+            (template_service, "converter_para_pdf", {"side_effect": [template_service.TemplateError("soffice"), b"%PDF"]}),
+            (google_drive_service, "upload_file", {"side_effect": lambda parent_id, titulo, *a, **kw: {
+                "id": titulo, "webViewLink": f"https://drive/{titulo}",
+            }}),
+        ]:
+            patch = mock.patch.object(alvo, nome, **kwargs)
+            self.drive[nome] = patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_falha_no_pdf_nao_regera_o_documento(self):
+        tarefa = self.executar(self.criar_tarefa())
+        self.assertEqual(tarefa.status, Tarefa.Status.PENDENTE)
+        self.assertEqual(tarefa.etapa_atual, "gerar_documento")
+        self.assertTrue(tarefa.resultado["doc_id"])
+        self.assertTrue(tarefa.resultado["pdf_pendente"])
+        self.assertEqual(self.drive["upload_file"].call_count, 1)
+
+        tarefa = self.executar(tarefa)
+        self.assertEqual(tarefa.status, Tarefa.Status.CONCLUIDA)
+        self.assertFalse(tarefa.resultado["pdf_pendente"])
+        self.assertTrue(tarefa.resultado["pdf_url"].endswith(".pdf"))
+        # segunda tentativa: só o PDF foi enviado
+        self.assertEqual(self.drive["upload_file"].call_count, 2)
+        self.assertEqual(self.drive["upload_file"].call_args.kwargs["mimetype"], template_service.PDF_MIMETYPE)
+        self.drive["copy_file"].assert_not_called()
+
+
+class UploadParaleloTests(TestCase):
+    """upload_files: falhas por arquivo e invalidação do cache de pastas fora das threads."""
+
+    def setUp(self):
+        google_drive_service.clear_folder_cache()
+        patch = mock.patch.object(google_drive_service, "_thread_service", return_value=mock.Mock())
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_404_invalida_o_cache_na_thread_que_chamou(self):
+        PastaDriveCache.objects.create(parent_id="raiz", nome="docs", folder_id="pasta-sumida")
+        threads = []
+        invalidate_original = google_drive_service.invalidate_folder
+
+        def _invalidate(folder_id):
+            threads.append(threading.current_thread())
+            invalidate_original(folder_id)
+
+        def _upload(parent_id, filename, *args, **kwargs):
+            self.assertFalse(kwargs["invalidate_on_404"])
+            if filename == "b.pdf":
+                raise erro_drive(404)
+            return {"id": f"id-{filename}"}
+
+        arquivos = [(nome, io.BytesIO(b"x"), "application/pdf") for nome in ("a.pdf", "b.pdf", "c.pdf")]
+        with mock.patch.object(google_drive_service, "upload_file", side_effect=_upload), \
+                mock.patch.object(google_drive_service, "invalidate_folder", side_effect=_invalidate), \
+                self.assertLogs(google_drive_service.logger, "ERROR"):
+            resultados = google_drive_service.upload_files("pasta-sumida", arquivos, max_workers=3)
+
+        self.assertEqual([r["ok"] for r in resultados], [True, False, True])
+        self.assertEqual([r["not_found"] for r in resultados], [False, True, False])
+        self.assertEqual(threads, [threading.current_thread()])
+        self.assertFalse(PastaDriveCache.objects.filter(folder_id="pasta-sumida").exists())
+
+    def test_sem_404_nao_invalida(self):
+        with mock.patch.object(google_drive_service, "upload_file", side_effect=erro_drive(500)), \
+                mock.patch.object(google_drive_service, "invalidate_folder") as invalidate, \
+                self.assertLogs(google_drive_service.logger, "ERROR"):
+            resultados = google_drive_service.upload_files("pasta", [("a.pdf", io.BytesIO(b"x"), None)] * 2)
+        self.assertEqual([r["ok"] for r in resultados], [False, False])
+        invalidate.assert_not_called()
+
+
+class DriveCredenciaisTests(unittest.TestCase):
+    """Clientes do Drive por thread reaproveitam as credenciais lidas uma vez no processo."""
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(google_drive_service, "_credentials", None),
+            mock.patch.object(google_drive_service, "service_account"),
+            mock.patch.object(google_drive_service, "build"),
+            mock.patch.object(google_drive_service, "upload_file", return_value={"id": "x"}),
+        ]
+        self.mocks = [p.start() for p in patches]
+        for p in patches:
+            self.addCleanup(p.stop)
+        self.service_account, self.build = self.mocks[1], self.mocks[2]
+
+    @override_settings(GOOGLE_SERVICE_ACCOUNT_FILE="sa.json")
+    def test_arquivo_lido_uma_vez_para_todas_as_threads(self):
+        arquivos = [(f"{i}.pdf", io.BytesIO(b"x"), None) for i in range(3)]
+        for _ in range(2):
+            google_drive_service.upload_files("pasta", arquivos, max_workers=3)
+
+        self.service_account.Credentials.from_service_account_file.assert_called_once_with(
+            "sa.json", scopes=google_drive_service.SCOPES
+        )
+        creds = self.service_account.Credentials.from_service_account_file.return_value
+        self.assertTrue(self.build.call_args_list)
+        for chamada in self.build.call_args_list:
+            self.assertIs(chamada.kwargs["credentials"], creds)
+
+    @override_settings(GOOGLE_SERVICE_ACCOUNT_FILE=None)
+    def test_sem_service_account(self):
+        with self.assertRaises(RuntimeError):
+            google_drive_service._get_drive_service()
+
+
+class ParametrosSistemaCacheTests(TestCase):
+    """ParametrosSistema.current(): memória do processo -> cache -> banco, por versão."""
+
+    def setUp(self):
+        cache.clear()
+        core_models._parametros_em_memoria.clear()
+        self.parametros = ParametrosSistema.objects.create(valor_upm=Decimal("1.00"), preco_medio_gasolina=Decimal("6.00"))
+
+    def _alterar_sem_signal(self, valor):
+        # UPDATE direto (outro processo, shell...): nenhuma versão é incrementada
+        ParametrosSistema.objects.filter(pk=self.parametros.pk).update(valor_upm=Decimal(valor))
+
+    def test_leituras_seguintes_nao_consultam_o_banco(self):
+        ParametrosSistema.current()
+        with self.assertNumQueries(0):
+            self.assertEqual(ParametrosSistema.current().valor_upm, Decimal("1.00"))
+
+    def test_edicao_aparece_apos_trocar_a_versao(self):
+        self.assertEqual(ParametrosSistema.current().valor_upm, Decimal("1.00"))
+        self._alterar_sem_signal("2.00")
+        self.assertEqual(ParametrosSistema.current().valor_upm, Decimal("1.00"))
+
+        cache_utils.incrementar_versao(ParametrosSistema.CACHE_NAMESPACE)
+        self.assertEqual(ParametrosSistema.current().valor_upm, Decimal("2.00"))
+
+        # save() pelo admin: o signal troca a versão
+        self.parametros.valor_upm = Decimal("3.00")
+        self.parametros.save()
+        self.assertEqual(ParametrosSistema.current().valor_upm, Decimal("3.00"))
+
+    def test_memoria_expira_mesmo_sem_trocar_a_versao(self):
+        ParametrosSistema.current()
+        self._alterar_sem_signal("2.00")
+        versao = cache_utils.get_versao(ParametrosSistema.CACHE_NAMESPACE)
+        cache.delete(f"{ParametrosSistema.CACHE_NAMESPACE}:{versao}")  # expirou no cache (CACHE_TIMEOUT)
+        self.assertEqual(ParametrosSistema.current().valor_upm, Decimal("1.00"))
+
+        depois = time.monotonic() + cache_utils.MEMORIA_TTL + 1
+        with mock.patch.object(cache_utils.time, "monotonic", return_value=depois):
+            self.assertEqual(ParametrosSistema.current().valor_upm, Decimal("2.00"))
+
+    def test_aviso_de_cache_local_no_deploy(self):
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            self.assertEqual([a.id for a in verificar_cache_compartilhado(None)], ["core.W003"])
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}):
+            self.assertEqual(verificar_cache_compartilhado(None), [])
+
+
+class DiretorioPessoasTests(TestCase):
+    """pessoas_service.diretorio(): signatários por cargo, invalidados pelos signals e com validade no processo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.presidente = Role.objects.create(name="Presidente", slug="presidente")
+        cls.ana = User.objects.create_user("ana", "ana@example.com", "x", first_name="Ana", last_name="Lima")
+        cls.bia = User.objects.create_user("bia", "bia@example.com", "x", first_name="Bia", last_name="Reis")
+
+    def setUp(self):
+        cache.clear()
+        pessoas_service._em_memoria.clear()
+
+    def test_troca_de_cargo_aparece_no_diretorio(self):
+        self.assertEqual(pessoas_service.get_nome_presidente(), pessoas_service.CARGOS["presidente"])
+
+        self.ana.profile.roles.add(self.presidente)
+        self.assertEqual(pessoas_service.get_nome_presidente(), "Ana Lima")
+
+        self.ana.profile.roles.remove(self.presidente)
+        self.bia.profile.roles.add(self.presidente)
+        self.assertEqual(pessoas_service.get_nome_presidente(), "Bia Reis")
+
+        self.bia.first_name = "Beatriz"
+        self.bia.save()
+        self.assertEqual(pessoas_service.get_nome_presidente(), "Beatriz Reis")
+
+    def test_grupo_como_fallback(self):
+        grupo = Group.objects.create(name="Contador")
+        self.ana.groups.add(grupo)
+        self.assertEqual(pessoas_service.nome_do_cargo("contador"), "Ana Lima")
+
+    def test_memoria_expira_mesmo_sem_trocar_a_versao(self):
+        # worker com cache local: a troca de versão feita no web não chega até ele
+        self.ana.profile.roles.add(self.presidente)
+        self.assertEqual(pessoas_service.aquecer()["presidente"], "Ana Lima")
+        User.objects.filter(pk=self.ana.pk).update(first_name="Anna")
+        versao = cache_utils.get_versao(pessoas_service.CACHE_NAMESPACE)
+        cache.delete(f"{pessoas_service.CACHE_NAMESPACE}:{versao}")  # expirou no cache (CACHE_TIMEOUT)
+        with self.assertNumQueries(0):
+            self.assertEqual(pessoas_service.get_nome_presidente(), "Ana Lima")
+
+        depois = time.monotonic() + cache_utils.MEMORIA_TTL + 1
+        with mock.patch.object(cache_utils.time, "monotonic", return_value=depois):
+            self.assertEqual(pessoas_service.get_nome_presidente(), "Anna Lima")
+
+
+class DestinatariosTests(TestCase):
+    """destinatarios_service: mapa perfil -> e-mails, fallback do settings e invalidação pelos signals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.controle = Role.objects.create(name="Controle Interno", slug="ci")
+        cls.contabilidade = Role.objects.create(name="Contabilidade", slug="contabilidade")
+        cls.ana = User.objects.create_user("ana", " Ana@Example.com ", "x")
+        cls.bia = User.objects.create_user("bia", "bia@example.com", "x")
+        cls.inativo = User.objects.create_user("caio", "caio@example.com", "x", is_active=False)
+        cls.sem_email = User.objects.create_user("davi", "", "x")
+
+    def setUp(self):
+        cache.clear()
+
+    def _versao(self):
+        return cache_utils.get_versao(destinatarios_service.CACHE_NAMESPACE)
+
+    def test_mapa_por_slug_e_nome_do_role(self):
+        for usuario in (self.ana, self.inativo, self.sem_email):
+            usuario.profile.roles.add(self.controle)
+        self.bia.profile.roles.add(self.contabilidade)
+        mapa = destinatarios_service.mapa_emails()
+        self.assertEqual(mapa["ci"], ["ana@example.com"])
+        self.assertEqual(mapa["controle_interno"], ["ana@example.com"])
+        self.assertEqual(destinatarios_service.emails_do_perfil("controle_interno"), ["ana@example.com"])
+        self.assertEqual(destinatarios_service.emails_do_perfil("contabilidade"), ["bia@example.com"])
+        with self.assertNumQueries(0):
+            destinatarios_service.mapa_emails()
+
+    def test_grupo_quando_nenhum_role_tem_membros(self):
+        grupo = Group.objects.create(name="Controle Interno")
+        grupo.user_set.add(self.bia, self.inativo)
+        self.assertEqual(destinatarios_service.emails_do_perfil("controle_interno"), ["bia@example.com"])
+
+        # com alguém no Role, o Grupo não é mais usado
+        self.ana.profile.roles.add(self.controle)
+        self.assertEqual(destinatarios_service.emails_do_perfil("controle_interno"), ["ana@example.com"])
+
+    @override_settings(CONTROLE_INTERNO_EMAILS=[" CI@Example.com", "", "ci@example.com"])
+    def test_fallback_do_settings(self):
+        self.assertEqual(destinatarios_service.emails_do_perfil("controle_interno"), ["ci@example.com"])
+        self.assertEqual(destinatarios_service.emails_do_perfil("pagamento"), [])
+        self.ana.profile.roles.add(self.controle)
+        self.assertEqual(destinatarios_service.emails_do_perfil("controle_interno"), ["ana@example.com"])
+
+    def test_signals_trocam_a_versao(self):
+        versao = self._versao()
+        self.ana.profile.roles.add(self.controle)  # m2m_changed
+        self.assertNotEqual(self._versao(), versao)
+
+        versao = self._versao()
+        self.ana.email = "ana.lima@example.com"
+        self.ana.save()
+        self.assertNotEqual(self._versao(), versao)
+        self.assertEqual(destinatarios_service.emails_do_perfil("ci"), ["ana.lima@example.com"])
+
+        versao = self._versao()
+        self.ana.last_login = timezone.now()
+        self.ana.save(update_fields=["last_login"])  # login não muda os destinatários
+        self.assertEqual(self._versao(), versao)
+
+        Group.objects.create(name="Pagamento").user_set.add(self.bia)
+        self.assertEqual(destinatarios_service.emails_do_perfil("pagamento"), ["bia@example.com"])
+
+
+class RegioesTests(unittest.TestCase):
+    """regioes_service: cidade extraída do destino (aliases, sufixos de UF) e região da diária."""
+
+    def test_aliases(self):
+        for alias, cidade in regioes_service.ALIASES.items():
+            for destino in (alias, alias.upper(), f"{alias.title()} - SC", f"{alias}, Brasil"):
+                with self.subTest(destino=destino):
+                    self.assertEqual(regioes_service.extrair_cidade(destino), cidade)
+
+    def test_sufixos_de_uf_e_pais(self):
+        for destino in (
+            "Curitiba", "Curitiba - PR", "Curitiba-PR", "Curitiba -PR", "Curitiba PR", "curitiba  pr",
+            "Curitiba, PR", "Curitiba/PR", "Curitiba (PR)", "Curitiba; PR", "Curitiba, PR, Brasil", " CURITIBA. ",
+        ):
+            with self.subTest(destino=destino):
+                self.assertEqual(regioes_service.extrair_cidade(destino), "curitiba")
+        self.assertEqual(regioes_service.extrair_cidade("Florianópolis, SC, Brasil"), "florianopolis")
+        self.assertEqual(regioes_service.extrair_cidade("Joinville/SC"), "joinville")
+        # sem cidade antes, a UF não é removida
+        self.assertEqual(regioes_service.extrair_cidade("PR"), "pr")
+
+    def test_classificacao(self):
+        casos = {
+            "Florianópolis, SC, Brasil": regioes_service.LOCAL,
+            "Curitiba - PR": regioes_service.LOCAL,
+            "Floripa": regioes_service.LOCAL,
+            "Joinville SC": regioes_service.LOCAL,
+            "São Paulo SP": regioes_service.OUTROS,
+            "Rio de Janeiro RJ": regioes_service.OUTROS,
+            "Porto Alegre-RS": regioes_service.OUTROS,
+            "Brasília, DF": regioes_service.OUTROS,
+            "BSB": regioes_service.OUTROS,
+            "sp": regioes_service.OUTROS,
+            "": regioes_service.LOCAL,
+        }
+        for destino, regiao in casos.items():
+            with self.subTest(destino=destino):
+                self.assertEqual(regioes_service.classificar_regiao(destino), regiao)
+
+
+class RotasCacheTests(TestCase):
+    """Distâncias em memória -> DistanciaRota -> API; correções pelo admin invalidam a memória."""
+
+    def setUp(self):
+        cache.clear()
+        calculos_service._rotas_cache.clear()
+        patch = mock.patch.object(calculos_service, "_consultar_distancia_api", return_value=1000)
+        self.api = patch.start()
+        self.addCleanup(patch.stop)
+
+    def _versao(self):
+        return cache_utils.get_versao(calculos_service.ROTAS_CACHE_NAMESPACE)
+
+    def test_consulta_a_api_uma_vez(self):
+        versao = self._versao()
+        self.assertEqual(calculos_service.obter_distancia_metros("Curitiba, PR"), 1000)
+        self.assertEqual(self._versao(), versao)  # rota nova não invalida as demais
+        with self.assertNumQueries(0):
+            self.assertEqual(calculos_service.obter_distancia_metros("curitiba,  pr"), 1000)
+        self.api.assert_called_once()
+
+    def test_correcao_e_remocao_pelo_admin(self):
+        calculos_service.obter_distancia_metros("Curitiba, PR")
+        rota = DistanciaRota.objects.get()
+
+        rota.distancia_metros = 2000
+        rota.save()
+        self.assertEqual(calculos_service.obter_distancia_metros("Curitiba, PR"), 2000)
+
+        rota.delete()
+        self.api.return_value = 3000
+        self.assertEqual(calculos_service.obter_distancia_metros("Curitiba, PR"), 3000)
+        self.assertEqual(self.api.call_count, 2)
+
+    def test_outro_processo_ve_a_troca_de_versao(self):
+        calculos_service.obter_distancia_metros("Curitiba, PR")
+        # correção feita em outro processo: só a versão (cache compartilhado) chega até aqui
+        DistanciaRota.objects.update(distancia_metros=2500)
+        self.assertEqual(calculos_service.obter_distancia_metros("Curitiba, PR"), 1000)
+        calculos_service.invalidar_rotas()
+        self.assertEqual(calculos_service.obter_distancia_metros("Curitiba, PR"), 2500)
+
+
+class CalculoDiariasTests(TestCase):
+    def test_usa_os_parametros_recebidos_sem_consultar_o_banco(self):
+        ParametrosSistema.objects.create(valor_upm=Decimal("1.00"), preco_medio_gasolina=Decimal("6.00"))
+        parametros = ParametrosSistema(valor_upm=Decimal("10.00"), preco_medio_gasolina=Decimal("6.00"))
+        saida = timezone.now()
+        with self.assertNumQueries(0):
+            detalhes = calculos_service.calcular_valor_diarias(
+                "Curitiba, PR", saida, saida + timedelta(days=1), regiao_diaria="OUTROS", parametros=parametros,
+            )
+        self.assertEqual(detalhes["valor_upm_usado"], Decimal("10.00"))
+
+
+W_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def run(texto, negrito=False):
+    propriedades = "<w:rPr><w:b/></w:rPr>" if negrito else ""
+    return f"<w:r>{propriedades}<w:t>{texto}</w:t></w:r>"
+
+
+def paragrafo(*runs):
+    return f'<w:p w14:paraId="1"><w:pPr><w:jc w:val="left"/></w:pPr>{"".join(runs)}</w:p>'
+
+
+def caixa_de_texto(*paragrafos):
+    return f"<w:r><w:pict><v:textbox><w:txbxContent>{''.join(paragrafos)}</w:txbxContent></v:textbox></w:pict></w:r>"
+
+
+def montar_docx(corpo, cabecalho=None) -> bytes:
+    """Pacote .docx mínimo com `corpo` em word/document.xml (e um header opcional)."""
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, "w") as zf:
+        zf.writestr("[Content_Types].xml", "<Types/>")
+        zf.writestr("word/document.xml", f"<w:document {W_NS}><w:body>{corpo}<w:p/></w:body></w:document>")
+        if cabecalho:
+            zf.writestr("word/header1.xml", f"<w:hdr {W_NS}>{cabecalho}</w:hdr>")
+        zf.writestr("word/styles.xml", "<w:styles>&lt;&lt;Nome&gt;&gt;</w:styles>")
+    return saida.getvalue()
+
+
+def ler_parte(docx: bytes, nome="word/document.xml") -> str:
+    with zipfile.ZipFile(io.BytesIO(docx)) as zf:
+        return zf.read(nome).decode("utf-8")
+
+
+class WorkflowTests(TestCase):
+    """Grafo de status compilado em workflow_service.MAQUINA."""
+
+    def test_grafo_sem_avisos(self):
+        self.assertEqual(verificar_workflow(None), [])
+
+    def test_correcao_sem_saida_fica_fora_do_aviso(self):
+        # o fluxo de correção da PC ainda não existe: o grafo não é alterado
+        maquina = workflow_service.MAQUINA
+        self.assertEqual(maquina.destinos(Processo.Status.CORRECAO_PENDENTE), ())
+        self.assertIn(Processo.Status.CORRECAO_PENDENTE, maquina.sem_saida)
+        self.assertEqual(maquina.problemas([Processo.Status.CORRECAO_PENDENTE]), [])
+        self.assertEqual(len(maquina.problemas()), 1)
+
+
+class TemplateDocxTests(TestCase):
+    """Renderização local do .docx: tags quebradas em runs, caixas de texto, escape."""
+
+    def test_tag_quebrada_em_varios_runs(self):
+        template = template_service.TemplateDocx(montar_docx(
+            paragrafo(run("Solicitante: &lt;&lt;No", negrito=True), run("me&gt;"), run("&gt; (&lt;&lt;CPF&gt;&gt;)"))
+        ))
+        self.assertEqual(template.tags, {"Nome", "CPF"})
+        xml = ler_parte(template.render({"Nome": "Ana", "CPF": "123"}))
+        # todo o texto vai para o primeiro run, que mantém a formatação
+        self.assertIn('<w:rPr><w:b/></w:rPr><w:t xml:space="preserve">Solicitante: Ana (123)</w:t>', xml)
+        self.assertNotIn("&lt;&lt;", xml)
+
+    def test_paragrafo_dentro_de_caixa_de_texto(self):
+        interno = paragrafo(run("Destino: &lt;&lt;Lo"), run("cal&gt;&gt;"))
+        externo = paragrafo(run("Antes &lt;&lt;Nu"), caixa_de_texto(interno), run("mero&gt;&gt; depois"))
+        xml = ler_parte(template_service.TemplateDocx(montar_docx(externo)).render(
+            {"Numero": "7-2026", "Local": "Curitiba"}
+        ))
+        caixa = xml[xml.index("<w:txbxContent>"):xml.index("</w:txbxContent>")]
+        self.assertIn("Destino: Curitiba", caixa)
+        self.assertNotIn("7-2026", caixa)
+        # os runs do parágrafo externo foram unidos entre si, sem tocar na caixa de texto
+        self.assertIn("Antes 7-2026 depois", xml[:xml.index("<w:txbxContent>")])
+        self.assertEqual(xml.count("<w:p "), 2)
+        self.assertEqual(xml.count("</w:p>"), 2)
+
+    def test_valores_escapados_tags_sem_valor_e_outras_partes(self):
+        template = template_service.TemplateDocx(montar_docx(
+            paragrafo(run("&lt;&lt;Finalidade&gt;&gt; / &lt;&lt;Faltando&gt;&gt;")),
+            cabecalho=paragrafo(run("Nº &lt;&lt;Num"), run("ero&gt;&gt;")),
+        ))
+        docx = template.render({"Finalidade": "A & B <C>\nlinha 2", "Numero": "1-2026"})
+        xml = ler_parte(docx)
+        self.assertIn("A &amp; B &lt;C&gt;" + template_service._QUEBRA_LINHA + "linha 2", xml)
+        self.assertIn("&lt;&lt;Faltando&gt;&gt;", xml)
+        self.assertIn("Nº 1-2026", ler_parte(docx, "word/header1.xml"))
+        # partes sem texto do documento não são tocadas
+        self.assertEqual(ler_parte(docx, "word/styles.xml"), "<w:styles>&lt;&lt;Nome&gt;&gt;</w:styles>")
+
+    def test_template_em_cache_ate_o_arquivo_mudar(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "modelo.docx")
+            with open(path, "wb") as fh:
+                fh.write(montar_docx(paragrafo(run("&lt;&lt;Nome&gt;&gt;"))))
+            self.assertIs(template_service.get_template(path), template_service.get_template(path))
+            with open(path, "wb") as fh:
+                fh.write(montar_docx(paragrafo(run("&lt;&lt;CPF&gt;&gt;"))))
+            os.utime(path, (time.time() + 10, time.time() + 10))
+            self.assertEqual(template_service.get_template(path).tags, {"CPF"})
+
+    def test_template_invalido(self):
+        with self.assertRaises(template_service.TemplateError):
+            template_service.TemplateDocx(b"isto nao e um zip")
+
+
+@unittest.skipUnless(os.environ.get("RUN_BENCHMARKS"), "benchmark: defina RUN_BENCHMARKS=1 para rodar")
+class TemplateDocxBenchmarkTests(TestCase):
+    """
+    Benchmark offline da renderização local: ~35 tags (como o documento de
+    solicitação), metade delas quebrada em runs, e um corpo de texto de algumas
+    páginas. Não faz nenhuma chamada ao Google.
+    """
+    RENDERIZACOES = 500
+    TAGS = 35
+
+    def test_renderizacao(self):
+        tags = [f"Tag{i}" for i in range(self.TAGS)]
+        corpo = "".join(
+            paragrafo(run(f"Campo {i}: &lt;&lt;{tag[:2]}"), run(f"{tag[2:]}&gt;&gt;")) if i % 2
+            else paragrafo(run(f"Campo {i}: &lt;&lt;{tag}&gt;&gt;"))
+            for i, tag in enumerate(tags)
+        ) + paragrafo(run("Lorem ipsum dolor sit amet. " * 40)) * 60
+        conteudo = montar_docx(corpo)
+
+        inicio = time.perf_counter()
+        template = template_service.TemplateDocx(conteudo)
+        compilacao = time.perf_counter() - inicio
+        self.assertEqual(len(template.tags), self.TAGS)
+
+        valores = {tag: f"valor {tag}" for tag in tags}
+        inicio = time.perf_counter()
+        for _ in range(self.RENDERIZACOES):
+            docx = template.render(valores)
+        por_documento = (time.perf_counter() - inicio) / self.RENDERIZACOES
+        self.assertNotIn("&lt;&lt;", ler_parte(docx))
+        print(f"\ncompilação: {compilacao * 1000:.2f} ms; renderização: {por_documento * 1000:.2f} ms/documento")
+
+
+class SequenciaProcessoTests(TestCase):
+    """Numeração sequencial por ano, sem MAX() sobre a tabela de processos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x")
+
+    def test_numeros_sequenciais_no_ano(self):
+        with transaction.atomic():
+            numeros = [SequenciaProcesso.proximo_numero(2026) for _ in range(3)]
+        self.assertEqual(numeros, [1, 2, 3])
+        self.assertEqual(SequenciaProcesso.objects.get(ano=2026).ultimo_numero, 3)
+
+    def test_virada_de_ano_recomeca_em_1(self):
+        with transaction.atomic():
+            SequenciaProcesso.proximo_numero(2025)
+            SequenciaProcesso.proximo_numero(2025)
+            self.assertEqual(SequenciaProcesso.proximo_numero(2026), 1)
+            self.assertEqual(SequenciaProcesso.proximo_numero(2025), 3)
+        self.assertEqual(
+            dict(SequenciaProcesso.objects.values_list("ano", "ultimo_numero")), {2025: 3, 2026: 1}
+        )
+
+    def test_rollback_devolve_o_numero(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            SequenciaProcesso.proximo_numero(2026)
+            raise RuntimeError("falha ao gravar o processo")
+        with transaction.atomic():
+            self.assertEqual(SequenciaProcesso.proximo_numero(2026), 1)
+
+    def test_numero_unico_por_ano(self):
+        criar_processo(self.usuario, numero=1, ano=2026)
+        criar_processo(self.usuario, numero=1, ano=2025)
+        # rascunhos ainda sem número não conflitam
+        criar_processo(self.usuario, numero=None, ano=None)
+        criar_processo(self.usuario, numero=None, ano=None)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            criar_processo(self.usuario, numero=1, ano=2026)
+
+
+class MigracaoSequenciaProcessoTests(TransactionTestCase):
+    """A migração 0017 inicializa as sequências e aborta se houver números repetidos."""
+    ANTES = [("core", "0016_distanciarota")]
+    DEPOIS = [("core", "0017_sequenciaprocesso")]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.ANTES)
+        self.addCleanup(self._voltar_para_o_fim)
+
+    def _voltar_para_o_fim(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def _criar_processos(self, *numeros_anos):
+        apps = self.executor.loader.project_state(self.ANTES).apps
+        usuario = apps.get_model("auth", "User").objects.create(username="ana")
+        Processo_ = apps.get_model("core", "Processo")
+        agora = timezone.now()
+        for numero, ano in numeros_anos:
+            Processo_.objects.create(
+                solicitante=usuario, numero=numero, ano=ano, objetivo_viagem="x", destino="y",
+                data_saida=agora, data_retorno=agora, meio_transporte="VEICULO_OFICIAL",
+            )
+
+    def _migrar(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.DEPOIS)
+        return executor.loader.project_state(self.DEPOIS).apps
+
+    def test_inicializa_com_o_maior_numero_de_cada_ano(self):
+        self._criar_processos((1, 2025), (7, 2025), (3, 2026), (None, None))
+        apps = self._migrar()
+        self.assertEqual(
+            dict(apps.get_model("core", "SequenciaProcesso").objects.values_list("ano", "ultimo_numero")),
+            {2025: 7, 2026: 3},
+        )
+
+    def test_aborta_com_numeros_repetidos(self):
+        self._criar_processos((1, 2025), (4, 2026), (4, 2026))
+        with self.assertRaisesMessage(RuntimeError, "4-2026 (2x)"):
+            self._migrar()
+        # a numeração repetida é desfeita para que o cleanup consiga migrar até o fim
+        apps = self.executor.loader.project_state(self.ANTES).apps
+        apps.get_model("core", "Processo").objects.filter(numero=4).delete()
+
+
+class CaixaDeSaidaTests(TestCase):
+    """enfileirar_email / enviar_pendentes com o backend locmem (mail.outbox)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        cls.usuario = User.objects.create_user("ana", "ana@example.com", "x")
+        cls.processo = criar_processo(cls.usuario)
+
+    def _enfileirar(self, evento="processo_criado", destinatarios=("ci@example.com",)):
+        return email_service.enfileirar_email(
+            self.processo, evento, f"Assunto {evento}", "corpo", list(destinatarios), copia=["ana@example.com"],
+        )
+
+    def _vencer_backoff(self):
+        EmailPendente.objects.update(executar_apos=timezone.now())
+
+    def test_deduplica_por_processo_e_evento(self):
+        primeiro = self._enfileirar()
+        self.assertEqual(self._enfileirar(destinatarios=["outro@example.com"]).pk, primeiro.pk)
+        self._enfileirar(evento="status_alterado")
+        self.assertEqual(EmailPendente.objects.count(), 2)
+
+        self.assertEqual(email_service.enviar_pendentes(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        mensagem = next(m for m in mail.outbox if m.subject == "Assunto processo_criado")
+        self.assertEqual((mensagem.to, mensagem.cc), (["ci@example.com"], ["ana@example.com"]))
+        self.assertEqual(mensagem.extra_headers["Message-ID"], primeiro.message_id)
+        # já enviado: reenfileirar o mesmo evento não gera outro envio
+        self._enfileirar()
+        self.assertEqual(email_service.enviar_pendentes(), 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_sem_destinatarios_nao_enfileira(self):
+        with self.assertLogs(email_service.logger, "WARNING"):
+            self.assertIsNone(self._enfileirar(destinatarios=["", None]))
+        self.assertFalse(EmailPendente.objects.exists())
+
+    def test_dois_workers_nao_enviam_a_mesma_linha(self):
+        self._enfileirar()
+        self._enfileirar(evento="outro")
+        # o worker A leu os candidatos; o B reserva e envia antes do UPDATE de A
+        candidatos_de_a = email_service._candidatos(10, timezone.now())
+        self.assertEqual(email_service.enviar_pendentes(), 2)
+        with mock.patch.object(email_service, "_candidatos", return_value=candidatos_de_a):
+            self.assertEqual(email_service.enviar_pendentes(), 0)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            set(EmailPendente.objects.values_list("status", "tentativas")), {(EmailPendente.Status.ENVIADO, 1)}
+        )
+
+    def test_envio_abandonado_volta_para_a_fila(self):
+        email = self._enfileirar()
+        self.assertEqual(len(email_service._reservar_lote(10)), 1)  # worker morreu após reservar
+        self.assertEqual(email_service.enviar_pendentes(), 0)
+        EmailPendente.objects.filter(pk=email.pk).update(
+            iniciado_em=timezone.now() - timedelta(seconds=email_service.TIMEOUT_ENVIO_SEGUNDOS + 1)
+        )
+        self.assertEqual(email_service.enviar_pendentes(), 1)
+
+    def test_erro_smtp_reagenda_com_backoff(self):
+        enviar_original = locmem.EmailBackend.send_messages
+        falhas = {"status_alterado": 1}
+
+        def _send_messages(backend, mensagens):
+            evento = "status_alterado" if "status_alterado" in mensagens[0].subject else "processo_criado"
+            if falhas.get(evento):
+                falhas[evento] -= 1
+                raise smtplib.SMTPServerDisconnected("conexão perdida")
+            return enviar_original(backend, mensagens)
+
+        falho = self._enfileirar(evento="status_alterado")
+        self._enfileirar()
+        with mock.patch.object(locmem.EmailBackend, "send_messages", autospec=True, side_effect=_send_messages), \
+                self.assertLogs(email_service.logger, "ERROR"):
+            antes = timezone.now()
+            # a falha de um e-mail não impede os demais do lote
+            self.assertEqual(email_service.enviar_pendentes(), 1)
+            falho.refresh_from_db()
+            self.assertEqual((falho.status, falho.tentativas), (EmailPendente.Status.PENDENTE, 1))
+            self.assertIn("conexão perdida", falho.ultimo_erro)
+            self.assertIsNone(falho.iniciado_em)
+            self.assertAlmostEqual(
+                (falho.executar_apos - antes).total_seconds(), email_service.BACKOFF_BASE_SEGUNDOS, delta=5
+            )
+            # ainda dentro do backoff
+            self.assertEqual(email_service.enviar_pendentes(), 0)
+
+            self._vencer_backoff()
+            self.assertEqual(email_service.enviar_pendentes(), 1)
+        falho.refresh_from_db()
+        self.assertEqual((falho.status, falho.tentativas, falho.ultimo_erro), (EmailPendente.Status.ENVIADO, 2, ""))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_falhou_apos_o_maximo_de_tentativas(self):
+        email = self._enfileirar()
+        EmailPendente.objects.filter(pk=email.pk).update(max_tentativas=2)
+        with mock.patch.object(locmem.EmailBackend, "send_messages", side_effect=OSError("SMTP fora do ar")), \
+                self.assertLogs(email_service.logger, "ERROR"):
+            email_service.enviar_pendentes()
+            self._vencer_backoff()
+            email_service.enviar_pendentes()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.tentativas), (EmailPendente.Status.FALHOU, 2))
+        self._vencer_backoff()
+        self.assertEqual(email_service.enviar_pendentes(), 0)
+        self.assertEqual(mail.outbox, [])
+
+
+class ResumoNotificacoesTests(TestCase):
+    """gerar_resumos: um e-mail por destinatário com todas as transições pendentes dele."""
+
+    DESTINO = Processo.Status.AGUARDANDO_ASSINATURAS_SOLICITACAO
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name="Solicitante", slug="solicitante")
+        assinatura = Role.objects.create(name="Assinatura", slug="assinatura")
+        User.objects.create_user("sig", "sig@example.com", "x").profile.roles.add(assinatura)
+        cls.operador = User.objects.create_user("op", "op@example.com", "x")
+        cls.ana = User.objects.create_user("ana", "ana@example.com", "x")
+        cls.bia = User.objects.create_user("bia", "bia@example.com", "x")
+
+    def setUp(self):
+        cache.clear()
+        self.p1 = criar_processo(self.ana, numero=1, destino="Curitiba, PR")
+        self.p2 = criar_processo(self.bia, numero=2, destino="Joinville, SC")
+        notificacoes_service.registrar_transicoes(
+            [(self.p1.pk, self.ana.pk, Processo.Status.ANALISE_ADMIN),
+             (self.p2.pk, self.bia.pk, Processo.Status.ANALISE_ADMIN)],
+            self.DESTINO, usuario=self.operador,
+        )
+
+    def _resumo_de(self, destinatario):
+        return EmailPendente.objects.get(destinatarios=[destinatario])
+
+    def test_trava_so_as_notificacoes(self):
+        # no PostgreSQL, FOR UPDATE sem OF também travaria os Processos do select_related
+        with mock.patch.object(QuerySet, "select_for_update", autospec=True, side_effect=QuerySet.select_for_update) as sfu:
+            notificacoes_service.gerar_resumos()
+        sfu.assert_called_once_with(mock.ANY, of=("self",))
+
+    def test_agrupa_por_destinatario(self):
+        self.assertEqual(
+            sorted(Notificacao.objects.values_list("destinatario", flat=True)),
+            ["ana@example.com", "bia@example.com", "sig@example.com", "sig@example.com"],
+        )
+        self.assertEqual(notificacoes_service.gerar_resumos(), 3)
+        self.assertEqual(EmailPendente.objects.count(), 3)
+
+        assinatura = self._resumo_de("sig@example.com")
+        self.assertIn("2 movimentação(ões)", assinatura.assunto)
+        self.assertIn("Processo 1/", assinatura.corpo)
+        self.assertIn("Processo 2/", assinatura.corpo)
+        ana = self._resumo_de("ana@example.com")
+        self.assertIn("Curitiba, PR", ana.corpo)
+        self.assertNotIn("Joinville, SC", ana.corpo)
+
+        email_service.enviar_pendentes()
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["ana@example.com", "bia@example.com", "sig@example.com"])
+
+    def test_notificacoes_ficam_marcadas_com_o_resumo(self):
+        notificacoes_service.gerar_resumos()
+        self.assertFalse(Notificacao.objects.filter(resumo__isnull=True).exists())
+        for n in Notificacao.objects.select_related("resumo"):
+            self.assertEqual(n.resumo.destinatarios, [n.destinatario])
+        # nada pendente: a próxima rodada não gera nada
+        self.assertEqual(notificacoes_service.gerar_resumos(), 0)
+        self.assertEqual(EmailPendente.objects.count(), 3)
+
+    def test_evento_do_resumo_evita_envio_duplicado(self):
+        # rodada anterior gravou o resumo da Ana, mas as notificações continuaram pendentes
+        primeira = Notificacao.objects.filter(destinatario="ana@example.com").first()
+        existente = email_service.enfileirar_email(
+            None, f"resumo:{primeira.id}", "Resumo anterior", "corpo", ["ana@example.com"]
+        )
+        notificacoes_service.gerar_resumos()
+        self.assertEqual(EmailPendente.objects.filter(destinatarios=["ana@example.com"]).count(), 1)
+        primeira.refresh_from_db()
+        self.assertEqual(primeira.resumo_id, existente.pk)
+
+    def test_quem_executou_nao_e_notificado(self):
+        notificacoes_service.registrar_transicoes(
+            [(self.p1.pk, self.ana.pk, self.DESTINO)], Processo.Status.AGUARDANDO_EMPENHO, usuario=self.ana,
+        )
+        self.assertEqual(Notificacao.objects.filter(destinatario="ana@example.com").count(), 1)
@@ -233,6 +233,20 @@ DATABASES = {
 }
 
 
+# Cache
+# Padrão: memória local de cada processo. Com vários workers (gunicorn + worker de
+# tarefas) aponte para um backend compartilhado para que invalidações (ex.: edição
+# dos parâmetros do sistema) cheguem a todos, por exemplo:
+#   DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   DJANGO_CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', 'diarias-app'),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -266,6 +280,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Arquivos enviados (anexos aguardando upload para o Drive pela fila de tarefas)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -301,9 +319,35 @@ USE_TZ = True
 
 
 GOOGLE_MAPS_API_KEY = config('GOOGLE_MAPS_API_KEY', default=None)
+# validade das distâncias guardadas no cache de rotas (Google Directions)
+ROTAS_CACHE_TTL_DIAS = int(os.getenv("ROTAS_CACHE_TTL_DIAS", "90"))
 
 # Google / Drive config
 GDRIVE_ROOT_FOLDER_ID = "1cOXSA28NevKucaWioGQMoX0ZrdVLsQvS"
 GDOC_TEMPLATE_ID = "1IE-pqTl_Syu66gMrnbGrIxlGTfW2e1bTgPkpWLWCI_M"
+# template .docx renderizado localmente (gerar com `manage.py baixar_template_docx`);
+# se o arquivo não existir, o documento é gerado pelo Google Docs a partir de GDOC_TEMPLATE_ID
+DOCX_TEMPLATE_PATH = os.getenv("DOCX_TEMPLATE_PATH", os.path.join(BASE_DIR, "templates", "documentos", "solicitacao_diaria.docx"))
+# também gera e envia um PDF do documento (requer LibreOffice instalado)
+GERAR_PDF_LOCAL = os.getenv("GERAR_PDF_LOCAL", "false").lower() == "true"
 # path absoluto para chave da service account (JSON)
 GOOGLE_SERVICE_ACCOUNT_FILE = os.path.join(BASE_DIR, 'credentials_service_account.json')
+# uploads simultâneos de anexos para o Drive (um cliente por thread)
+GDRIVE_UPLOAD_MAX_WORKERS = int(os.getenv("GDRIVE_UPLOAD_MAX_WORKERS", "4"))
+# entradas do cache em memória (parent_id, nome) -> pasta; o cache persistido não tem limite
+GDRIVE_FOLDER_CACHE_SIZE = int(os.getenv("GDRIVE_FOLDER_CACHE_SIZE", "1024"))
+
+# Fila de tarefas assíncronas (worker: `python manage.py processar_tarefas`)
+# Em modo síncrono a tarefa roda logo após o commit da requisição (útil em dev sem worker).
+TAREFAS_MODO_SINCRONO = os.getenv("TAREFAS_MODO_SINCRONO", "false").lower() == "true"
+TAREFAS_BACKOFF_BASE_SEGUNDOS = int(os.getenv("TAREFAS_BACKOFF_BASE_SEGUNDOS", "30"))
+TAREFAS_TIMEOUT_EXECUCAO_SEGUNDOS = int(os.getenv("TAREFAS_TIMEOUT_EXECUCAO_SEGUNDOS", "900"))
+
+# Caixa de saída de e-mails (worker: `python manage.py enviar_emails`)
+EMAILS_LOTE_ENVIO = int(os.getenv("EMAILS_LOTE_ENVIO", "50"))
+EMAILS_BACKOFF_BASE_SEGUNDOS = int(os.getenv("EMAILS_BACKOFF_BASE_SEGUNDOS", "60"))
+# Resumo das notificações de mudança de status (worker: `python manage.py enviar_resumos`)
+NOTIFICACOES_INTERVALO_RESUMO_SEGUNDOS = int(os.getenv("NOTIFICACOES_INTERVALO_RESUMO_SEGUNDOS", "900"))
+
+# Login com Google: timeout das chamadas HTTP (troca do code e chaves públicas do id_token)
+GOOGLE_AUTH_TIMEOUT_SEGUNDOS = int(os.getenv("GOOGLE_AUTH_TIMEOUT_SEGUNDOS", "10"))
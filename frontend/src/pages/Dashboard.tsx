@@ -1,7 +1,7 @@
 // frontend/src/pages/Dashboard.tsx
 
 import React, { useState, useEffect, useCallback, useRef } from 'react';
-import { useNavigate } from 'react-router-dom';
+import { useLocation, useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 import apiClient from '../api/axiosConfig';
 import {
@@ -52,6 +52,9 @@ const getStatusChipColor = (status: string): "success" | "warning" | "error" | "
 const Dashboard: React.FC = () => {
   const { user, activeRole } = useAuth();
   const navigate = useNavigate();
+  const location = useLocation();
+  // aviso deixado por outra página (ex.: NovaDiaria quando o documento ainda está sendo gerado)
+  const aviso = (location.state as { aviso?: string } | null)?.aviso;
 
   const [processes, setProcesses] = useState<Processo[]>([]);
   const [loading, setLoading] = useState<boolean>(true);
@@ -155,6 +158,12 @@ const Dashboard: React.FC = () => {
         Bem-vindo(a), {user?.first_name}. Visualizando como: <strong>{activeRole}</strong>
       </Typography>
 
+      {aviso && (
+        <Alert severity="info" sx={{ mb: 2 }} onClose={() => navigate(location.pathname, { replace: true, state: null })}>
+          {aviso}
+        </Alert>
+      )}
+
       <Box sx={{ borderBottom: 1, borderColor: 'divider', mb: 3 }}>
         <Tabs value={tabValue} onChange={handleTabChange} aria-label="abas do dashboard">
           {tabs.map(tab => <Tab label={tab.label} key={tab.view} />)}
@@ -92,6 +92,13 @@ const initialCalculoData: CalculoData = {
   total_empenhar: 0,
 };
 
+// a submissão responde 202; pastas, documento e e-mails ficam com a tarefa no servidor.
+// Com falhas, o backend tenta de novo com espera crescente (30s × 2^n, ~7,5 min até
+// FALHOU): depois do limite abaixo o usuário segue para o painel e acompanha por lá.
+const TAREFA_POLL_MS = 2000;
+const TAREFA_TIMEOUT_MS = 2 * 60 * 1000;
+type TarefaStatus = 'PENDENTE' | 'EM_EXECUCAO' | 'CONCLUIDA' | 'FALHOU';
+
 const UPM_TABLE: Record<Region, Record<TipoDiaria, number>> = {
   LOCAL: { COM_PERNOITE: 100, SEM_PERNOITE: 40, MEIA_DIARIA: 20 },
   OUTROS: { COM_PERNOITE: 200, SEM_PERNOITE: 80, MEIA_DIARIA: 0 },
@@ -128,10 +135,45 @@ export const NovaDiaria = () => {
     folderUrl?: string;
     numero?: number;
     ano?: number;
+    tarefaId?: number;
+    tarefaStatus?: TarefaStatus;
+    tarefaErro?: string;
   };
   const [submitResult, setSubmitResult] = useState<SubmitResult | null>(null);
   const navigate = useNavigate();
   const autoCloseTimer = useRef<number | null>(null);
+  const montado = useRef(true);
+
+  useEffect(() => {
+    montado.current = true;
+    return () => {
+      montado.current = false;
+      if (autoCloseTimer.current) window.clearTimeout(autoCloseTimer.current);
+    };
+  }, []);
+
+  // consulta /tarefas/{id}/ até a tarefa terminar (ou o tempo limite); devolve o status final
+  const acompanharTarefa = useCallback(async (tarefaId: number): Promise<TarefaStatus | null> => {
+    const inicio = Date.now();
+    while (Date.now() - inicio < TAREFA_TIMEOUT_MS) {
+      await new Promise((resolve) => window.setTimeout(resolve, TAREFA_POLL_MS));
+      if (!montado.current) return null;
+      try {
+        const { data } = await apiClient.get(`/tarefas/${tarefaId}/`);
+        setSubmitResult(prev => prev && {
+          ...prev,
+          docUrl: data.doc_url || prev.docUrl,
+          folderUrl: data.folder_url || prev.folderUrl,
+          tarefaStatus: data.status,
+          tarefaErro: data.ultimo_erro || undefined,
+        });
+        if (data.status === 'CONCLUIDA' || data.status === 'FALHOU') return data.status;
+      } catch (err) {
+        console.error('Erro ao consultar a tarefa de submissão:', err);
+      }
+    }
+    return null;
+  }, []);
 
   // estado para controlar o diálogo de sucesso
   const [successDialogOpen, setSuccessDialogOpen] = useState(false);
@@ -234,27 +276,52 @@ const handleSubmit = async () => {
       id: number;
       numero?: number;
       ano?: number;
+      tarefa_id: number;
+      tarefa_status: TarefaStatus;
       gdrive_doc_url?: string;
       gdrive_folder_url?: string;
     };
 
-    // guarda resultado (inclui id para navegar)
+    // guarda resultado (inclui id para navegar); os links chegam com a tarefa
     setSubmitResult({
       id: data.id,
       docUrl: data.gdrive_doc_url,
       folderUrl: data.gdrive_folder_url,
       numero: data.numero,
       ano: data.ano,
+      tarefaId: data.tarefa_id,
+      tarefaStatus: data.tarefa_status,
     });
 
     setSuccessDialogOpen(true);
 
-    // redirect elegante para o detalhe do processo
+    // redirect elegante para o detalhe do processo, só depois que o documento ficar pronto
     if (autoCloseTimer.current) window.clearTimeout(autoCloseTimer.current);
-    autoCloseTimer.current = window.setTimeout(() => {
-      setSuccessDialogOpen(false);
-      navigate(`/processos/${data.id}`);
-    }, 1800);
+    const agendarRedirect = () => {
+      autoCloseTimer.current = window.setTimeout(() => {
+        setSuccessDialogOpen(false);
+        navigate(`/processos/${data.id}`);
+      }, 1800);
+    };
+    if (data.tarefa_status === 'CONCLUIDA') {
+      agendarRedirect();
+    } else {
+      acompanharTarefa(data.tarefa_id).then((statusFinal) => {
+        if (!montado.current) return;
+        if (statusFinal === 'CONCLUIDA') {
+          agendarRedirect();
+        } else if (statusFinal === null) {
+          // tempo limite: a tarefa segue (com novas tentativas) no servidor
+          setSuccessDialogOpen(false);
+          navigate('/dashboard', {
+            state: {
+              aviso: `O processo Nº ${data.numero}-${data.ano} foi registrado e o documento ainda está sendo ` +
+                'gerado no Google Drive. Acompanhe pelo detalhe do processo.',
+            },
+          });
+        }
+      });
+    }
 
     // limpeza leve
     setAttachedFiles([]);
@@ -1162,9 +1229,30 @@ useEffect(() => {
                   </Typography>
                 )}
 
-                <Typography variant="caption" display="block" sx={{ mt: 2 }}>
-                  Esta mensagem será fechada automaticamente e você será redirecionado ao Painel em alguns segundos.
-                </Typography>
+                {submitResult?.tarefaStatus === 'FALHOU' ? (
+                  <Alert severity="warning" sx={{ mt: 2 }}>
+                    A solicitação foi registrada, mas não foi possível gerar o documento no Google Drive
+                    {submitResult.tarefaErro ? ` (${submitResult.tarefaErro})` : ''}. Acompanhe pelo detalhe do processo.
+                  </Alert>
+                ) : submitResult?.tarefaStatus === 'CONCLUIDA' ? (
+                  <Typography variant="caption" display="block" sx={{ mt: 2 }}>
+                    Esta mensagem será fechada automaticamente e você será redirecionado ao Painel em alguns segundos.
+                  </Typography>
+                ) : (
+                  <>
+                    <Box sx={{ display: 'flex', alignItems: 'center', gap: 1, mt: 2 }}>
+                      <CircularProgress size={16} />
+                      <Typography variant="caption">
+                        Criando as pastas e o documento no Google Drive...
+                      </Typography>
+                    </Box>
+                    {submitResult?.tarefaErro && (
+                      <Alert severity="info" sx={{ mt: 1 }}>
+                        A última tentativa falhou ({submitResult.tarefaErro}); uma nova tentativa será feita em instantes.
+                      </Alert>
+                    )}
+                  </>
+                )}
               </DialogContent>
 
               <DialogActions>